@@ -0,0 +1,90 @@
+"""
+手势识别回放基准：把录好的视频按原帧率回放给 GestureDetectionWorker（和摄像头相同的
+最新帧缓冲区、检测间隔和判断逻辑），比较不同识别器运行模式的吞吐量和CPU占用：
+
+    - 识别帧率：每秒得到的识别结果数
+    - 丢帧：采集到但没有被取走的帧（识别跟不上或检测间隔大于帧间隔时被新帧覆盖）
+    - 跳过：画面静止、没有手时被运动检测跳过识别的帧
+    - CPU：整个进程的CPU时间占回放时长的比例，以及每个识别结果的CPU时间
+    - 手势事件：去抖之后发出的 Yeah / 行走事件数，各模式应该基本一致
+
+用法（在项目根目录运行）:
+    python benchmarks/bench_gesture_recognition.py 录像.mp4 [--modes live_stream video image] [--interval 50]
+        [--no-motion-gate]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PyQt5.QtCore import QCoreApplication, QTimer
+from pet_camera import FrameSlot, VideoReplaySource
+from pet_gesture_detector import GestureDetectionWorker, PetGestureDetector
+
+
+def run(app, path, mode, model, interval, motion_gate):
+    """按原帧率回放一遍视频，返回统计结果"""
+    config = dict(PetGestureDetector.DEFAULT_CONFIG, running_mode=mode, detection_interval=interval,
+                  motion_gate=motion_gate)
+    slot = FrameSlot()
+    source = VideoReplaySource(path, realtime=True)
+    worker = GestureDetectionWorker(slot, config, model_path=model)
+    events = []
+    worker.yeah_changed.connect(lambda active: events.append(("yeah", active)))
+    worker.walk_direction_changed.connect(lambda direction: events.append(("walk", direction)))
+
+    worker.start()   # 先加载模型，不计入时间
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    source.start(slot)
+
+    def check_finished():
+        if not source.active:
+            # 等最后几个异步结果返回
+            QTimer.singleShot(500, app.quit)
+            poll.stop()
+
+    poll = QTimer()
+    poll.timeout.connect(check_finished)
+    poll.start(100)
+    app.exec_()
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    worker.close()
+    source.close()
+    return {
+        "frames": source.frames_read,
+        "submitted": worker.frames_submitted,
+        "results": worker.results_received,
+        "dropped": slot.dropped,
+        "gated": worker.frames_gated,
+        "events": len(events),
+        "wall": wall,
+        "cpu": cpu,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="手势识别回放基准")
+    parser.add_argument("video", help="录好的视频文件")
+    parser.add_argument("--modes", nargs="+", default=["live_stream", "video", "image"],
+                        choices=["live_stream", "video", "image"], help="要比较的运行模式")
+    parser.add_argument("--model", default="gesture_recognizer.task", help="手势识别模型文件")
+    parser.add_argument("--interval", type=int, default=50, help="检测间隔（毫秒）")
+    parser.add_argument("--no-motion-gate", action="store_true", help="关闭运动检测，每帧都识别")
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv[:1])
+    print(f"{'模式':<12} {'帧数':>6} {'识别帧率':>9} {'丢帧':>6} {'跳过':>6} {'CPU':>7} {'ms/结果':>9} {'事件':>5}")
+    for mode in args.modes:
+        result = run(app, args.video, mode, args.model, args.interval, not args.no_motion_gate)
+        rate = result["results"] / result["wall"] if result["wall"] else 0.0
+        per_result = result["cpu"] / result["results"] * 1e3 if result["results"] else 0.0
+        print(f"{mode:<12} {result['frames']:>6} {rate:>9.1f} {result['dropped']:>6} {result['gated']:>6} "
+              f"{result['cpu'] / result['wall']:>7.0%} {per_result:>9.1f} {result['events']:>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+平台空间索引基准测试：比较线性扫描与 PlatformIndex 在 10、100、1000 个窗口下的查询耗时。
+
+用法（在项目根目录运行）:
+    python benchmarks/bench_platform_index.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PyQt5.QtCore import QRect
+from pet_platform_index import PlatformIndex
+
+SCREEN_WIDTH = 2560
+SCREEN_HEIGHT = 1440
+PET_SIZE = 180
+TOLERANCE = 5
+QUERIES = 2000
+
+
+def make_platforms(count, rng):
+    """生成随机的窗口平台，外加一个底部任务栏"""
+    platforms = [{"key": "taskbar", "rect": QRect(0, SCREEN_HEIGHT - 40, SCREEN_WIDTH, 40), "type": "taskbar"}]
+    for hwnd in range(count):
+        width = rng.randint(200, 1600)
+        height = rng.randint(150, 1000)
+        x = rng.randint(-100, SCREEN_WIDTH - 100)
+        y = rng.randint(0, SCREEN_HEIGHT - 100)
+        platforms.append({"key": hwnd, "rect": QRect(x, y, width, height), "type": "window"})
+    return platforms
+
+
+def linear_support(platforms, x, bottom):
+    for platform in platforms:
+        rect = platform["rect"]
+        if (abs(rect.y() - bottom) <= TOLERANCE and
+                x + PET_SIZE > rect.x() and x < rect.x() + rect.width()):
+            return platform
+    return None
+
+
+def linear_nearest_below(platforms, x, bottom):
+    nearest, nearest_distance = None, float('inf')
+    for platform in platforms:
+        rect = platform["rect"]
+        if rect.y() > bottom and x + PET_SIZE > rect.x() and x < rect.x() + rect.width():
+            distance = rect.y() - bottom
+            if distance < nearest_distance:
+                nearest, nearest_distance = platform, distance
+    return nearest
+
+
+def timed(func, queries):
+    start = time.perf_counter()
+    for x, bottom in queries:
+        func(x, bottom)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'窗口数':>8} {'建索引(ms)':>12} {'支撑-线性(us)':>14} {'支撑-索引(us)':>14} "
+          f"{'落地-线性(us)':>14} {'落地-索引(us)':>14}")
+    for count in (10, 100, 1000):
+        platforms = make_platforms(count, rng)
+        # 一半查询落在真实的平台顶边上，一半是随机位置
+        queries = []
+        for i in range(QUERIES):
+            if i % 2 == 0:
+                rect = rng.choice(platforms)["rect"]
+                queries.append((rect.x() + rng.randint(0, max(0, rect.width() - 1)) - PET_SIZE // 2, rect.y()))
+            else:
+                queries.append((rng.randint(0, SCREEN_WIDTH - PET_SIZE), rng.randint(0, SCREEN_HEIGHT)))
+
+        start = time.perf_counter()
+        index = PlatformIndex(platforms)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        # 先确认两种实现结果一致
+        for x, bottom in queries:
+            assert index.support(x, x + PET_SIZE, bottom, TOLERANCE) is linear_support(platforms, x, bottom)
+            expected = linear_nearest_below(platforms, x, bottom)
+            actual = index.nearest_below(x, x + PET_SIZE, bottom)
+            assert (expected is None) == (actual is None)
+            assert expected is None or expected["rect"].y() == actual["rect"].y()
+
+        print(f"{count:>8} {build_ms:>12.3f} "
+              f"{timed(lambda x, b: linear_support(platforms, x, b), queries):>14.2f} "
+              f"{timed(lambda x, b: index.support(x, x + PET_SIZE, b, TOLERANCE), queries):>14.2f} "
+              f"{timed(lambda x, b: linear_nearest_below(platforms, x, b), queries):>14.2f} "
+              f"{timed(lambda x, b: index.nearest_below(x, x + PET_SIZE, b), queries):>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
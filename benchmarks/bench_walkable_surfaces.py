@@ -0,0 +1,68 @@
+"""
+可行走表面基准测试：30、60、120 个窗口下完整计算与单个窗口变化后的增量更新耗时。
+
+用法（在项目根目录运行）:
+    python benchmarks/bench_walkable_surfaces.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pet_window_tracker import WindowInfo
+from pet_walkable_surfaces import WalkableSurfaces
+
+SCREEN_WIDTH = 2560
+SCREEN_HEIGHT = 1440
+ROUNDS = 300
+
+
+def random_rect(rng):
+    width = rng.randint(300, 1600)
+    height = rng.randint(200, 1000)
+    x = rng.randint(-100, SCREEN_WIDTH - 200)
+    y = rng.randint(0, SCREEN_HEIGHT - 150)
+    return (x, y, x + width, y + height)
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{'窗口数':>8} {'完整计算(ms)':>14} {'移动(ms)':>10} {'提升(ms)':>10} {'最大(ms)':>10}")
+    for count in (30, 60, 120):
+        windows = [WindowInfo(hwnd, f"window {hwnd}", "", 0, random_rect(rng)) for hwnd in range(count)]
+
+        start = time.perf_counter()
+        surfaces = WalkableSurfaces()
+        surfaces.update(windows)
+        full_ms = (time.perf_counter() - start) * 1e3
+
+        move_times, raise_times = [], []
+        for _ in range(ROUNDS):
+            # 移动一个窗口（拖动窗口时的典型事件）
+            i = rng.randrange(count)
+            x, y, right, bottom = windows[i].rect
+            dx, dy = rng.randint(-20, 20), rng.randint(-20, 20)
+            windows[i] = windows[i]._replace(rect=(x + dx, y + dy, right + dx, bottom + dy))
+            start = time.perf_counter()
+            surfaces.update(windows)
+            move_times.append((time.perf_counter() - start) * 1e3)
+
+            # 把一个窗口提升到最上层（切换前台窗口）
+            windows.insert(0, windows.pop(rng.randrange(count)))
+            start = time.perf_counter()
+            surfaces.update(windows)
+            raise_times.append((time.perf_counter() - start) * 1e3)
+
+        # 增量结果必须与从头计算的结果一致
+        reference = WalkableSurfaces()
+        reference.update(windows)
+        assert reference.segments == surfaces.segments
+
+        print(f"{count:>8} {full_ms:>14.3f} {sum(move_times) / ROUNDS:>10.3f} "
+              f"{sum(raise_times) / ROUNDS:>10.3f} {max(move_times + raise_times):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
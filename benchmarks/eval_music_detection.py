@@ -0,0 +1,224 @@
+"""
+音乐检测离线评估：把标注好的 WAV 文件以快于实时的速度送进检测器的分析流程
+（回放来源 -> 环形缓冲区 -> 按检测间隔分析），统计：
+
+    - 检测延迟：音乐开始到判定为播放音乐的时间；停止延迟：音乐结束到判定停止的时间
+    - 误跳舞率：非音乐时间中判定为播放音乐的比例（音乐结束后的宽限期不计入）
+    - 抖动次数：状态切换次数超出标注切换次数的部分
+    - CPU时间：每秒音频消耗的分析CPU时间
+
+标注方式：
+    - 文件所在目录名（或文件名前缀）为 music / speech / silence 时，整个文件使用这个标签
+    - 同名的 .txt 文件（Audacity 标签格式，每行 "开始秒<TAB>结束秒<TAB>标签"）
+      按时间段标注，没有覆盖的部分视为非音乐；mixed 目录下的文件必须提供
+
+用法（在项目根目录运行）:
+    python benchmarks/eval_music_detection.py 语料目录或WAV文件 [...] [--threshold 0.005] [--off-hold 2.5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pet_audio_buffer import AudioRingBuffer
+from pet_audio_source import ReplaySource
+from pet_music_detector import MusicAnalysisPipeline
+
+LABELS = ("music", "speech", "silence", "mixed")
+
+
+def find_wav_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith(".wav"))
+        else:
+            files.append(path)
+    return files
+
+
+def load_segments(path):
+    """
+    读取标注
+
+    Returns:
+        list: 音乐时间段 [(开始秒, 结束秒)]；没有标注时返回None
+    """
+    label_path = os.path.splitext(path)[0] + ".txt"
+    if os.path.exists(label_path):
+        segments = []
+        with open(label_path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2].lower() == "music":
+                    segments.append((float(parts[0]), float(parts[1])))
+        return segments
+    names = [os.path.basename(os.path.dirname(path)).lower(), os.path.basename(path).lower()]
+    for name in names:
+        for label in LABELS:
+            if name.startswith(label):
+                if label == "mixed":
+                    return None
+                return [(0.0, float("inf"))] if label == "music" else []
+    return None
+
+
+def evaluate(path, segments, pipeline, interval, grace):
+    """把一个文件送进分析流程，返回统计结果"""
+    source = ReplaySource(path, realtime=False)
+    samplerate, channels = source.open()
+    pipeline.configure(samplerate)
+    ring_buffer = AudioRingBuffer(max(samplerate, source.block_size * 4), channels,
+                                  max_block=source.block_size)
+    analysis_block = np.zeros((samplerate // 2, channels), dtype=np.float32)
+    tick_frames = int(samplerate * interval)
+    state = {"last": 0, "next_tick": tick_frames, "cpu": 0.0}
+    decisions = []   # (时间, 是否在播放音乐)
+
+    def analyze():
+        # 与 MusicDetectionWorker._check_music_playing 相同的读取方式
+        written = ring_buffer.written
+        count = min(written - state["last"], len(analysis_block))
+        state["last"] = written
+        available = ring_buffer.read_latest(analysis_block[:count])
+        if available == 0:
+            return
+        now = written / samplerate
+        start = time.process_time()
+        playing = pipeline.process(analysis_block[count - available:count], now)
+        state["cpu"] += time.process_time() - start
+        decisions.append((now, playing))
+
+    def callback(frames):
+        ring_buffer.write(frames)
+        while ring_buffer.written >= state["next_tick"]:
+            analyze()
+            state["next_tick"] += tick_frames
+
+    wall = time.perf_counter()
+    source.run(callback)
+    if ring_buffer.written > state["last"]:
+        analyze()
+    wall = time.perf_counter() - wall
+    duration = len(source.audio) / samplerate
+
+    def is_music(t):
+        return any(start <= t < end for start, end in segments)
+
+    def in_grace(t):
+        return any(end <= t < end + grace for _, end in segments)
+
+    times = np.array([t for t, _ in decisions])
+    detected = np.array([p for _, p in decisions])
+    truth = np.array([is_music(t) for t in times])
+    grace_mask = np.array([in_grace(t) for t in times]) & ~truth
+
+    # 检测延迟和停止延迟
+    latencies, misses, releases = [], 0, []
+    for start, end in segments:
+        inside = (times >= start) & (times < end) & detected
+        if inside.any():
+            latencies.append(times[inside][0] - start)
+        else:
+            misses += 1
+        # 间隙之后紧接着下一段音乐时一直保持跳舞是期望的行为，不计入停止延迟
+        next_start = min((other for other, _ in segments if other >= end), default=duration)
+        if next_start - end > grace:
+            after = (times >= end) & ~detected
+            if after.any():
+                releases.append(times[after][0] - end)
+
+    tick = interval
+    negative = ~truth & ~grace_mask
+    false_dance = float((detected & negative).sum() * tick)
+    negative_time = float(negative.sum() * tick)
+    transitions = int(np.count_nonzero(np.diff(np.concatenate([[False], detected]).astype(np.int8))))
+    expected = int(np.count_nonzero(np.diff(np.concatenate([[False], truth]).astype(np.int8))))
+    return {
+        "file": path,
+        "duration": duration,
+        "segments": len(segments),
+        "latencies": latencies,
+        "misses": misses,
+        "releases": releases,
+        "false_dance": false_dance,
+        "negative_time": negative_time,
+        "transitions": transitions,
+        "flaps": max(0, transitions - expected),
+        "cpu": state["cpu"],
+        "wall": wall,
+    }
+
+
+def format_seconds(values):
+    return f"{np.mean(values):.2f}" if values else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线评估音乐检测")
+    parser.add_argument("paths", nargs="+", help="WAV 文件或语料目录")
+    parser.add_argument("--interval", type=float, default=0.2, help="检测间隔（秒），默认与检测线程相同")
+    parser.add_argument("--grace", type=float, default=3.0, help="音乐结束后不计入误跳舞的宽限期（秒）")
+    parser.add_argument("--threshold", type=float, default=0.005, help="开始播放的响度阈值")
+    parser.add_argument("--release-threshold", type=float, default=0.0025, help="停止播放的响度阈值")
+    parser.add_argument("--on-hold", type=float, default=0.4, help="开始条件需要持续的时间（秒）")
+    parser.add_argument("--off-hold", type=float, default=2.5, help="停止条件需要持续的时间（秒）")
+    parser.add_argument("--probability", type=float, default=0.5, help="开始播放的音乐概率阈值")
+    parser.add_argument("--release-probability", type=float, default=0.3, help="停止播放的音乐概率阈值")
+    parser.add_argument("--min-beat-confidence", type=float, default=0.33,
+                        help="开始播放要求的最低节拍置信度，0 表示只看分类器")
+    parser.add_argument("--weights", type=json.loads, default=None,
+                        help='分类器权重（JSON），例如 \'{"regularity": 6.0}\'')
+    args = parser.parse_args()
+
+    pipeline = MusicAnalysisPipeline(
+        audio_threshold=args.threshold, release_threshold=args.release_threshold,
+        on_hold=args.on_hold, off_hold=args.off_hold,
+        music_probability_threshold=args.probability,
+        release_probability_threshold=args.release_probability,
+        min_beat_confidence=args.min_beat_confidence)
+    if args.weights:
+        pipeline.classifier.weights.update(args.weights)
+
+    results = []
+    print(f"{'文件':<40} {'时长(s)':>8} {'检测延迟(s)':>11} {'停止延迟(s)':>11} {'漏检':>5} "
+          f"{'误跳舞率':>8} {'抖动':>5} {'CPU(ms/s)':>10} {'倍速':>7}")
+    for path in find_wav_files(args.paths):
+        segments = load_segments(path)
+        if segments is None:
+            print(f"{path}: 没有标注，跳过")
+            continue
+        result = evaluate(path, segments, pipeline, args.interval, args.grace)
+        results.append(result)
+        rate = result["false_dance"] / result["negative_time"] if result["negative_time"] else 0.0
+        print(f"{os.path.basename(path):<40} {result['duration']:>8.1f} {format_seconds(result['latencies']):>11} "
+              f"{format_seconds(result['releases']):>11} {result['misses']:>5} {rate:>8.1%} {result['flaps']:>5} "
+              f"{result['cpu'] / result['duration'] * 1e3:>10.2f} {result['duration'] / result['wall']:>6.0f}x")
+
+    if not results:
+        return
+    duration = sum(r["duration"] for r in results)
+    negative_time = sum(r["negative_time"] for r in results)
+    latencies = [v for r in results for v in r["latencies"]]
+    releases = [v for r in results for v in r["releases"]]
+    print()
+    print(f"文件数: {len(results)}，音频总时长: {duration:.1f}s")
+    if latencies:
+        print(f"检测延迟: 平均 {np.mean(latencies):.2f}s，最大 {np.max(latencies):.2f}s")
+    if releases:
+        print(f"停止延迟: 平均 {np.mean(releases):.2f}s，最大 {np.max(releases):.2f}s")
+    print(f"漏检: {sum(r['misses'] for r in results)} / {sum(r['segments'] for r in results)} 段音乐")
+    if negative_time:
+        print(f"误跳舞率: {sum(r['false_dance'] for r in results) / negative_time:.1%}（非音乐时间 {negative_time:.1f}s）")
+    print(f"抖动次数: {sum(r['flaps'] for r in results)}")
+    print(f"CPU时间: {sum(r['cpu'] for r in results) / duration * 1e3:.2f} ms / 每秒音频")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+拟合音乐分类器：在标注好的 WAV 语料上用和检测线程相同的分析流程提取特征，
+拟合 MusicClassifier 的逻辑回归权重和 MusicAnalysisPipeline 的节拍置信度门限。
+
+    - 每个检测间隔取一次滑动窗口特征，只使用够响的窗口（安静的部分由响度阈值处理）
+    - 标注切换之后的 --settle 秒内窗口里混着两种内容，不参与拟合
+    - 两类样本按总数加权，音乐和非音乐一样重要；权重带少量 L2 正则
+    - 节拍置信度门限取单独使用置信度时平衡准确率最高的值
+    - 逐个文件留出验证：每个文件的结果都来自没有见过这个文件的模型
+
+标注方式和 eval_music_detection.py 相同（目录名或文件名前缀，或同名的 .txt 标签文件）。
+
+用法（在项目根目录运行）:
+    python benchmarks/fit_music_classifier.py 语料目录或WAV文件 [...] [--l2 0.1] [--settle 4.0]
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from eval_music_detection import find_wav_files, load_segments
+from pet_audio_source import read_wav
+from pet_music_detector import MusicAnalysisPipeline
+
+FEATURES = ("flux", "centroid_cv", "regularity", "low_ratio")
+
+
+def collect(path, segments, interval, settle):
+    """
+    按检测间隔把文件送进分析流程，收集特征窗口
+
+    Returns:
+        tuple: (特征矩阵 (窗口数, 特征数), 节拍置信度 (窗口数,), 是否为音乐 (窗口数,))
+    """
+    audio, samplerate = read_wav(path)
+    pipeline = MusicAnalysisPipeline()
+    pipeline.configure(samplerate)
+    block = int(samplerate * interval)
+    boundaries = [t for segment in segments for t in segment]
+    rows, confidences, labels = [], [], []
+    for start in range(0, len(audio) - block + 1, block):
+        now = (start + block) / samplerate
+        pipeline.process(audio[start:start + block], now)
+        features = pipeline.extractor.features()
+        if features is None or pipeline.envelope <= pipeline.audio_threshold:
+            continue
+        if any(now - settle < boundary <= now for boundary in boundaries):
+            continue
+        rows.append([features[name] for name in FEATURES])
+        confidences.append(pipeline.beat_tracker.confidence)
+        labels.append(any(begin <= now < end for begin, end in segments))
+    return (np.array(rows, dtype=np.float64).reshape(-1, len(FEATURES)),
+            np.array(confidences, dtype=np.float64), np.array(labels, dtype=bool))
+
+
+def fit_logistic(x, y, l2, iterations=50):
+    """
+    类别平衡的 L2 逻辑回归（牛顿法），特征先标准化，结果换算回原始特征的权重
+
+    Returns:
+        dict: MusicClassifier 的权重
+    """
+    mean = x.mean(axis=0)
+    std = x.std(axis=0) + 1e-9
+    z = np.hstack([np.ones((len(x), 1)), (x - mean) / std])
+    sample_weight = np.where(y, 0.5 / max(y.sum(), 1), 0.5 / max((~y).sum(), 1))
+    penalty = np.full(z.shape[1], l2)
+    penalty[0] = 0.0   # 偏置不做正则
+    w = np.zeros(z.shape[1])
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-np.clip(z @ w, -30, 30)))
+        gradient = z.T @ (sample_weight * (p - y)) + penalty * w
+        hessian = (z * (sample_weight * p * (1 - p))[:, None]).T @ z + np.diag(penalty)
+        step = np.linalg.solve(hessian, gradient)
+        w -= step
+        if np.abs(step).max() < 1e-8:
+            break
+    raw = w[1:] / std
+    weights = {"bias": float(w[0] - np.dot(raw, mean))}
+    weights.update({name: float(value) for name, value in zip(FEATURES, raw)})
+    return weights
+
+
+def fit_gate(confidences, y):
+    """在所有置信度取值中找平衡准确率最高的门限"""
+    best, best_score = 0.0, 0.0
+    for threshold in np.unique(np.round(confidences, 2)):
+        passed = confidences >= threshold
+        score = 0.5 * (passed[y].mean() if y.any() else 1.0) + 0.5 * ((~passed[~y]).mean() if (~y).any() else 1.0)
+        if score > best_score:
+            best, best_score = float(threshold), score
+    return best
+
+
+def predict(weights, gate, x, confidences):
+    """拟合出的分类器和门限一起判断每个窗口是否为音乐"""
+    logit = weights["bias"] + x @ np.array([weights[name] for name in FEATURES])
+    return (logit >= 0) & (confidences >= gate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="拟合音乐分类器权重和节拍置信度门限")
+    parser.add_argument("paths", nargs="+", help="WAV 文件或语料目录")
+    parser.add_argument("--interval", type=float, default=0.2, help="检测间隔（秒），默认与检测线程相同")
+    parser.add_argument("--settle", type=float, default=4.0, help="标注切换之后不参与拟合的时间（秒）")
+    parser.add_argument("--l2", type=float, default=0.1, help="L2 正则强度（标准化特征上）")
+    args = parser.parse_args()
+
+    data = []
+    for path in find_wav_files(args.paths):
+        segments = load_segments(path)
+        if segments is None:
+            print(f"{path}: 没有标注，跳过")
+            continue
+        x, confidences, y = collect(path, segments, args.interval, args.settle)
+        if len(y):
+            data.append((path, x, confidences, y))
+    if not data:
+        return
+
+    x = np.vstack([d[1] for d in data])
+    confidences = np.concatenate([d[2] for d in data])
+    y = np.concatenate([d[3] for d in data])
+    print(f"文件数: {len(data)}，音乐窗口: {int(y.sum())}，非音乐窗口: {int((~y).sum())}")
+    if y.all() or not y.any():
+        print("需要同时有音乐和非音乐的样本")
+        return
+
+    # 逐个文件留出验证
+    print(f"\n{'文件（留出）':<40} {'窗口':>6} {'判为音乐':>9}")
+    for index, (path, fx, fc, fy) in enumerate(data):
+        rest = [d for i, d in enumerate(data) if i != index]
+        rx = np.vstack([d[1] for d in rest])
+        rc = np.concatenate([d[2] for d in rest])
+        ry = np.concatenate([d[3] for d in rest])
+        if ry.all() or not ry.any():
+            continue
+        detected = predict(fit_logistic(rx, ry, args.l2), fit_gate(rc, ry), fx, fc)
+        label = "音乐" if fy.all() else ("非音乐" if not fy.any() else "混合")
+        print(f"{os.path.basename(path) + '（' + label + '）':<40} {len(fy):>6} {detected.mean():>9.1%}")
+
+    weights = fit_logistic(x, y, args.l2)
+    gate = fit_gate(confidences, y)
+    detected = predict(weights, gate, x, confidences)
+    print(f"\n全部数据: 音乐召回 {detected[y].mean():.1%}，非音乐误判 {detected[~y].mean():.1%}")
+    print(f"权重: {json.dumps({k: round(v, 2) for k, v in weights.items()})}")
+    print(f"节拍置信度门限: {gate:.2f}")
+
+
+if __name__ == '__main__':
+    main()
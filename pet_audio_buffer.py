@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    单生产者/单消费者的无锁音频环形缓冲区。
+
+    写入方（音频回调线程）把采样写进预先分配的 numpy 数组，写完数据之后才增加
+    累计写入帧数；读取方（分析线程）根据累计写入帧数复制最新的一段采样，
+    从不等待写入方，也不会让写入方等待。Python 整数的赋值是原子的，不需要锁。
+    读取时如果写入方恰好覆盖了正在复制的区域，读取方会重新复制。
+
+    写入方在发布帧数之前就已经在改写缓冲区，所以读取方除了检查已经发布的前进量，
+    还要为一个正在写入、尚未发布的块留出余量：每次写入最多 max_block 帧
+    （更长的写入按块拆开逐块发布），一次最多能读出 capacity - max_block 帧。
+    """
+    def __init__(self, capacity, channels=1, dtype=np.float32, max_block=1024):
+        """
+        Args:
+            capacity (int): 缓冲区能保存的帧数，应该远大于每次读取的帧数
+            channels (int): 声道数
+            dtype: 采样的数据类型
+            max_block (int): 每次发布前最多写入的帧数，通常是音频回调的块大小
+        """
+        if not 0 < max_block < capacity:
+            raise ValueError(f"max_block ({max_block}) 必须大于0并且小于 capacity ({capacity})")
+        self.capacity = capacity
+        self.max_block = max_block
+        self.channels = channels
+        self._buffer = np.zeros((capacity, channels), dtype=dtype)
+        self._written = 0   # 累计写入的帧数，只由写入方修改
+
+    @property
+    def written(self):
+        """累计写入的帧数，读取方可以据此判断是否有新数据"""
+        return self._written
+
+    def write(self, frames):
+        """
+        写入一段采样（只能由一个线程调用，通常是音频回调）
+
+        Args:
+            frames (np.ndarray): 形状为 (帧数, 声道数) 的采样
+        """
+        count = len(frames)
+        if count == 0:
+            return
+        if count > self.capacity:
+            # 比整个缓冲区还长时只保留最新的部分
+            frames = frames[-self.capacity:]
+            self._written += count - self.capacity
+            count = self.capacity
+        # 每块写完之后再发布新的帧数，未发布的数据不会超过 max_block
+        for offset in range(0, count, self.max_block):
+            block = frames[offset:offset + self.max_block]
+            size = len(block)
+            start = self._written % self.capacity
+            first = min(size, self.capacity - start)
+            self._buffer[start:start + first] = block[:first]
+            if first < size:
+                self._buffer[:size - first] = block[first:]
+            self._written += size
+
+    def read_latest(self, out, retries=3):
+        """
+        把最新的 len(out) 帧复制到 out 中（不会阻塞）
+
+        Args:
+            out (np.ndarray): 预先分配的 (帧数, 声道数) 数组
+            retries (int): 复制期间被写入方覆盖时的最多重试次数
+
+        Returns:
+            int: 复制的帧数；已写入的帧数不足或 len(out) 超过 capacity - max_block 时
+                 小于 len(out)，数据放在 out 的末尾。每次重试都被写入方覆盖时返回0，
+                 out 中可能是撕裂的数据，不能使用
+        """
+        count = min(len(out), self.capacity - self.max_block)
+        for _ in range(retries + 1):
+            written = self._written
+            available = min(count, written)
+            if available == 0:
+                return 0
+            start = (written - available) % self.capacity
+            first = min(available, self.capacity - start)
+            tail = out[len(out) - available:]
+            tail[:first] = self._buffer[start:start + first]
+            if first < available:
+                tail[first:] = self._buffer[:available - first]
+            # 复制期间写入方已经发布的帧数加上一个可能正在写入的块没有覆盖到已复制的区域，数据有效
+            if self._written - written <= self.capacity - available - self.max_block:
+                return available
+        return 0
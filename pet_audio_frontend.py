@@ -0,0 +1,98 @@
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+class AudioFrontEnd:
+    """
+    分析前端：多声道混成单声道，再用多相FIR低通滤波器按整数倍降采样到较低的分析采样率。
+
+    多相实现只计算需要保留的输出点（每 factor 个输入点算一个），滤波和降采样的
+    计算量都只有直接滤波的 1/factor。所有缓冲区预先分配，输入块不超过预分配大小时
+    每次处理都不会分配新的数组；后面的响度、频谱和节拍分析都在降采样后的
+    少量采样上进行。
+    """
+    def __init__(self, samplerate, target_rate=11025, taps_per_phase=16, max_block=None):
+        """
+        Args:
+            samplerate (int): 输入采样率
+            target_rate (int): 期望的分析采样率，实际使用最接近的整数分频
+            taps_per_phase (int): 每个多相分支的滤波器阶数，越大过渡带越窄
+            max_block (int): 预分配的最大输入帧数，默认半秒
+        """
+        self.factor = max(1, int(round(samplerate / target_rate)))
+        self.samplerate = samplerate / self.factor   # 实际的分析采样率
+        # 加窗sinc低通滤波器，截止频率留出10%的过渡带，直流增益为1
+        taps = taps_per_phase * self.factor
+        if self.factor > 1:
+            n = np.arange(taps) - (taps - 1) / 2
+            cutoff = 0.45 / self.factor
+            kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(taps)
+        else:
+            taps = 1
+            kernel = np.ones(1)
+        # 反转后和滑动窗口做点积就是卷积
+        self._kernel = (kernel / kernel.sum())[::-1].astype(np.float32)
+        self._history = taps - 1
+        self._allocate(max_block or int(samplerate) // 2)
+        self.reset()
+
+    def _allocate(self, max_block):
+        self.max_block = max_block
+        size = self._history + self.factor + max_block
+        # 双缓冲：每次把未用完的尾部复制到另一个缓冲区的开头，避免重叠复制
+        self._buffers = [np.zeros(size, dtype=np.float32), np.zeros(size, dtype=np.float32)]
+        self._output = np.zeros(max_block // self.factor + 1, dtype=np.float32)
+
+    def reset(self):
+        """清空滤波器状态"""
+        self._current = 0
+        self._buffers[0][:self._history] = 0
+        self._filled = self._history   # 缓冲区中已有的采样数（开头是滤波器历史）
+
+    def process(self, data):
+        """
+        混音并降采样一段新的采样
+
+        Args:
+            data (np.ndarray): 形状为 (帧数, 声道数) 或 (帧数,) 的 float32 采样
+
+        Returns:
+            np.ndarray: 降采样后的单声道采样，是内部缓冲区的视图，下次调用之前有效
+        """
+        count = len(data)
+        if count > self.max_block:
+            # 很少发生：扩大预分配的缓冲区，保留滤波器状态
+            old = self._buffers[self._current][:self._filled].copy()
+            self._allocate(count)
+            self._current = 0
+            self._buffers[0][:len(old)] = old
+
+        work = self._buffers[self._current]
+        target = work[self._filled:self._filled + count]
+        if data.ndim == 1:
+            target[:] = data
+        elif data.shape[1] == 1:
+            target[:] = data[:, 0]
+        else:
+            # 直接求和到目标区域，再原地缩放，不产生临时数组
+            np.add.reduce(data, axis=1, out=target)
+            target *= 1.0 / data.shape[1]
+        filled = self._filled + count
+
+        # 输出点位于 history, history+factor, ...，每个输出点和它之前的 taps 个输入做点积
+        outputs = max(0, (filled - self._history - 1) // self.factor + 1)
+        result = self._output[:outputs]
+        if outputs:
+            stride = work.strides[0]
+            windows = as_strided(work, shape=(outputs, len(self._kernel)),
+                                 strides=(stride * self.factor, stride), writeable=False)
+            np.dot(windows, self._kernel, out=result)
+
+        # 下一个输出点需要的历史采样复制到另一个缓冲区的开头
+        consumed = outputs * self.factor
+        keep = filled - consumed
+        other = 1 - self._current
+        self._buffers[other][:keep] = work[consumed:filled]
+        self._current = other
+        self._filled = keep
+        return result
@@ -0,0 +1,449 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+import numpy as np
+
+# 已解析的设备缓存：(后端名称, 查找条件) -> 设备。重新打开音频流时不再枚举设备，
+# 打开失败时由对应的后端清除自己的缓存项
+_device_cache = {}
+
+
+class AudioSource:
+    """
+    系统音频来源的基类。
+
+    使用方式：open() 解析设备并返回采样格式，调用方据此准备缓冲区之后再调用
+    start(callback) 开始采集。callback(frames) 在采集线程中调用，frames 是形状为
+    (帧数, 声道数) 的 float32 数组，只在回调期间有效，需要保存时必须复制。
+    """
+    name = "audio"
+
+    def __init__(self, block_size=1024):
+        """
+        Args:
+            block_size (int): 每次回调的帧数
+        """
+        self.block_size = block_size
+        self.samplerate = None
+        self.channels = None
+
+    @classmethod
+    def available(cls):
+        """当前环境能否使用这个后端（只做廉价的检查，不打开设备）"""
+        return True
+
+    def open(self):
+        """
+        解析设备（结果会被缓存）并确定采样格式
+
+        Returns:
+            tuple: (采样率, 声道数)
+        """
+        raise NotImplementedError
+
+    def start(self, callback):
+        """开始采集"""
+        raise NotImplementedError
+
+    def close(self):
+        """停止采集并释放设备，可以重复调用"""
+        raise NotImplementedError
+
+    @property
+    def active(self):
+        """是否正在采集"""
+        raise NotImplementedError
+
+
+class _ThreadedSource(AudioSource):
+    """在自己的守护线程中循环读取阻塞式接口的音频来源"""
+    def __init__(self, block_size=1024):
+        super().__init__(block_size)
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self, callback):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_safely, args=(callback,),
+                                        name=f"{self.name}-capture", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop_event.set()
+        thread = self._thread
+        self._thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(1.0)
+
+    @property
+    def active(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run_safely(self, callback):
+        try:
+            self._run(callback)
+        except Exception as e:
+            print(f"{self.name}: 音频采集出错: {str(e)}")
+
+    def _run(self, callback):
+        """采集循环，_stop_event 被设置时返回"""
+        raise NotImplementedError
+
+
+class SoundDeviceSource(AudioSource):
+    """
+    通过 sounddevice（PortAudio）录制名称匹配的输入设备，
+    例如 Windows 的“立体声混音”或 Linux 上 ALSA 暴露的监听设备。
+    """
+    name = "sounddevice"
+
+    def __init__(self, device_names=("立体声混音", "Stereo Mix"), block_size=1024):
+        """
+        Args:
+            device_names (tuple): 设备名称中包含的关键字，按顺序查找
+        """
+        super().__init__(block_size)
+        self.device_names = tuple(device_names)
+        self._device = None
+        self._stream = None
+
+    @classmethod
+    def available(cls):
+        try:
+            import sounddevice  # noqa: F401
+        except (ImportError, OSError):
+            return False
+        return True
+
+    def _resolve(self, sd):
+        key = (self.name, self.device_names)
+        if key not in _device_cache:
+            devices = sd.query_devices()
+            print("\nAvailable audio devices:")
+            for i, dev in enumerate(devices):
+                print(f"[{i}] {dev['name']} (in={dev['max_input_channels']}, out={dev['max_output_channels']})")
+            found = None
+            for pattern in self.device_names:
+                for i, dev in enumerate(devices):
+                    if pattern in dev['name'] and dev['max_input_channels'] > 0:
+                        found = i
+                        break
+                if found is not None:
+                    break
+            if found is None:
+                print("\nTroubleshooting steps:")
+                print("1. Right-click on the speaker icon in the system tray")
+                print("2. Click 'Open Sound settings'")
+                print("3. Click 'Sound Control Panel' on the right")
+                print("4. In the Recording tab, right-click anywhere and enable 'Show Disabled Devices'")
+                print("5. Find 'Stereo Mix', right-click it and enable it")
+                print("6. Set it as the default device")
+                raise RuntimeError(f"Could not find input device matching {self.device_names}")
+            _device_cache[key] = found
+        return _device_cache[key]
+
+    def open(self):
+        import sounddevice as sd
+        self.close()
+        device = self._resolve(sd)
+        try:
+            device_info = sd.query_devices(device)
+        except Exception:
+            _device_cache.pop((self.name, self.device_names), None)
+            raise
+        print(f"Using input device: {device_info['name']}")
+        self.samplerate = int(device_info['default_samplerate'])
+        self.channels = device_info['max_input_channels']
+        self._device = device
+        return self.samplerate, self.channels
+
+    def start(self, callback):
+        import sounddevice as sd
+        try:
+            self._stream = sd.InputStream(
+                device=self._device,
+                channels=self.channels,
+                blocksize=self.block_size,
+                samplerate=self.samplerate,
+                dtype=np.float32,
+                callback=lambda indata, frames, time_info, status: callback(indata)
+            )
+            self._stream.start()
+        except Exception:
+            # 设备可能已被移除，下次重新枚举
+            _device_cache.pop((self.name, self.device_names), None)
+            self._stream = None
+            raise
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    @property
+    def active(self):
+        return self._stream is not None and self._stream.active
+
+
+def _native_samplerate():
+    """
+    查询默认输出设备的原生采样率：Windows 上是 WASAPI 共享模式的混音格式，
+    Linux 上是 PulseAudio / PipeWire 服务器的默认采样格式
+
+    Returns:
+        int: 采样率，查询不到时返回None
+    """
+    try:
+        if sys.platform == "win32":
+            import sounddevice as sd
+            for api in sd.query_hostapis():
+                if api["name"] == "Windows WASAPI" and api["default_output_device"] >= 0:
+                    return int(sd.query_devices(api["default_output_device"])["default_samplerate"])
+        elif shutil.which("pactl"):
+            # 例如 "Default Sample Specification: float32le 2ch 48000Hz"
+            output = subprocess.run(["pactl", "info"], capture_output=True, text=True, timeout=2.0,
+                                    env=dict(os.environ, LC_ALL="C")).stdout
+            for line in output.splitlines():
+                if line.startswith("Default Sample Specification:"):
+                    return int(line.split()[-1].rstrip("Hz"))
+    except Exception as e:
+        print(f"无法查询输出设备的采样率: {str(e)}")
+    return None
+
+
+class SoundCardLoopbackSource(_ThreadedSource):
+    """
+    通过 soundcard 录制默认扬声器的回环（Windows 上是 WASAPI loopback，
+    Linux 上是 PulseAudio 的 monitor），不需要启用立体声混音。
+
+    默认按扬声器的原生格式录制（声道数来自 soundcard，采样率来自系统的混音格式），
+    不让系统在回环路径上重新采样；查询不到采样率时使用 48000。
+    """
+    name = "soundcard"
+    FALLBACK_SAMPLERATE = 48000
+
+    def __init__(self, samplerate=None, channels=None, block_size=1024):
+        """
+        Args:
+            samplerate (int): 录制的采样率，None 表示使用扬声器的原生采样率
+            channels (int): 录制的声道数，None 表示使用扬声器的声道数
+        """
+        super().__init__(block_size)
+        self.requested_samplerate = samplerate
+        self.requested_channels = channels
+        self._microphone = None
+
+    @classmethod
+    def available(cls):
+        try:
+            import soundcard  # noqa: F401
+        except Exception:
+            # 没有音频服务器时 soundcard 在导入阶段就会失败
+            return False
+        return True
+
+    def open(self):
+        import soundcard as sc
+        self.close()
+        speaker = sc.default_speaker()
+        key = (self.name, speaker.name)
+        if key not in _device_cache:
+            # 设备和它的原生格式一起缓存，打开失败时一起清除
+            microphone = sc.get_microphone(id=str(speaker.name), include_loopback=True)
+            samplerate = _native_samplerate() or self.FALLBACK_SAMPLERATE
+            _device_cache[key] = (microphone, samplerate, speaker.channels)
+            print(f"Using loopback device: {microphone.name} ({samplerate} Hz, {speaker.channels} channels)")
+        self._microphone, samplerate, channels = _device_cache[key]
+        self._key = key
+        self.samplerate = self.requested_samplerate or samplerate
+        self.channels = self.requested_channels or channels
+        return self.samplerate, self.channels
+
+    def _run(self, callback):
+        if sys.platform == "win32":
+            # WASAPI 需要在录音线程中初始化COM
+            import ctypes
+            ctypes.windll.ole32.CoInitializeEx(None, 0)
+        try:
+            with self._microphone.recorder(samplerate=self.samplerate, channels=self.channels,
+                                           blocksize=self.block_size) as recorder:
+                while not self._stop_event.is_set():
+                    callback(np.asarray(recorder.record(numframes=self.block_size), dtype=np.float32))
+        except Exception:
+            _device_cache.pop(self._key, None)
+            raise
+
+
+class PulseMonitorSource(_ThreadedSource):
+    """
+    通过 parec 录制 PulseAudio / PipeWire（pipewire-pulse）默认输出的 monitor，
+    不依赖任何 Python 音频库。
+    """
+    name = "pulse"
+
+    def __init__(self, device="@DEFAULT_MONITOR@", samplerate=44100, channels=2, block_size=1024):
+        super().__init__(block_size)
+        self.device = device
+        self.samplerate = samplerate
+        self.channels = channels
+        self._process = None
+
+    @classmethod
+    def available(cls):
+        return bool(os.environ.get("PULSE_SERVER") or os.environ.get("XDG_RUNTIME_DIR")) and cls._parec() is not None
+
+    @classmethod
+    def _parec(cls):
+        key = (cls.name, "parec")
+        if key not in _device_cache:
+            _device_cache[key] = shutil.which("parec")
+        return _device_cache[key]
+
+    def open(self):
+        self.close()
+        if self._parec() is None:
+            raise RuntimeError("parec not found")
+        return self.samplerate, self.channels
+
+    def start(self, callback):
+        self._process = subprocess.Popen(
+            [self._parec(), f"--device={self.device}", "--format=float32le",
+             f"--rate={self.samplerate}", f"--channels={self.channels}", "--raw",
+             f"--latency={self.block_size * self.channels * 4}"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        super().start(callback)
+
+    def close(self):
+        self._stop_event.set()
+        if self._process is not None:
+            # 结束进程让阻塞的读取返回，没有及时退出时强制结束
+            self._process.terminate()
+            try:
+                self._process.wait(1.0)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+        super().close()
+
+    def _run(self, callback):
+        block_bytes = self.block_size * self.channels * 4
+        stdout = self._process.stdout
+        while not self._stop_event.is_set():
+            data = stdout.read(block_bytes)
+            if len(data) < block_bytes:
+                return
+            callback(np.frombuffer(data, dtype=np.float32).reshape(-1, self.channels))
+
+
+def read_wav(path):
+    """
+    读取 PCM WAV 文件
+
+    Returns:
+        tuple: (形状为 (帧数, 声道数) 的 float32 数组, 采样率)
+    """
+    with wave.open(path, "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        samplerate = wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 3:
+        # 24位采样补一个低位字节后按32位整数读取
+        padded = np.zeros((len(raw) // 3, 4), dtype=np.uint8)
+        padded[:, 1:] = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        samples = padded.view("<i4").reshape(-1).astype(np.float32) / 2147483648
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"Unsupported sample width: {width}")
+    return samples.reshape(-1, channels), samplerate
+
+
+class ReplaySource(_ThreadedSource):
+    """
+    回放录制好的音频（WAV 文件或 numpy 数组），用于测试和基准测试。
+    realtime 为True时按真实时间的节奏回调，否则尽快送完所有数据。
+    """
+    name = "replay"
+
+    def __init__(self, audio, samplerate=None, block_size=1024, realtime=True, loop=False):
+        """
+        Args:
+            audio: WAV 文件路径，或形状为 (帧数,) / (帧数, 声道数) 的数组
+            samplerate (int): 采样率，audio 是数组时必须提供
+            realtime (bool): 是否按真实时间的节奏回放
+            loop (bool): 是否循环回放
+        """
+        super().__init__(block_size)
+        if isinstance(audio, (str, os.PathLike)):
+            audio, samplerate = read_wav(os.fspath(audio))
+        elif samplerate is None:
+            raise ValueError("samplerate is required for array input")
+        audio = np.asarray(audio, dtype=np.float32)
+        if audio.ndim == 1:
+            audio = audio[:, None]
+        self.audio = audio
+        self.samplerate = int(samplerate)
+        self.channels = audio.shape[1]
+        self.realtime = realtime
+        self.loop = loop
+
+    def open(self):
+        self.close()
+        return self.samplerate, self.channels
+
+    def run(self, callback):
+        """在当前线程中同步回放（离线评估时配合 realtime=False 使用）"""
+        self._stop_event.clear()
+        self._run(callback)
+
+    def _run(self, callback):
+        block = self.block_size
+        block_seconds = block / self.samplerate
+        deadline = time.monotonic()
+        while not self._stop_event.is_set():
+            for start in range(0, len(self.audio), block):
+                if self._stop_event.is_set():
+                    return
+                callback(self.audio[start:start + block])
+                if self.realtime:
+                    deadline += block_seconds
+                    delay = deadline - time.monotonic()
+                    if delay > 0:
+                        self._stop_event.wait(delay)
+            if not self.loop:
+                return
+
+
+def create_audio_source():
+    """
+    根据当前平台选择音频来源
+
+    可以用环境变量 DPET_AUDIO_REPLAY 指定一个 WAV 文件循环回放，
+    在没有声卡的环境中测试音乐检测。
+    """
+    replay = os.environ.get("DPET_AUDIO_REPLAY")
+    if replay:
+        return ReplaySource(replay, loop=True)
+    if sys.platform == "win32":
+        candidates = [SoundCardLoopbackSource, SoundDeviceSource]
+    elif sys.platform.startswith("linux"):
+        candidates = [PulseMonitorSource, SoundCardLoopbackSource, SoundDeviceSource]
+    else:
+        candidates = [SoundCardLoopbackSource, SoundDeviceSource]
+    for candidate in candidates:
+        if candidate.available():
+            print(f"PetMusicDetector: 使用音频来源 {candidate.name}")
+            return candidate()
+    print("PetMusicDetector: 没有可用的音频来源")
+    return SoundDeviceSource()
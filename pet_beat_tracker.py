@@ -0,0 +1,217 @@
+import math
+from collections import namedtuple
+import numpy as np
+
+
+class BeatInfo(namedtuple("BeatInfo", ["bpm", "phase", "timestamp", "confidence"])):
+    """
+    节拍跟踪结果（不可变，可以在线程之间直接传递）
+      bpm:        当前速度（拍/分钟）
+      phase:      timestamp 时刻在一拍中的位置，0 表示正好在拍点上，范围 [0, 1)
+      timestamp:  对应的 time.monotonic() 时间
+      confidence: 0-1 的速度置信度
+    """
+    __slots__ = ()
+
+    @property
+    def period(self):
+        """一拍的时长（秒）"""
+        return 60.0 / self.bpm
+
+    def phase_at(self, now):
+        """外推到 now 时刻的节拍相位"""
+        return (self.phase + (now - self.timestamp) / self.period) % 1.0
+
+
+class BeatTracker:
+    """
+    流式节拍跟踪器：起音包络 -> 速度估计 -> 节拍相位。
+
+    - 起音包络：对数幅度谱的正向频谱通量（帧长1024，帧移512）。全频带和低频（底鼓）
+      各自除以滑动平均后相加，低频只占很少的频点，单独归一化才不会被镲片淹没，
+      相位也因此倾向于落在底鼓上，而不是反拍的镲片上
+    - 速度：对起音包络做指数衰减的在线自相关，每帧只更新固定数量的延迟，
+      按以 120 BPM 为中心的对数高斯先验加权后取峰值
+    - 相位：每次更新速度时，用间隔一个周期的梳状脉冲和最近几拍的起音包络做相关，
+      得到拍点位置；两次更新之间按周期推进，相位变化平滑跟随
+
+    每帧的计算量和内存都是固定的，和已经处理的音频长度无关。
+    """
+    def __init__(self, samplerate, frame_size=1024, hop_size=512, low_cutoff=200.0, min_bpm=60, max_bpm=180,
+                 prior_bpm=120, memory=4.0, phase_beats=4, phase_gain=0.3, min_confidence=0.2):
+        """
+        Args:
+            samplerate (int): 采样率
+            frame_size (int): 每帧的采样数
+            hop_size (int): 帧移
+            low_cutoff (float): 低频起音的截止频率（Hz）
+            min_bpm (int): 最低速度
+            max_bpm (int): 最高速度
+            prior_bpm (float): 速度先验的中心
+            memory (float): 自相关的衰减时间常数（秒），越大速度越稳定、跟随变速越慢
+            phase_beats (int): 估计相位时使用最近几拍的起音包络
+            phase_gain (float): 每次更新时相位向新估计移动的比例
+            min_confidence (float): 置信度低于这个值时不发布节拍
+        """
+        self.samplerate = samplerate
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.phase_gain = phase_gain
+        self.min_confidence = min_confidence
+        self.frame_seconds = hop_size / samplerate
+        self._low_bins = max(2, int(round(low_cutoff * frame_size / samplerate)) + 1)
+        self._window = np.hanning(frame_size).astype(np.float32)
+        self._decay = math.exp(-self.frame_seconds / memory)
+        self._mean_decay = math.exp(-self.frame_seconds / 0.5)
+
+        self._min_lag = max(2, int(60.0 / max_bpm / self.frame_seconds))
+        self._max_lag = int(math.ceil(60.0 / min_bpm / self.frame_seconds))
+        self._lags = np.arange(self._min_lag, self._max_lag + 1)
+        lag_bpm = 60.0 / (self._lags * self.frame_seconds)
+        self._prior = np.exp(-0.5 * (np.log2(lag_bpm / prior_bpm) / 0.6) ** 2)  # 标准差0.6个八度
+
+        # 预先分配的缓冲区
+        self._samples = np.zeros(frame_size, dtype=np.float32)   # 最近 frame_size 个采样
+        self.phase_beats = phase_beats
+        # 最近的起音包络（环形），长度足够估计相位
+        self._onsets = np.zeros(self._max_lag * phase_beats + 1, dtype=np.float64)
+        self._beat_offsets = np.arange(phase_beats)
+        self._autocorr = np.zeros(len(self._lags), dtype=np.float64)
+        self._warmup = 2 * self._max_lag  # 至少积累两个最长周期的起音包络之后才发布节拍
+        self.reset()
+
+    def reset(self):
+        self._samples[:] = 0
+        self._filled = 0          # 当前帧已有的新采样数
+        self._previous = None     # 上一帧的对数幅度谱
+        self._onsets[:] = 0
+        self._autocorr[:] = 0
+        self._energy = 0.0        # 起音包络能量（自相关的零延迟项）
+        self._mean = 0.0          # 全频带通量的滑动平均
+        self._low_mean = 0.0      # 低频通量的滑动平均
+        self._frame = 0           # 已处理的帧数
+        self._period = 0.0        # 当前节拍周期（帧）
+        self._candidate = 0.0     # 等待确认的新周期
+        self._candidate_frames = 0
+        self._next_beat = 0.0     # 下一个预测拍点（帧）
+        self.confidence = 0.0
+
+    def update(self, samples):
+        """
+        送入一段新的单声道采样
+
+        Args:
+            samples (np.ndarray): 一维 float32 采样
+        """
+        hop = self.hop_size
+        position = 0
+        count = len(samples)
+        while position < count:
+            take = min(hop - self._filled, count - position)
+            # 帧缓冲区左移，新采样放在末尾
+            tail = self.frame_size - hop + self._filled
+            self._samples[tail:tail + take] = samples[position:position + take]
+            self._filled += take
+            position += take
+            if self._filled == hop:
+                self._process_frame()
+                self._samples[:-hop] = self._samples[hop:]
+                self._filled = 0
+
+    def _process_frame(self):
+        spectrum = np.log1p(100.0 * np.abs(np.fft.rfft(self._samples * self._window)))
+        if self._previous is None:
+            self._previous = spectrum
+            return
+        rise = np.maximum(spectrum - self._previous, 0)
+        self._previous = spectrum
+        flux = float(rise.sum())
+        low_flux = float(rise[:self._low_bins].sum())
+        # 去掉慢变化的部分，只保留起音
+        decay = self._mean_decay
+        self._mean = decay * self._mean + (1 - decay) * flux
+        self._low_mean = decay * self._low_mean + (1 - decay) * low_flux
+        onset = (max(0.0, flux - self._mean) / (self._mean + 1e-6)
+                 + max(0.0, low_flux - self._low_mean) / (self._low_mean + 1e-6))
+
+        size = len(self._onsets)
+        frame = self._frame
+        self._onsets[frame % size] = onset
+        self._frame = frame + 1
+
+        # 在线自相关：每个延迟一次乘加
+        past = self._onsets[(frame - self._lags) % size]
+        self._autocorr *= self._decay
+        self._autocorr += onset * past
+        self._energy = self._decay * self._energy + onset * onset
+
+        if frame % 4 == 0:
+            self._update_tempo()
+            self._update_phase(frame)
+        while self._period and self._next_beat <= frame:
+            self._next_beat += self._period
+
+    def _update_tempo(self):
+        if self._energy <= 1e-9:
+            self.confidence = 0.0
+            return
+        weighted = self._autocorr * self._prior
+        best = int(np.argmax(weighted))
+        self.confidence = float(max(0.0, min(1.0, self._autocorr[best] / self._energy)))
+        # 抛物线插值得到小数周期
+        period = float(self._lags[best])
+        if 0 < best < len(weighted) - 1:
+            a, b, c = weighted[best - 1], weighted[best], weighted[best + 1]
+            denominator = a - 2 * b + c
+            if denominator < 0:
+                period += 0.5 * (a - c) / denominator
+
+        if self._period == 0.0 or abs(period - self._period) <= 0.05 * self._period:
+            # 周期接近时平滑跟随
+            self._period = period if self._period == 0.0 else 0.8 * self._period + 0.2 * period
+            self._candidate_frames = 0
+        else:
+            # 周期跳变（换歌、变速）需要持续约1秒才切换，避免在倍频之间来回跳
+            if abs(period - self._candidate) > 0.05 * period:
+                self._candidate = period
+                self._candidate_frames = 0
+            self._candidate_frames += 4
+            if self._candidate_frames * self.frame_seconds >= 1.0:
+                self._period = period
+                self._candidate_frames = 0
+
+    def _update_phase(self, frame):
+        period = self._period
+        if period == 0.0:
+            return
+        # 候选拍点偏移 0..周期-1，每个偏移把最近几拍对应位置的起音包络加起来
+        size = len(self._onsets)
+        offsets = np.arange(int(period))
+        positions = frame - offsets[:, None] - np.round(self._beat_offsets * period).astype(int)[None, :]
+        scores = self._onsets[positions % size].sum(axis=1)
+        best = int(np.argmax(scores))
+        if scores[best] <= 0:
+            return
+        target = frame - best + period   # 新估计的下一个拍点
+        # 按周期折算到离当前预测最近的位置，再平滑移动
+        error = (target - self._next_beat + period / 2) % period - period / 2
+        gain = 1.0 if self._frame <= self._warmup else self.phase_gain
+        self._next_beat += gain * error
+
+    def info(self, timestamp):
+        """
+        当前的节拍估计
+
+        Args:
+            timestamp (float): 已送入的最后一个采样对应的 time.monotonic() 时间
+
+        Returns:
+            BeatInfo: 置信度不足或还没有估计出速度时返回None
+        """
+        if self._period == 0.0 or self._frame < self._warmup or self.confidence < self.min_confidence:
+            return None
+        # 相位对应到已送入的最后一个采样
+        position = self._frame + self._filled / self.hop_size
+        phase = (1.0 - (self._next_beat - position) / self._period) % 1.0
+        bpm = 60.0 / (self._period * self.frame_seconds)
+        return BeatInfo(float(bpm), float(phase), timestamp, self.confidence)
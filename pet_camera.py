@@ -0,0 +1,166 @@
+import threading
+import time
+
+
+class FrameSlot:
+    """
+    单槽的最新帧缓冲区：采集线程每读到一帧就覆盖槽里的帧，识别线程每次只取最新的一帧，
+    来不及处理的旧帧直接丢弃，识别慢的时候不会积压延迟。
+
+    槽里保存的是不可变的 (序号, 时间戳, 帧) 元组，写入方整体替换，读取方读一次属性
+    拿到的总是完整的一帧；Python 的属性赋值是原子的，两边都不需要锁，也不会互相等待。
+    写入方放进槽里的帧之后不能再修改。
+    """
+    def __init__(self):
+        self._latest = None   # (序号, 时间戳, 帧)
+        self._count = 0       # 累计写入的帧数，只由写入方修改
+        self.dropped = 0      # 没有被取走就被覆盖的帧数，只由读取方修改
+
+    def put(self, frame, timestamp):
+        """
+        放入新的一帧（只能由一个线程调用）
+
+        Args:
+            frame (np.ndarray): BGR 图像
+            timestamp (float): 读到这一帧时的 time.monotonic() 时间
+        """
+        self._count += 1
+        self._latest = (self._count, timestamp, frame)
+
+    def take(self, last_sequence):
+        """
+        取出比 last_sequence 更新的一帧
+
+        Args:
+            last_sequence (int): 上次取到的帧的序号，第一次为0
+
+        Returns:
+            tuple: (序号, 时间戳, 帧)；没有新帧时返回None
+        """
+        latest = self._latest
+        if latest is None or latest[0] <= last_sequence:
+            return None
+        if last_sequence:
+            self.dropped += latest[0] - last_sequence - 1
+        return latest
+
+    def clear(self):
+        self._latest = None
+
+
+class VideoSource:
+    """
+    视频来源的基类：在自己的守护线程中循环读取帧并放进 FrameSlot，
+    打开设备和阻塞的读取都不在GUI线程或识别线程中进行。
+    """
+    name = "video"
+
+    def __init__(self):
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self, slot):
+        """开始读取，帧放进 slot"""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_safely, args=(slot,),
+                                        name=f"{self.name}-capture", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """停止读取并释放设备，可以重复调用"""
+        self._stop_event.set()
+        thread = self._thread
+        self._thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(2.0)
+
+    @property
+    def active(self):
+        """是否正在读取"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run_safely(self, slot):
+        try:
+            self._run(slot)
+        except Exception as e:
+            print(f"{self.name}: 读取视频出错: {str(e)}")
+
+    def _run(self, slot):
+        """读取循环，_stop_event 被设置时返回"""
+        raise NotImplementedError
+
+
+class CameraSource(VideoSource):
+    """通过 OpenCV 读取摄像头，读取速度由摄像头的帧率决定"""
+    name = "camera"
+
+    def __init__(self, index=0):
+        """
+        Args:
+            index (int): 摄像头编号
+        """
+        super().__init__()
+        self.index = index
+
+    def _run(self, slot):
+        import cv2
+        cap = cv2.VideoCapture(self.index)
+        try:
+            if not cap.isOpened():
+                print("无法打开摄像头")
+                return
+            while not self._stop_event.is_set():
+                success, frame = cap.read()
+                if not success:
+                    print("摄像头读取失败")
+                    return
+                slot.put(frame, time.monotonic())
+        finally:
+            cap.release()
+
+
+class VideoReplaySource(VideoSource):
+    """
+    回放视频文件，用于在没有摄像头的环境中复现和评估手势识别。
+    实时回放时按文件的帧率放帧，行为和摄像头相同；否则尽快读取。
+    """
+    name = "video-replay"
+
+    def __init__(self, path, realtime=True, loop=False):
+        """
+        Args:
+            path (str): 视频文件路径
+            realtime (bool): 是否按文件的帧率放帧
+            loop (bool): 播放完之后是否从头开始
+        """
+        super().__init__()
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.frames_read = 0
+
+    def _run(self, slot):
+        import cv2
+        cap = cv2.VideoCapture(self.path)
+        try:
+            if not cap.isOpened():
+                print(f"无法打开视频文件: {self.path}")
+                return
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            next_time = time.monotonic()
+            while not self._stop_event.is_set():
+                success, frame = cap.read()
+                if not success:
+                    if not self.loop:
+                        return
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                if self.realtime:
+                    next_time += 1.0 / fps
+                    delay = next_time - time.monotonic()
+                    if delay > 0:
+                        self._stop_event.wait(delay)
+                self.frames_read += 1
+                slot.put(frame, time.monotonic())
+        finally:
+            cap.release()
@@ -2,11 +2,13 @@ from PyQt5.QtWidgets import (QMainWindow, QLabel, QApplication, QMenu, QAction,
                             QSlider, QWidgetAction, QWidget, QVBoxLayout, QHBoxLayout, 
                             QSizePolicy, QInputDialog, QMessageBox, QSystemTrayIcon, 
                             QDialog, QSpinBox, QFormLayout, QPushButton, QCheckBox,
-                            QFrame, QTabWidget, QListWidget, QListWidgetItem, QGroupBox)
-from PyQt5.QtCore import Qt, QTimer, QPoint, QRect, QSize
+                            QFrame, QTabWidget, QGroupBox,
+                            QListView, QLineEdit)
+from PyQt5.QtCore import Qt, QTimer, QPoint, QRect, QSize, QSortFilterProxyModel
 from PyQt5.QtGui import QPixmap, QTransform, QPainter, QColor, QFont, QImage, QIcon
 import sys
 import os
+from pet_window_list_model import WindowListModel
 
 class TomatoSettingsDialog(QDialog):
     """番茄钟设置对话框，风格与健康提醒设置一致"""
@@ -185,9 +187,20 @@ class InteractiveWindowDialog(QDialog):
         
         layout.addWidget(self.tab_widget)
         
-        # 创建列表控件
-        self.window_list = QListWidget()
-        self.window_list.setSelectionMode(QListWidget.MultiSelection)
+        # 搜索框：按标题过滤当前窗口列表
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("搜索窗口标题")
+        self.search_edit.setClearButtonEnabled(True)
+        self.current_layout.addWidget(self.search_edit)
+        
+        # 创建列表视图：由窗口列表模型提供数据，只绘制可见的行
+        self.window_model = None
+        self.filter_model = QSortFilterProxyModel(self)
+        self.filter_model.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.search_edit.textChanged.connect(self.filter_model.setFilterFixedString)
+        self.window_list = QListView()
+        self.window_list.setUniformItemSizes(True)  # 行高一致，几百个窗口也不需要逐行计算布局
+        self.window_list.setModel(self.filter_model)
         self.current_layout.addWidget(self.window_list)
         
         # 创建预设窗口选项
@@ -245,34 +258,31 @@ class InteractiveWindowDialog(QDialog):
         if not self.interaction_handler:
             return
             
-        # 获取当前可见的窗口
-        visible_windows = self.interaction_handler.list_visible_windows()
-        
-        # 添加到列表控件
-        for window in visible_windows:
-            item = QListWidgetItem(window["title"])
-            item.setData(Qt.UserRole, window["title"])  # 存储窗口标题作为数据
-            self.window_list.addItem(item)
+        # 模型直接读取共享的窗口跟踪器，不重新枚举窗口，之后随窗口变化增量更新
+        self.window_model = WindowListModel(self.interaction_handler.window_tracker, self)
+        self.filter_model.setSourceModel(self.window_model)
+        # 对话框关闭后不再跟随窗口变化
+        self.finished.connect(self.window_model.detach)
     
     def get_selected_windows(self):
         """获取选中的窗口列表"""
         selected_windows = []
         
         # 获取总体设置选项卡中选中的预设窗口
-        for checkbox in self.preset_checkboxes:
-            if checkbox.isChecked():
-                window_title = checkbox.text()
+        checked_presets = [checkbox.text() for checkbox in self.preset_checkboxes if checkbox.isChecked()]
+        if checked_presets and self.interaction_handler:
+            # 所有预设共用同一份窗口快照，标题只折叠一次
+            titles = [window.title.casefold()
+                      for window in self.interaction_handler.window_tracker.windows_top_to_bottom()]
+            for window_title in checked_presets:
                 # 查找匹配的窗口
-                if self.interaction_handler:
-                    windows = self.interaction_handler._find_window_geometry(window_title, "*")
-                    if windows:
-                        selected_windows.append({"title": window_title, "class_name": "*"})
-        
-        # 获取当前窗口选项卡中选中的项
-        for index in range(self.window_list.count()):
-            item = self.window_list.item(index)
-            if item.isSelected():
-                window_title = item.data(Qt.UserRole)
+                folded = window_title.casefold()
+                if any(folded in title for title in titles):
+                    selected_windows.append({"title": window_title, "class_name": "*"})
+        
+        # 获取当前窗口选项卡中勾选的项
+        if self.window_model is not None:
+            for window_title in self.window_model.checked_titles():
                 selected_windows.append({"title": window_title, "class_name": "*"})
         
         return selected_windows
@@ -619,6 +629,10 @@ class PetDisplay(QMainWindow):
             # 如果当前有显示的图像，重新设置图像
             if hasattr(self, 'current_pixmap') and self.current_pixmap and not self.current_pixmap.isNull():
                 self.update_image_pixmap(self.current_pixmap, self.current_flip_horizontal)
+            
+            # 大小改变后脚底位置也改变了，重新检查是否站在平台上
+            if hasattr(self, 'interaction_handler'):
+                self.interaction_handler._check_falling()
         except Exception as e:
             print(f"调整大小时出错: {str(e)}")
 
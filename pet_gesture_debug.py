@@ -0,0 +1,84 @@
+import cv2
+import mediapipe as mp
+
+
+class CompatibleLandmark:
+    """把 Tasks API 的 NormalizedLandmark 包装成 drawing_utils 需要的 protobuf 风格对象"""
+    __slots__ = ("x", "y", "z", "_visibility")
+
+    def __init__(self, x, y, z, visibility=None):
+        self.x = x
+        self.y = y
+        self.z = z
+        self._visibility = visibility
+
+    def HasField(self, field):
+        if field == 'visibility':
+            return self._visibility is not None
+        return False
+
+    @property
+    def visibility(self):
+        return self._visibility if self._visibility is not None else 0.0
+
+
+class CompatibleLandmarkList:
+    """drawing_utils.draw_landmarks 需要的 landmark 列表对象"""
+    __slots__ = ("landmark",)
+
+    def __init__(self, landmarks):
+        self.landmark = [
+            CompatibleLandmark(
+                lm.x, lm.y, lm.z,
+                lm.visibility if hasattr(lm, 'visibility') else None
+            ) for lm in landmarks
+        ]
+
+
+class GestureDebugRenderer:
+    """
+    手势识别的调试画面：把手部标记和状态文字画在识别用的画面上。
+
+    只有显示调试窗口时才挂到 GestureDetectionWorker 上，没有挂上时识别线程不做任何
+    颜色转换、绘制或文字格式化。
+    """
+    def __init__(self):
+        self.mp_hands = mp.solutions.hands
+        self.mp_draw = mp.solutions.drawing_utils
+        self.mp_drawing_styles = mp.solutions.drawing_styles
+
+    def render(self, rgb_frame, hand_landmarks, status_text):
+        """
+        生成调试画面
+
+        Args:
+            rgb_frame (np.ndarray): 识别用的RGB画面
+            hand_landmarks (list): 识别结果中每只手的标记点
+            status_text (list): 要显示的状态文字，每项一行
+
+        Returns:
+            np.ndarray: 画好标记的BGR画面（新的数组）
+        """
+        debug_frame = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR)
+
+        # 绘制手部标记
+        for landmarks in hand_landmarks:
+            self.mp_draw.draw_landmarks(
+                debug_frame,
+                CompatibleLandmarkList(landmarks),
+                self.mp_hands.HAND_CONNECTIONS,
+                self.mp_drawing_styles.get_default_hand_landmarks_style(),
+                self.mp_drawing_styles.get_default_hand_connections_style()
+            )
+
+        for i, text in enumerate(status_text):
+            cv2.putText(
+                debug_frame,
+                text,
+                (10, 30 + i * 30),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                1,
+                (0, 255, 0),
+                2
+            )
+        return debug_frame
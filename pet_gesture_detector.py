@@ -1,118 +1,177 @@
 import cv2
 import mediapipe as mp
 import numpy as np
-from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtCore import Qt, QCoreApplication, QMetaObject, QObject, QThread, QTimer, pyqtSignal, pyqtSlot
 import time
+from pet_camera import CameraSource, FrameSlot
+from pet_gesture_debug import GestureDebugRenderer
 from pet_interaction import PetState
 
-class PetGestureDetector(QObject):
+
+class MotionGate:
     """
-    使用MediaPipe实现手势检测，用于控制桌面宠物。
-    
-    手势定义：
-    1. 抓取手势：手掌闭合
-    2. 释放手势：手掌张开
-    3. 挥手手势：手掌左右移动
-    4. 移动手势：手掌持续左右移动控制行走
+    识别之前的运动检测：把画面缩小成灰度小图，和上一次的小图逐像素比较，
+    平均差值超过阈值就认为画面中有运动。缩小后只有几千个像素，
+    计算量相对手势识别可以忽略。
     """
-    
-    def __init__(self, interaction_handler):
+    def __init__(self, size=(64, 48), threshold=4.0):
         """
-        初始化手势检测器
-        
         Args:
-            interaction_handler: PetInteraction实例，用于控制宠物行为
+            size (tuple): 比较用的小图尺寸（宽, 高）
+            threshold (float): 平均灰度差（0-255）超过这个值算作运动
+        """
+        self.size = size
+        self.threshold = threshold
+        self.score = 0.0       # 最近一次的平均灰度差
+        self._previous = None
+
+    def reset(self):
+        self._previous = None
+
+    def update(self, frame):
+        """
+        送入新的一帧
+
+        Args:
+            frame (np.ndarray): BGR 图像
+
+        Returns:
+            bool: 和上一帧相比是否有运动；第一帧总是返回True
+        """
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        previous = self._previous
+        self._previous = gray
+        if previous is None:
+            return True
+        self.score = float(cv2.absdiff(gray, previous).mean())
+        return self.score > self.threshold
+
+
+class GestureDetectionWorker(QObject):
+    """
+    手势识别工作对象，运行在独立的 QThread 中。
+
+    每个检测周期从 FrameSlot 取最新的一帧（识别慢时旧帧直接丢弃），完成翻转、颜色转换、
+    手势识别和判断，只有去抖之后的手势变化才通过信号发给GUI线程，GUI线程不做任何图像处理。
+
+    识别器默认使用 LIVE_STREAM 模式：帧带着单调递增的时间戳异步提交，已经跟踪到手时
+    MediaPipe 沿用上一帧的位置，不再对每一帧做完整的手掌检测；识别结果在 MediaPipe 的
+    线程中回调，转发到工作线程处理。config["running_mode"] 也可以是 "video"
+    （同步调用，同样跟踪）或 "image"（每帧独立检测，原来的方式）。
+
+    识别之前先经过 MotionGate：画面静止并且没有跟踪到手时，每 idle_detection_interval
+    才识别一次；一旦出现运动或者上一帧识别到了手，下一帧立即恢复到每帧识别。
+    CPU占用因此跟随用户的活动，而不是一直按摄像头帧率运行。
+    """
+    yeah_changed = pyqtSignal(bool)            # Yeah 手势开始或结束
+    walk_direction_changed = pyqtSignal(str)   # 行走方向 "left" / "right"，空字符串表示停止
+    debug_frame_ready = pyqtSignal(object)     # 画好标记的调试画面（只在挂上 debug_renderer 时发出）
+    _result_ready = pyqtSignal(object, object) # LIVE_STREAM 模式的识别结果和对应的RGB画面
+
+    def __init__(self, slot, config, model_path='gesture_recognizer.task'):
+        """
+        Args:
+            slot (FrameSlot): 摄像头帧的来源
+            config (dict): 检测器的配置，和 PetGestureDetector 共用
+            model_path (str): 手势识别模型文件
         """
         super().__init__()
-        self.interaction_handler = interaction_handler
-        
-        # 初始化MediaPipe
-        self.mp_hands = mp.solutions.hands
-        self.mp_draw = mp.solutions.drawing_utils
-        self.mp_drawing_styles = mp.solutions.drawing_styles
-        
+        self.slot = slot
+        self.config = config
+        self.model_path = model_path
+        self.gesture_recognizer = None   # 在工作线程中创建
+        self.detection_timer = None      # 在工作线程中创建
+        self.last_sequence = 0           # 上次处理的帧的序号
+        self.running_mode = None         # 当前识别器的运行模式
+        self.last_timestamp_ms = -1      # 上次提交的时间戳，VIDEO/LIVE_STREAM 模式要求严格递增
+        self.frames_submitted = 0        # 提交给识别器的帧数
+        self.results_received = 0        # 收到的识别结果数（LIVE_STREAM 模式下识别器忙时会丢帧）
+        self.debug_renderer = None       # GestureDebugRenderer，只在显示调试窗口时设置
+        self.motion_gate = MotionGate(threshold=config["motion_threshold"])
+        self.hands_visible = False       # 最近一次识别结果中是否有手
+        self.last_recognition = 0.0      # 最近一次提交识别的时间（time.monotonic）
+        self.frames_gated = 0            # 因为画面静止而跳过识别的帧数
+        self._result_ready.connect(self._on_async_result)
+
+        self._reset_state()
+
+    def _reset_state(self):
+        # 状态追踪
+        self.is_walking = False
+        self.current_direction = None
+        self.last_state_change = 0
+        self.is_in_yeah_state = False
+        self.yeah_frames_count = 0
+        self.release_count = 0         # 连续没有检测到当前手势的帧数
+        self.pending_direction = None  # 等待确认的行走方向
+        self.pending_count = 0         # 等待确认的方向已经连续出现的帧数
+
+    def _create_recognizer(self, running_mode):
         # 使用GestureRecognizer替代Hands
         BaseOptions = mp.tasks.BaseOptions
         GestureRecognizer = mp.tasks.vision.GestureRecognizer
         GestureRecognizerOptions = mp.tasks.vision.GestureRecognizerOptions
         VisionRunningMode = mp.tasks.vision.RunningMode
 
-        # 创建GestureRecognizer
+        modes = {
+            "image": VisionRunningMode.IMAGE,
+            "video": VisionRunningMode.VIDEO,
+            "live_stream": VisionRunningMode.LIVE_STREAM,
+        }
+        extra = {}
+        if running_mode == "live_stream":
+            extra["result_callback"] = self._on_live_stream_result
+
         options = GestureRecognizerOptions(
-            base_options=BaseOptions(model_asset_path='gesture_recognizer.task'),
-            running_mode=VisionRunningMode.IMAGE,
+            base_options=BaseOptions(model_asset_path=self.model_path),
+            running_mode=modes[running_mode],
             min_hand_detection_confidence=0.7,
             min_hand_presence_confidence=0.7,
             min_tracking_confidence=0.5,
-            num_hands=2
+            num_hands=2,
+            **extra
         )
-        self.gesture_recognizer = GestureRecognizer.create_from_options(options)
-        
-        # 创建视频捕获对象
-        self.cap = None
-        
-        # 创建定时器用于定期检测
-        self.detection_timer = QTimer()
-        self.detection_timer.timeout.connect(self._process_frame)
-        
-        # 状态追踪
-        self.is_walking = False
-        self.current_direction = None
-        self.last_state_change = 0
-        self.is_in_yeah_state = False
-        self.yeah_animation_started = False
-        self.yeah_frames_count = 0
-        
-        # 配置参数
-        self.config = {
-            "enabled": False,
-            "detection_interval": 50,     # 检测间隔（毫秒）
-            "palm_threshold": 0.6,        # 手掌张开阈值
-            "state_cooldown": 0.2,        # 状态改变冷却时间（秒）
-            "yeah_frames_threshold": 3,    # 连续检测到Yeah手势的帧数阈值
-            "show_debug_window": False    # 默认不显示调试窗口
-        }
-        
-        # 调试窗口名称
-        self.debug_window_name = "Hand Gesture Debug"
+        return GestureRecognizer.create_from_options(options)
 
+    @pyqtSlot()
     def start(self):
-        """启动手势检测"""
-        if not self.config["enabled"]:
-            return
-            
-        if self.cap is None:
-            self.cap = cv2.VideoCapture(0)
-            if not self.cap.isOpened():
-                print("无法打开摄像头")
-                return
-                
+        """开始识别（在工作线程中执行）"""
+        running_mode = self.config["running_mode"]
+        if self.gesture_recognizer is not None and self.running_mode != running_mode:
+            self.gesture_recognizer.close()
+            self.gesture_recognizer = None
+        if self.gesture_recognizer is None:
+            # 加载模型比较慢，放在工作线程中进行
+            self.gesture_recognizer = self._create_recognizer(running_mode)
+            self.running_mode = running_mode
+            self.last_timestamp_ms = -1
+        if self.detection_timer is None:
+            # 定时器必须在它所属的线程中创建
+            self.detection_timer = QTimer()
+            self.detection_timer.timeout.connect(self._process_frame)
+        self._reset_state()
+        self.last_sequence = 0
+        self.motion_gate.reset()
+        self.motion_gate.threshold = self.config["motion_threshold"]
+        self.hands_visible = False
+        self.last_recognition = 0.0
         self.detection_timer.start(self.config["detection_interval"])
-        print("手势检测已启动")
-        
-        if self.config["show_debug_window"]:
-            cv2.namedWindow(self.debug_window_name, cv2.WINDOW_NORMAL)
-            cv2.resizeWindow(self.debug_window_name, 640, 480)
 
+    @pyqtSlot()
     def stop(self):
-        """停止手势检测"""
-        self.detection_timer.stop()
-        if self.cap is not None:
-            self.cap.release()
-            self.cap = None
-        
-        if self.config["show_debug_window"]:
-            cv2.destroyWindow(self.debug_window_name)
-        
-        print("手势检测已停止")
+        """停止识别（在工作线程中执行）"""
+        if self.detection_timer is not None:
+            self.detection_timer.stop()
+        self._reset_state()
 
-    def set_enabled(self, enabled: bool):
-        """设置是否启用手势检测"""
-        self.config["enabled"] = enabled
-        if enabled:
-            self.start()
-        else:
-            self.stop()
+    @pyqtSlot()
+    def close(self):
+        """停止识别并释放识别器（在工作线程中执行）"""
+        self.stop()
+        if self.gesture_recognizer is not None:
+            self.gesture_recognizer.close()
+            self.gesture_recognizer = None
 
     def _calculate_palm_openness(self, hand_landmarks):
         """计算手掌张开程度"""
@@ -120,200 +179,339 @@ class PetGestureDetector(QObject):
         palm_center = np.array([hand_landmarks[0].x, hand_landmarks[0].y])
         finger_tips = [8, 12, 16, 20]  # 食指、中指、无名指、小指的指尖
         total_distance = 0
-        
+
         for tip_id in finger_tips:
             tip_pos = np.array([hand_landmarks[tip_id].x, hand_landmarks[tip_id].y])
             distance = np.linalg.norm(tip_pos - palm_center)
             total_distance += distance
-            
+
         palm_value = (total_distance - 0.2) / 0.2
         return np.clip(palm_value, 0, 1)
 
     def _process_frame(self):
-        """处理视频帧并检测手势"""
-        if hasattr(self, 'interaction_handler') and getattr(self.interaction_handler, 'tomato_lock_mode', False):
+        """处理最新的视频帧并检测手势"""
+        latest = self.slot.take(self.last_sequence)
+        if latest is None:
             return
-        if self.cap is None or not self.cap.isOpened():
-            return
-            
-        success, frame = self.cap.read()
-        if not success:
+        self.last_sequence, timestamp, frame = latest
+
+        # 画面静止、没有跟踪到手、也没有正在进行的手势时，降低识别频率
+        moving = self.motion_gate.update(frame)
+        active = self.hands_visible or self.is_walking or self.is_in_yeah_state
+        if (self.config["motion_gate"] and not moving and not active and
+                timestamp - self.last_recognition < self.config["idle_detection_interval"] / 1000):
+            self.frames_gated += 1
             return
-            
+        self.last_recognition = timestamp
+
         frame = cv2.flip(frame, 1)
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
+
         # 创建MediaPipe Image对象
         mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
-        
+
+        # 使用采集时的单调时间作为时间戳（毫秒），保证严格递增
+        timestamp_ms = max(int(timestamp * 1000), self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = timestamp_ms
+        self.frames_submitted += 1
+
         # 使用GestureRecognizer处理图像
-        recognition_result = self.gesture_recognizer.recognize(mp_image)
-        
-        # 准备调试画面
-        debug_frame = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR)
-        status_text = []
-        
-        if not recognition_result.gestures:
-            status_text = ["No hands detected"]
-            if self.is_in_yeah_state:
-                print("未检测到手，结束Yeah状态")
-                self.is_in_yeah_state = False
-                self.interaction_handler._set_state("STAND")
-            if self.is_walking:
-                print("停止行走")
-                self.interaction_handler.stop_walking()
-                self.is_walking = False
-                self.current_direction = None
-            self.yeah_frames_count = 0
-            self._show_debug_info(debug_frame, status_text)
+        if self.running_mode == "live_stream":
+            # 结果在 _on_live_stream_result 中回调
+            self.gesture_recognizer.recognize_async(mp_image, timestamp_ms)
             return
-        
-        current_time = time.time()
+        if self.running_mode == "video":
+            recognition_result = self.gesture_recognizer.recognize_for_video(mp_image, timestamp_ms)
+        else:
+            recognition_result = self.gesture_recognizer.recognize(mp_image)
+        self._handle_result(recognition_result, rgb_frame)
+
+    def _on_live_stream_result(self, recognition_result, output_image, timestamp_ms):
+        """LIVE_STREAM 模式的结果回调（在 MediaPipe 的线程中执行），转发到工作线程"""
+        self._result_ready.emit(recognition_result, output_image)
+
+    @pyqtSlot(object, object)
+    def _on_async_result(self, recognition_result, output_image):
+        if self.detection_timer is None or not self.detection_timer.isActive():
+            # 停止之后才到达的结果
+            return
+        self._handle_result(recognition_result, output_image.numpy_view())
+
+    def _handle_result(self, recognition_result, rgb_frame):
+        """根据一帧的识别结果判断手势"""
+        self.results_received += 1
+        self.hands_visible = bool(recognition_result.gestures)
+
         detected_yeah = False
         detected_hands = {"Left": False, "Right": False}
-        
+        hands = []   # 每只手的 (左右, 手势, 置信度, 张开程度)，调试画面使用
+
         # 处理每只手的手势
-        for hand_idx, (gestures, handedness, hand_landmarks) in enumerate(
-            zip(recognition_result.gestures, recognition_result.handedness, recognition_result.hand_landmarks)):
-            
-            # 创建一个兼容的 landmark 列表对象
-            class CompatibleLandmark:
-                def __init__(self, x, y, z, visibility=None):
-                    self.x = x
-                    self.y = y
-                    self.z = z
-                    self._visibility = visibility
-                
-                def HasField(self, field):
-                    if field == 'visibility':
-                        return self._visibility is not None
-                    return False
-                
-                @property
-                def visibility(self):
-                    return self._visibility if self._visibility is not None else 0.0
-
-            class CompatibleLandmarkList:
-                def __init__(self, landmarks):
-                    self.landmark = [
-                        CompatibleLandmark(
-                            lm.x, lm.y, lm.z,
-                            lm.visibility if hasattr(lm, 'visibility') else None
-                        ) for lm in landmarks
-                    ]
-            
-            landmark_list = CompatibleLandmarkList(hand_landmarks)
-            
-            # 绘制手部标记
-            self.mp_draw.draw_landmarks(
-                debug_frame,
-                landmark_list,
-                self.mp_hands.HAND_CONNECTIONS,
-                self.mp_drawing_styles.get_default_hand_landmarks_style(),
-                self.mp_drawing_styles.get_default_hand_connections_style()
-            )
-            
+        for gestures, handedness, hand_landmarks in zip(
+                recognition_result.gestures, recognition_result.handedness, recognition_result.hand_landmarks):
             # 获取手的类型（左手或右手）
             hand_type = "Left" if handedness[0].category_name == "Left" else "Right"
-            
+
             # 检查手势
             gesture_name = gestures[0].category_name
             gesture_score = gestures[0].score
-            status_text.append(f"{hand_type} Gesture: {gesture_name} ({gesture_score:.2f})")
-            
+            palm_value = None
+
             # 检测Victory/Yeah手势
             if gesture_name == "Victory" and gesture_score > 0.7:
                 detected_yeah = True
             else:
                 # 如果不是Victory手势，检查手掌开合状态
                 palm_value = self._calculate_palm_openness(hand_landmarks)
-                status_text.append(f"{hand_type} Palm: {palm_value:.2f}")
-                
                 if palm_value > self.config["palm_threshold"]:
                     detected_hands[hand_type] = True
-                    status_text.append(f"{hand_type} hand detected (open)")
-        
+            hands.append((hand_type, gesture_name, gesture_score, palm_value))
+
+        # 左手张开向右走，右手张开向左走
+        direction = None
+        if detected_hands["Left"] and not detected_hands["Right"]:
+            direction = "right"
+        elif detected_hands["Right"] and not detected_hands["Left"]:
+            direction = "left"
+
+        action = self._update_gestures(detected_yeah, direction, time.time())
+
+        # 只有显示调试窗口时才生成调试画面
+        renderer = self.debug_renderer
+        if renderer is not None:
+            status_text = self._debug_status(hands, action)
+            self.debug_frame_ready.emit(renderer.render(rgb_frame, recognition_result.hand_landmarks, status_text))
+
+    def _update_gestures(self, detected_yeah, direction, current_time):
+        """
+        根据这一帧的识别结果更新手势状态，去抖之后发出变化
+
+        Yeah 手势需要连续 yeah_frames_threshold 帧才开始，行走方向需要连续
+        walk_frames_threshold 帧才生效；两者都要连续 release_frames 帧没有检测到才结束，
+        偶尔漏检一帧不会让宠物停下来。
+
+        Args:
+            detected_yeah (bool): 这一帧是否检测到Yeah手势
+            direction (str): 这一帧张开的手对应的行走方向，没有时为None
+            current_time (float): 当前时间
+
+        Returns:
+            str: 这一帧发生的动作（调试显示用），没有时为None
+        """
         # 处理Yeah手势状态
         if detected_yeah:
             self.yeah_frames_count += 1
-            status_text.append(f"Yeah frames: {self.yeah_frames_count}/{self.config['yeah_frames_threshold']}")
-            
-            if (self.yeah_frames_count >= self.config['yeah_frames_threshold'] and 
-                not self.is_in_yeah_state):
+            self.release_count = 0
+
+            if (self.yeah_frames_count >= self.config['yeah_frames_threshold'] and
+                    not self.is_in_yeah_state):
                 print("检测到Yeah手势！")
-                status_text.append("Yeah gesture detected!")
                 self.is_in_yeah_state = True
-                
-                if self.is_walking:
-                    print("尝试停止行走")
-                    self.interaction_handler.stop_walking()
-                    self.is_walking = False
-                    self.current_direction = None
-                
-                # 使用 _set_state 来播放 happy 动画
-                self.interaction_handler._set_state(PetState.HAPPY_BEGIN)
-                self.yeah_animation_started = True
-            
-            self._show_debug_info(debug_frame, status_text)
-            return
-        
+                self._set_walking(None, current_time)
+                self.yeah_changed.emit(True)
+                return "Yeah gesture detected!"
+            return None
+
         # 如果没有检测到Yeah手势
         self.yeah_frames_count = 0
         if self.is_in_yeah_state:
-            print("Yeah手势结束")
-            status_text.append("Yeah gesture ended")
-            self.is_in_yeah_state = False
-            self.interaction_handler._set_state(PetState.STAND)
-            self._show_debug_info(debug_frame, status_text)
-            return
-        
+            self.release_count += 1
+            if self.release_count >= self.config["release_frames"]:
+                print("Yeah手势结束")
+                self.is_in_yeah_state = False
+                self.release_count = 0
+                self.yeah_changed.emit(False)
+                return "Yeah gesture ended"
+            return None
+
         # 处理行走控制
-        new_direction = None
-        if detected_hands["Left"] and not detected_hands["Right"]:
-            new_direction = "right"
-        elif detected_hands["Right"] and not detected_hands["Left"]:
-            new_direction = "left"
-        
-        if new_direction:
-            if (not self.is_walking or 
-                (new_direction != self.current_direction and 
-                 current_time - self.last_state_change > self.config["state_cooldown"])):
-                
-                self.current_direction = new_direction
-                self.last_state_change = current_time
-                
-                if not self.is_walking:
-                    print(f"开始行走，方向：{new_direction}")
-                    status_text.append(f"Action: Start walking {new_direction}")
-                else:
-                    print(f"改变方向：{new_direction}")
-                    status_text.append(f"Action: Change direction to {new_direction}")
-                
-                self.is_walking = True
-                self.interaction_handler.start_walking(new_direction)
+        if direction == self.pending_direction:
+            self.pending_count += 1
         else:
+            self.pending_direction = direction
+            self.pending_count = 1
+
+        if direction:
+            if (self.pending_count >= self.config["walk_frames_threshold"] and
+                    (not self.is_walking or
+                     (direction != self.current_direction and
+                      current_time - self.last_state_change > self.config["state_cooldown"]))):
+                self._set_walking(direction, current_time)
+                return f"Action: Walk {direction}"
+        elif self.is_walking and self.pending_count >= self.config["release_frames"]:
+            self._set_walking(None, current_time)
+            return "Action: Stop walking"
+        return None
+
+    def _set_walking(self, direction, current_time):
+        """改变行走状态并通知GUI线程"""
+        if direction is None:
             if self.is_walking:
                 print("停止行走")
-                status_text.append("Action: Stop walking")
-                self.interaction_handler.stop_walking()
                 self.is_walking = False
                 self.current_direction = None
-        
-        self._show_debug_info(debug_frame, status_text)
-
-    def _show_debug_info(self, debug_frame, status_text):
-        """显示调试信息"""
-        for i, text in enumerate(status_text):
-            cv2.putText(
-                debug_frame,
-                text,
-                (10, 30 + i * 30),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1,
-                (0, 255, 0),
-                2
-            )
-        
+                self.walk_direction_changed.emit("")
+            return
+        if not self.is_walking:
+            print(f"开始行走，方向：{direction}")
+        else:
+            print(f"改变方向：{direction}")
+        self.is_walking = True
+        self.current_direction = direction
+        self.last_state_change = current_time
+        self.walk_direction_changed.emit(direction)
+
+    def _debug_status(self, hands, action):
+        """调试画面上显示的状态文字"""
+        if not hands:
+            status_text = ["No hands detected"]
+        else:
+            status_text = []
+            for hand_type, gesture_name, gesture_score, palm_value in hands:
+                status_text.append(f"{hand_type} Gesture: {gesture_name} ({gesture_score:.2f})")
+                if palm_value is not None:
+                    status_text.append(f"{hand_type} Palm: {palm_value:.2f}")
+                    if palm_value > self.config["palm_threshold"]:
+                        status_text.append(f"{hand_type} hand detected (open)")
+        if self.yeah_frames_count:
+            status_text.append(f"Yeah frames: {self.yeah_frames_count}/{self.config['yeah_frames_threshold']}")
+        if action:
+            status_text.append(action)
+        return status_text
+
+
+class PetGestureDetector(QObject):
+    """
+    使用MediaPipe实现手势检测，用于控制桌面宠物。
+
+    手势定义：
+    1. 抓取手势：手掌闭合
+    2. 释放手势：手掌张开
+    3. 挥手手势：手掌左右移动
+    4. 移动手势：手掌持续左右移动控制行走
+
+    摄像头在采集线程中读取，识别在 GestureDetectionWorker 的线程中进行，
+    GUI线程只接收去抖之后的手势变化并控制宠物。调试窗口显示时才给识别线程挂上
+    GestureDebugRenderer，隐藏时识别线程只做采集、识别和判断。
+    """
+    _start_requested = pyqtSignal()
+    _stop_requested = pyqtSignal()
+
+    # 默认配置参数
+    DEFAULT_CONFIG = {
+        "enabled": False,
+        "detection_interval": 50,     # 检测间隔（毫秒）
+        "palm_threshold": 0.6,        # 手掌张开阈值
+        "state_cooldown": 0.2,        # 状态改变冷却时间（秒）
+        "yeah_frames_threshold": 3,    # 连续检测到Yeah手势的帧数阈值
+        "walk_frames_threshold": 2,   # 连续检测到同一行走方向的帧数阈值
+        "release_frames": 2,          # 连续多少帧没有检测到手势才结束
+        "running_mode": "live_stream",  # 识别器运行模式：live_stream / video / image
+        "motion_gate": True,          # 画面静止时降低识别频率
+        "motion_threshold": 4.0,      # 缩小后的平均灰度差超过这个值算作运动
+        "idle_detection_interval": 500,  # 画面静止并且没有手时的识别间隔（毫秒）
+        "show_debug_window": False    # 默认不显示调试窗口
+    }
+
+    def __init__(self, interaction_handler, video_source=None):
+        """
+        初始化手势检测器
+
+        Args:
+            interaction_handler: PetInteraction实例，用于控制宠物行为
+            video_source (VideoSource): 视频来源，默认为第一个摄像头
+        """
+        super().__init__()
+        self.interaction_handler = interaction_handler
+
+        # 配置参数
+        self.config = dict(self.DEFAULT_CONFIG)
+
+        # 摄像头帧的最新帧缓冲区和视频来源
+        self.frame_slot = FrameSlot()
+        self.video_source = video_source if video_source is not None else CameraSource(0)
+
+        # 创建识别线程
+        self.worker = GestureDetectionWorker(self.frame_slot, self.config)
+        self.thread = QThread()
+        self.worker.moveToThread(self.thread)
+        self._start_requested.connect(self.worker.start)
+        self._stop_requested.connect(self.worker.stop)
+        self.worker.yeah_changed.connect(self._on_yeah_changed)
+        self.worker.walk_direction_changed.connect(self._on_walk_direction_changed)
+        self.worker.debug_frame_ready.connect(self._show_debug_frame)
+        self.thread.start()
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+
+        self.is_running = False
+
+        # 调试窗口名称
+        self.debug_window_name = "Hand Gesture Debug"
+
+    def start(self):
+        """启动手势检测"""
+        if not self.config["enabled"] or self.is_running:
+            return
+
+        self.is_running = True
+        self.frame_slot.clear()
+        self.video_source.start(self.frame_slot)
+        self._start_requested.emit()
+        print("手势检测已启动")
+
+        if self.config["show_debug_window"]:
+            cv2.namedWindow(self.debug_window_name, cv2.WINDOW_NORMAL)
+            cv2.resizeWindow(self.debug_window_name, 640, 480)
+
+    def stop(self):
+        """停止手势检测"""
+        if self.is_running:
+            self.is_running = False
+            self._stop_requested.emit()
+        self.video_source.close()
+
+        if self.config["show_debug_window"]:
+            cv2.destroyWindow(self.debug_window_name)
+
+        print("手势检测已停止")
+
+    def shutdown(self):
+        """停止采集和识别线程，释放识别器"""
+        self.is_running = False
+        self.video_source.close()
+        if self.thread.isRunning():
+            # 等工作线程停止定时器并关闭识别器之后再结束线程
+            QMetaObject.invokeMethod(self.worker, "close", Qt.BlockingQueuedConnection)
+            self.thread.quit()
+            self.thread.wait(2000)
+
+    def set_enabled(self, enabled: bool):
+        """设置是否启用手势检测"""
+        self.config["enabled"] = enabled
+        if enabled:
+            self.start()
+        else:
+            self.stop()
+
+    def _on_yeah_changed(self, active):
+        """Yeah 手势开始时播放 happy 动画，结束时回到站立（GUI线程中执行）"""
+        if not self.is_running or getattr(self.interaction_handler, 'tomato_lock_mode', False):
+            return
+        self.interaction_handler._set_state(PetState.HAPPY_BEGIN if active else PetState.STAND)
+
+    def _on_walk_direction_changed(self, direction):
+        """按手势开始、改变方向或停止行走（GUI线程中执行）"""
+        if not self.is_running or getattr(self.interaction_handler, 'tomato_lock_mode', False):
+            return
+        if direction:
+            self.interaction_handler.start_walking(direction)
+        else:
+            self.interaction_handler.stop_walking()
+
+    def _show_debug_frame(self, debug_frame):
+        """显示调试画面（GUI线程中执行）"""
         if self.config["show_debug_window"]:
             cv2.imshow(self.debug_window_name, debug_frame)
             cv2.waitKey(1)
@@ -322,6 +520,8 @@ class PetGestureDetector(QObject):
         """显示调试窗口"""
         if not self.config["show_debug_window"]:
             self.config["show_debug_window"] = True
+            # 挂上调试画面之后识别线程才开始绘制
+            self.worker.debug_renderer = GestureDebugRenderer()
             if self.config["enabled"]:
                 cv2.namedWindow(self.debug_window_name, cv2.WINDOW_NORMAL)
                 cv2.resizeWindow(self.debug_window_name, 640, 480)
@@ -331,6 +531,7 @@ class PetGestureDetector(QObject):
         """隐藏调试窗口"""
         if self.config["show_debug_window"]:
             self.config["show_debug_window"] = False
+            self.worker.debug_renderer = None
             cv2.destroyWindow(self.debug_window_name)
             print("已隐藏手势识别调试窗口")
 
@@ -343,6 +544,9 @@ class PetGestureDetector(QObject):
 
     def __del__(self):
         """清理资源"""
-        self.stop()
-        self.gesture_recognizer.close()
-        cv2.destroyAllWindows() 
\ No newline at end of file
+        try:
+            self.shutdown()
+        except RuntimeError:
+            # 程序退出时Qt对象可能已经先被销毁，aboutToQuit 时已经关闭过
+            pass
+        cv2.destroyAllWindows()
@@ -1,3 +1,4 @@
+import math
 import time
 import random
 from enum import Enum, auto
@@ -5,9 +6,13 @@ from PyQt5.QtCore import Qt, QPoint, QTimer, QRect
 from PyQt5.QtGui import QPixmap # Import QPixmap
 import os
 from PyQt5.QtWidgets import QApplication
-import win32gui
-import win32con
 from pet_tomato_timer import TomatoState, PetTomatoTimer
+from pet_window_tracker import PetWindowTracker
+from pet_platform_store import PetPlatformStore, PlatformChange
+from pet_platform_index import PlatformIndex
+from pet_walkable_surfaces import WalkableSurfaces
+from pet_window_matcher import WindowMatcher
+from pet_work_area import PetWorkArea
 
 class PetState(Enum):
     """
@@ -136,6 +141,15 @@ class PetInteraction:
     处理宠物的交互逻辑、状态管理以及动画播放。
     这个类不直接与窗口显示打交道，而是通过PetDisplay实例来更新宠物的视觉表现。
     """
+    # 播放时不会被下落打断的过渡动画，失去平台时等动画结束再下落
+    FALL_DEFERRED_STATES = (
+        PetState.STAND_TO_IDLE,
+        PetState.WALK_END,
+        PetState.DANCE_TO_STAND,
+        PetState.AWAKENING,
+        PetState.FALL_END
+    )
+
     def __init__(self, pet_window, initial_state=PetState.IDLE):
         """
         初始化宠物交互处理器。
@@ -295,7 +309,15 @@ class PetInteraction:
                 "frames_dir": "sprites/dance/loop/", 
                 "prefix": "loop_", 
                 "count": 8,
-                "frame_duration": 125,  # 8 FPS
+                "frame_duration": 125,  # 8 FPS，检测不到节拍时使用
+                "frame_duration_range": (180, 90),  # 检测不到节拍时，强度为0和1对应的帧间隔
+                "frames_per_beat": 4,   # 检测到节拍时每拍切换几帧，帧切换对齐到拍点上
+                # 按音乐强度选择的变体，强度达到 min_intensity 时使用；变体可以用
+                # frames_dir/prefix/count 指定自己的动画帧，没有指定时使用上面的帧
+                "intensity_variants": [
+                    {"min_intensity": 0.0, "frames_per_beat": 2},   # 安静的歌：每拍两帧
+                    {"min_intensity": 0.4, "frames_per_beat": 4},
+                ],
                 "loops": -1  # 无限循环
             },
             # --- STAND_TO_DANCE (站立到跳舞) 动画 ---
@@ -460,9 +482,21 @@ class PetInteraction:
                  print(f"严重警告: 状态 {state} 未能加载任何动画帧! 请检查路径 {config.get('frames_dir','')}{config.get('prefix','')} 和图片文件。")
                  self.loaded_pixmaps[state] = []
 
+        # 跳舞的强度变体：(配置, 动画帧)，按 min_intensity 从低到高排列
+        dance_config = self.animations_config[PetState.DANCE]
+        self.dance_variants = []
+        for variant in sorted(dance_config.get("intensity_variants", []), key=lambda v: v["min_intensity"]):
+            pixmaps = self.loaded_pixmaps[PetState.DANCE]
+            if "frames_dir" in variant:
+                pixmaps = self._load_animation_pixmaps(self._generate_frame_paths(variant)) or pixmaps
+            self.dance_variants.append((variant, pixmaps))
+        self.dance_variant = 0  # 当前使用的变体
+
         # 动画播放定时器
         self.animation_timer = QTimer()
         self.animation_timer.timeout.connect(self._tick_animation) # 定时器触发时调用_tick_animation
+        self.beat_source = None  # 返回最新节拍估计 BeatInfo 的函数，由音乐检测器设置
+        self.intensity_source = None  # 返回 0-1 音乐强度的函数，由音乐检测器设置
         
         # 当前动画播放相关的状态变量
         self.current_animation_pixmaps = []    # 当前播放动画的帧路径列表
@@ -498,21 +532,42 @@ class PetInteraction:
         # 修改下坠相关的配置
         self.fall_config = {
             "enabled": True,           # 是否启用下坠功能
-            "platforms": [],           # 平台列表，每个元素是 {"rect": QRect, "type": str} 字典
-            "interactive_windows": [],  # 互动窗口列表，每个元素是 {"title": str, "class_name": str} 字典
+            "platforms": [],           # 平台列表，每个元素是 {"key": 平台键, "rect": QRect, "type": str} 字典，由平台存储维护
+            "interactive_windows": [],  # 互动窗口列表，每个元素是 {"title": str, "class_name": str} 字典，可选 "process_name": str
+            "walk_on_all_windows": True,  # 所有可见窗口露出的顶边都可以行走，关闭时只有最顶层互动窗口是平台
             "fall_speed": 10,          # 每帧下落的像素数
             "animation_interval": 33    # 下坠动画的更新间隔（毫秒）
         }
         
-        # 添加定时器用于检查下坠状态和更新平台
-        self.fall_check_timer = QTimer()
-        self.fall_check_timer.timeout.connect(self._check_falling)
-        self.fall_check_timer.start(self.fall_config["animation_interval"])  # 约30FPS
-        
-        # 添加定时器用于更新平台位置
-        self.platform_update_timer = QTimer()
-        self.platform_update_timer.timeout.connect(self._update_platforms)
-        self.platform_update_timer.start(1000)  # 每秒更新一次平台位置
+        # 平台存储：对平台快照做差异比较，原地维护 fall_config["platforms"]
+        # 不再定时轮询是否需要下落，只在脚下的平台改变或桌宠自己移动后检查
+        self.platform_store = PetPlatformStore(self.fall_config["platforms"])
+        self.platform_store.platforms_changed.connect(self._on_platforms_changed)
+        # 平台空间索引：支撑和落地查询不再线性扫描所有平台，平台变化时重建
+        self.platform_index = PlatformIndex()
+        self.support_platform_key = None  # 当前支撑桌宠的平台键，不在平台上时为None
+        self.ride_window = None  # 站在窗口上时为 (窗口句柄, 窗口矩形)，窗口移动时桌宠跟着移动
+        self.fall_check_pending = False  # 过渡动画期间失去了平台，动画结束后需要重新检查下落
+        self.platform_update_pending = False  # 已经安排了下一轮事件循环中的平台更新
+        # 可行走表面：按Z序裁剪出每个窗口露出的顶边线段，窗口变化时只重算受影响的区域
+        self.walkable_surfaces = WalkableSurfaces()
+        
+        # 窗口跟踪器：由窗口系统事件驱动，增量维护按Z序排列的窗口模型
+        # 窗口出现、消失、移动或Z序改变时才更新平台，不再每秒枚举所有窗口
+        # 拖动窗口时的大量移动事件按帧（16毫秒）合并成一次更新
+        self.window_tracker = PetWindowTracker(coalesce_interval=16)
+        # 同一轮事件循环里的窗口变化和工作区变化合并成一次平台更新
+        self.window_tracker.windows_changed.connect(self._schedule_platform_update)
+        # 互动窗口匹配器：规则编译成一个多模式匹配器，匹配结果按窗口句柄缓存，标题改变或窗口消失时失效
+        self.window_matcher = WindowMatcher()
+        self.window_tracker.window_title_changed.connect(self.window_matcher.forget)
+        self.window_tracker.window_removed.connect(self.window_matcher.forget)
+        self.window_tracker.start()
+        self.last_top_window_title = None  # 上次找到的最顶层互动窗口标题，用于只在变化时打印
+        
+        # 工作区服务：任务栏可以在任意一边，工作区改变（例如移动任务栏、切换自动隐藏）时才更新平台
+        self.work_area = PetWorkArea()
+        self.work_area.work_area_changed.connect(self._schedule_platform_update)
         
         # 初始化时获取任务栏位置
         self._update_platforms()
@@ -530,6 +585,9 @@ class PetInteraction:
         self.is_reminder_active = False  # 标记是否有提醒正在显示
         
         self._set_state(initial_state)
+        
+        # 检查初始位置下方是否有平台
+        self._check_falling()
 
     def _generate_frame_paths(self, config):
         """
@@ -676,6 +734,12 @@ class PetInteraction:
         
         old_state = self.current_state
         self.current_state = new_state
+
+        # 过渡动画期间脚下的平台消失了：动画结束后（整个状态转换完成之后）重新检查是否需要下落
+        if (self.fall_check_pending and old_state in self.FALL_DEFERRED_STATES
+                and new_state not in self.FALL_DEFERRED_STATES):
+            self.fall_check_pending = False
+            QTimer.singleShot(0, self._check_falling)
         
         # 如果是FALL_END状态，且在番茄钟模式下，修改next_state为对应的番茄钟状态
         if new_state == PetState.FALL_END and self.tomato_lock_mode:
@@ -739,6 +803,9 @@ class PetInteraction:
         
         # 准备动画帧序列
         current_pixmap_sequence = list(pixmaps_for_state)
+        if new_state == PetState.DANCE and self.dance_variants:
+            self.dance_variant = self._select_dance_variant()
+            current_pixmap_sequence = list(self.dance_variants[self.dance_variant][1])
         if self.current_animation_active_config.get("reverse_playback", False):
             current_pixmap_sequence.reverse()
         
@@ -757,6 +824,8 @@ class PetInteraction:
         # 如果有多个帧且设置了帧持续时间，或者是下坠状态，启动动画
         if (len(self.current_animation_pixmaps) > 1 and self.current_animation_active_config.get("frame_duration", 0) > 0) or new_state == PetState.FALL:
             frame_duration = self.current_animation_active_config.get("frame_duration", 33)  # 默认33ms
+            if new_state == PetState.DANCE:
+                frame_duration = self._dance_frame_interval() or frame_duration
             print(f"DPet Debug: 启动动画定时器 - 帧间隔: {frame_duration}ms")
             self.animation_timer.start(frame_duration)
             
@@ -789,19 +858,18 @@ class PetInteraction:
             landed = False
             landing_y = new_y
             
-            # 检查所有平台（包括任务栏和互动窗口）
-            for platform in self.fall_config["platforms"]:
+            # 找到下方最近的平台（包括任务栏和互动窗口），检查这一帧是否会碰到它
+            platform = self._find_landing_platform(
+                current_pos.x(), current_pos.y(),
+                window_size.width(), window_size.height()
+            )
+            if platform is not None and new_y + window_size.height() >= platform["rect"].y():
+                # 落到平台上，精确对齐到平台顶部
                 platform_rect = platform["rect"]
-                # 检查是否会碰到平台
-                if (new_y + window_size.height() >= platform_rect.y() and
-                        current_pos.y() + window_size.height() < platform_rect.y() and
-                        current_pos.x() + window_size.width() > platform_rect.x() and
-                        current_pos.x() < platform_rect.x() + platform_rect.width()):
-                    # 落到平台上，精确对齐到平台顶部
-                    print(f"落在{platform['type']}平台上，位置: {platform_rect.y()}")
-                    landed = True
-                    landing_y = platform_rect.y() - window_size.height()
-                    break
+                print(f"落在{platform['type']}平台上，位置: {platform_rect.y()}")
+                landed = True
+                landing_y = platform_rect.y() - window_size.height()
+                self._set_support_platform(platform)
             
             # 更新位置
             if landed:
@@ -835,6 +903,11 @@ class PetInteraction:
             # 一轮动画播放完成
             self.current_frame_index = 0
             self.current_animation_loops_done += 1
+
+            # 跳舞时每轮结束才切换强度变体，动作不会在中途跳变
+            if self.current_state == PetState.DANCE and self.dance_variants:
+                self.dance_variant = self._select_dance_variant()
+                self.current_animation_pixmaps = list(self.dance_variants[self.dance_variant][1])
             
             # 检查是否需要继续播放
             max_loops = self.current_animation_active_config.get("loops", -1)
@@ -872,12 +945,91 @@ class PetInteraction:
                     return
                 
                 self.pet_window.move(new_x, current_pos.y())
+                # 走出平台边缘时开始下落
+                if self._check_falling():
+                    return
         
         self.pet_window.update_image_pixmap(
             self.current_animation_pixmaps[self.current_frame_index],
             flip_horizontal
         )
 
+        # 跳舞时按节拍重新安排下一帧的时间
+        if self.current_state == PetState.DANCE:
+            interval = self._dance_frame_interval()
+            if interval:
+                self.animation_timer.start(interval)
+
+    def set_beat_source(self, source):
+        """
+        设置节拍来源
+
+        Args:
+            source (callable): 无参数，返回最新的 BeatInfo 或 None
+        """
+        self.beat_source = source
+
+    def set_intensity_source(self, source):
+        """
+        设置音乐强度来源
+
+        Args:
+            source (callable): 无参数，返回 0-1 的音乐强度
+        """
+        self.intensity_source = source
+
+    def _dance_intensity(self):
+        return self.intensity_source() if self.intensity_source is not None else None
+
+    def _select_dance_variant(self):
+        """
+        按当前强度选择跳舞变体，降级需要强度低于门槛0.1，避免在门槛附近来回切换
+
+        Returns:
+            int: dance_variants 中的下标
+        """
+        intensity = self._dance_intensity()
+        if intensity is None:
+            return min(self.dance_variant, len(self.dance_variants) - 1)
+        index = 0
+        for i, (variant, _) in enumerate(self.dance_variants):
+            threshold = variant["min_intensity"]
+            if i <= self.dance_variant:
+                threshold -= 0.1
+            if intensity >= threshold:
+                index = i
+        return index
+
+    def _dance_frame_interval(self):
+        """
+        计算跳舞动画到下一帧的间隔，使帧切换落在节拍的细分点上；
+        没有节拍时按音乐强度在 frame_duration_range 之间调整帧间隔
+
+        Returns:
+            int: 间隔（毫秒）；既没有节拍也没有强度信息时返回None，使用配置的固定帧间隔
+        """
+        config = self.animations_config[PetState.DANCE]
+        beat = self.beat_source() if self.beat_source is not None else None
+        if beat is None:
+            intensity = self._dance_intensity()
+            if intensity is None or "frame_duration_range" not in config:
+                return None
+            quiet, loud = config["frame_duration_range"]
+            return int(round(quiet + (loud - quiet) * intensity))
+        frames_per_beat = config.get("frames_per_beat", 4)
+        if self.dance_variants:
+            frames_per_beat = self.dance_variants[self.dance_variant][0].get("frames_per_beat", frames_per_beat)
+        step = beat.period / frames_per_beat
+        # 太快或太慢的歌曲按两倍调整每拍的帧数，帧间隔保持在 80-250ms
+        while step < 0.08:
+            step *= 2
+        while step > 0.25:
+            step /= 2
+        # 距离上一拍已经过了多少个细分，下一帧落在至少半个细分之后的细分点上
+        elapsed = beat.phase_at(time.monotonic()) * beat.period / step
+        steps = math.floor(elapsed + 0.5) + 1
+        return max(1, int(round((steps - elapsed) * step * 1000)))
+
     def handle_mouse_press(self, event):
         """
         处理鼠标按下事件。
@@ -885,6 +1037,8 @@ class PetInteraction:
         if self.tomato_lock_mode and event.button() != Qt.RightButton:
             # 只允许拖拽
             if event.button() == Qt.LeftButton:
+                # 任何位置按下都可以拖动，先记录拖动偏移
+                self.drag_position = event.globalPos() - self.pet_window.frameGeometry().topLeft()
                 # 拖拽区域判断
                 click_pos = event.pos()
                 window_height = self.pet_window.height()
@@ -951,6 +1105,12 @@ class PetInteraction:
         """
         处理鼠标释放事件。
         """
+        if event.button() == Qt.LeftButton and self.current_state != PetState.CATCH:
+            # 没有进入CATCH的拖动（按在下部区域、底部透明区域或番茄钟模式的下部区域）
+            # 同样会移动窗口，松开时也要检查脚下是否还有平台
+            self._check_falling()
+            return
+
         if self.tomato_lock_mode:
             # 拖拽释放后恢复到番茄钟原状态
             if event.button() == Qt.LeftButton and self.current_state == PetState.CATCH:
@@ -980,8 +1140,7 @@ class PetInteraction:
                 # 如果需要下落，不执行其他状态转换
                 return
             
-            # 检查当前窗口是否是最顶层窗口 - 这部分现在是多余的，因为平台列表已经只包含最顶层窗口
-            # 但保留这段代码可以增加程序的健壮性
+            # 检查当前窗口是否是最顶层互动窗口：其他窗口的顶边也可以站立，但不触发互动
             current_pos = self.pet_window.pos()
             window_size = self.pet_window.size()
             is_on_platform, platform = self._is_on_platform(
@@ -1073,7 +1232,7 @@ class PetInteraction:
     def check_state_transitions(self):
         """
         检查并执行基于时间的状态自动转换。
-        包括检查下落、音乐状态、随机行走等。
+        包括检查音乐状态、随机行走等。下落检查由平台变化和桌宠移动触发，不在这里轮询。
         """
         # 如果正在下落，不执行任何状态转换
         if self.current_state == PetState.FALL:
@@ -1102,9 +1261,6 @@ class PetInteraction:
                 self._set_state(PetState.STAND_TO_DANCE)
                 return
         
-        # 检查下落状态
-        self._check_falling()
-        
         # 只在非手动行走状态下处理随机行走
         if not self.walk_config["is_manual_walking"]:
             # 处理随机行走状态
@@ -1348,83 +1504,144 @@ class PetInteraction:
                     self._set_state(PetState.DANCE_TO_STAND)
         print(f"音乐检测功能已{'启用' if enabled else '禁用'}")
 
+    def _schedule_platform_update(self, *args):
+        """在下一轮事件循环中更新平台，同一轮里的多次变化只重建一次"""
+        if not self.platform_update_pending:
+            self.platform_update_pending = True
+            QTimer.singleShot(0, self._run_scheduled_platform_update)
+
+    def _run_scheduled_platform_update(self):
+        # 期间已经直接更新过时不再重复
+        if self.platform_update_pending:
+            self._update_platforms()
+
     def _update_platforms(self):
-        """更新平台列表，只包含最顶层的可交互窗口和任务栏"""
-        # 清空当前平台列表
-        self.fall_config["platforms"].clear()
-        
-        # 获取任务栏位置（作为默认平台）
-        taskbar_rect = self._get_taskbar_geometry()
-        if taskbar_rect:
-            self.fall_config["platforms"].append({
-                "rect": taskbar_rect,
+        """
+        更新平台列表：任务栏，加上每个可见窗口露出的顶边线段（被上层窗口遮挡的部分不可行走）。
+        关闭 walk_on_all_windows 时只包含最顶层的可交互窗口。
+        新的平台快照交给平台存储做差异比较，只有变化的平台会被更新并发出变化事件。
+        """
+        self.platform_update_pending = False
+        platforms = []
+        
+        # 每个屏幕可用区域的底边（底部任务栏的顶边，或任务栏在其他边时的屏幕底边）作为默认平台
+        # 工作区服务会缓存结果，只有工作区改变时才重新读取
+        for area, floor_rect in self.work_area.floors():
+            platforms.append({
+                "key": "taskbar" if area.primary else ("taskbar", area.name),
+                "rect": floor_rect,
                 "type": "taskbar",
                 "is_top_window": False  # 任务栏不是互动窗口
             })
 
-        # 获取所有窗口的Z序（从顶层到底层）
-        z_order_windows = []
-        def enum_windows_callback(hwnd, windows):
-            if win32gui.IsWindowVisible(hwnd):
-                windows.append(hwnd)
-            return True
-        win32gui.EnumWindows(enum_windows_callback, z_order_windows)
+        # 从窗口跟踪器的模型中读取窗口（已按Z序从顶层到底层排列），不再重新枚举
+        # 太小的窗口（工具提示、托盘弹窗等）既不能行走也不遮挡
+        z_order_windows = [
+            window for window in self.window_tracker.windows_top_to_bottom()
+            if window.rect[2] - window.rect[0] > 50 and window.rect[3] - window.rect[1] > 50  # 确保窗口足够大
+        ]
 
-        # 只查找最顶层的可交互窗口
-        top_interactive_window = None
-        top_window_found = False
+        # 查找最顶层的可交互窗口，只有它会触发互动（规则没有变化时不会重新编译）
+        self.window_matcher.set_rules(self.fall_config["interactive_windows"])
+        top_interactive_window = self.window_matcher.first_match(z_order_windows)
+        
+        if self.fall_config["walk_on_all_windows"]:
+            # 只重新计算受本次窗口变化影响的区域
+            self.walkable_surfaces.update(z_order_windows)
+            for window in z_order_windows:
+                left, top, right, bottom = window.rect
+                for i, (segment_left, segment_right) in enumerate(self.walkable_surfaces.exposed_segments(window.hwnd)):
+                    platforms.append({
+                        "key": (window.hwnd, i),
+                        "rect": QRect(segment_left, top, segment_right - segment_left, bottom - top),
+                        "type": "window",
+                        "title": window.title,
+                        "hwnd": window.hwnd,
+                        "is_top_window": window is top_interactive_window  # 只有最顶层互动窗口可以互动
+                    })
+        elif top_interactive_window:
+            # 只添加最顶层的互动窗口到平台列表
+            rect = top_interactive_window.rect
+            platforms.append({
+                "key": top_interactive_window.hwnd,
+                "rect": QRect(rect[0], rect[1], rect[2]-rect[0], rect[3]-rect[1]),
+                "type": "window",
+                "title": top_interactive_window.title,
+                "hwnd": top_interactive_window.hwnd,
+                "is_top_window": True  # 这是最顶层窗口
+            })
         
-        for hwnd in z_order_windows:
-            window_title = win32gui.GetWindowText(hwnd)
-            
-            # 检查这个窗口是否在我们的互动窗口列表中
-            for interactive_window in self.fall_config["interactive_windows"]:
-                if interactive_window["title"].lower() in window_title.lower():
-                    # 尝试获取窗口位置
-                    try:
-                        rect = win32gui.GetWindowRect(hwnd)
-                        if rect[2] - rect[0] > 50 and rect[3] - rect[1] > 50:  # 确保窗口足够大
-                            top_interactive_window = {
-                                "rect": QRect(rect[0], rect[1], rect[2]-rect[0], rect[3]-rect[1]),
-                                "type": "window",
-                                "title": window_title,
-                                "is_top_window": True  # 这是最顶层窗口
-                            }
-                            print(f"找到最顶层互动窗口: {window_title}")
-                            top_window_found = True
-                            break  # 找到最顶层交互窗口后立即退出
-                    except Exception as e:
-                        print(f"获取窗口位置时出错: {str(e)}")
-            
-            # 如果找到了最顶层的可交互窗口，就不需要继续查找了
-            if top_window_found:
-                break
-        
-        # 只添加最顶层的互动窗口到平台列表
-        if top_interactive_window:
-            self.fall_config["platforms"].append(top_interactive_window)
-        
-        # 打印平台信息
-        platform_info = "\n".join([f"{i}: {p['title'] if 'title' in p else p['type']} (最顶层: {p.get('is_top_window', False)})" 
-                                   for i, p in enumerate(self.fall_config["platforms"])])
-        print(f"当前平台列表:\n{platform_info}")
-        
-        # 获取并打印最顶层窗口信息（无论是否可交互）
-        if z_order_windows:
-            top_window_title = win32gui.GetWindowText(z_order_windows[0])
-            print(f"当前最顶层窗口: {top_window_title}")
-            is_interactive = top_window_found
-            print(f"最顶层窗口是否可交互: {is_interactive}")
+        # 只在最顶层互动窗口改变时打印，窗口拖动等频繁事件不会刷屏
+        top_window_title = top_interactive_window.title if top_interactive_window else None
+        if top_window_title != self.last_top_window_title:
+            print(f"最顶层互动窗口: {top_window_title}")
+            self.last_top_window_title = top_window_title
         
         # 确保至少有一个平台
-        if not self.fall_config["platforms"]:
+        if not platforms:
             # 如果没有平台，使用屏幕底部作为默认平台
             screen = QApplication.primaryScreen().geometry()
-            self.fall_config["platforms"].append({
+            platforms.append({
+                "key": "default_bottom",
                 "rect": QRect(0, screen.height() - 10, screen.width(), 10),
                 "type": "default_bottom",
                 "is_top_window": False
             })
+        
+        self.platform_store.update(platforms)
+
+    def _on_platforms_changed(self, changes):
+        """
+        平台变化回调：重建空间索引；桌宠脚下的窗口移动时桌宠跟着移动，
+        只有脚下的平台移动、消失或被提升时才重新检查是否需要下落
+
+        Args:
+            changes (list): PlatformEvent 列表
+        """
+        self.platform_index.rebuild(self.fall_config["platforms"])
+        if self._ride_along():
+            # 跟随窗口移动后重新确定支撑平台，只有脚下真的没有平台了才会下落
+            self._check_falling()
+            return
+        if self.support_platform_key is None:
+            return
+        for change in changes:
+            if change.key == self.support_platform_key and change.kind != PlatformChange.ADDED:
+                print(f"脚下的平台发生变化({change.kind.name})，重新检查是否需要下落")
+                self._check_falling()
+                return
+
+    def _set_support_platform(self, platform):
+        """
+        记录支撑桌宠的平台；站在窗口上时同时记下窗口的位置，用于跟随窗口移动
+
+        Args:
+            platform (dict): 支撑平台，不在平台上时为None
+        """
+        self.support_platform_key = platform["key"] if platform is not None else None
+        window = self.window_tracker.windows.get(platform.get("hwnd")) if platform is not None else None
+        self.ride_window = (window.hwnd, window.rect) if window is not None else None
+
+    def _ride_along(self):
+        """
+        桌宠站在窗口上时，让桌宠跟随窗口移动相同的距离
+
+        Returns:
+            bool: 如果移动了桌宠返回True，否则返回False
+        """
+        if self.ride_window is None or self.current_state in (PetState.CATCH, PetState.FALL):
+            return False
+        hwnd, old_rect = self.ride_window
+        window = self.window_tracker.windows.get(hwnd)
+        if window is None or window.rect == old_rect:
+            return False  # 窗口消失时不跟随，由下落检查处理
+        self.ride_window = (hwnd, window.rect)
+        # 跟随顶边的移动；只有窗口宽度不变（整体拖动）时才水平跟随，拉伸窗口边缘时桌宠水平不动
+        dx = window.rect[0] - old_rect[0] if window.rect[2] - window.rect[0] == old_rect[2] - old_rect[0] else 0
+        dy = window.rect[1] - old_rect[1]
+        current_pos = self.pet_window.pos()
+        self.pet_window.move(current_pos.x() + dx, current_pos.y() + dy)
+        return True
 
     def _is_on_platform(self, pos_x, pos_y, width, height):
         """
@@ -1442,14 +1659,9 @@ class PetInteraction:
         """
         tolerance = 5  # 增加5像素的容差值
         
-        for platform in self.fall_config["platforms"]:
-            platform_rect = platform["rect"]
-            # 使用容差值进行检测
-            if (abs(platform_rect.y() - (pos_y + height)) <= tolerance and
-                pos_x + width > platform_rect.x() and 
-                pos_x < platform_rect.x() + platform_rect.width()):
-                return True, platform
-        return False, None
+        # 通过空间索引只检查顶边在容差范围内的平台
+        platform = self.platform_index.support(pos_x, pos_x + width, pos_y + height, tolerance)
+        return platform is not None, platform
 
     def _find_landing_platform(self, pos_x, pos_y, width, height):
         """
@@ -1464,21 +1676,8 @@ class PetInteraction:
         Returns:
             dict: 找到的平台信息，如果没找到则返回None
         """
-        nearest_platform = None
-        nearest_distance = float('inf')
-        
-        for platform in self.fall_config["platforms"]:
-            platform_rect = platform["rect"]
-            # 只检查在桌宠下方的平台
-            if (platform_rect.y() > pos_y + height and
-                pos_x + width > platform_rect.x() and
-                pos_x < platform_rect.x() + platform_rect.width()):
-                distance = platform_rect.y() - (pos_y + height)
-                if distance < nearest_distance:
-                    nearest_distance = distance
-                    nearest_platform = platform
-        
-        return nearest_platform
+        # 通过空间索引只检查与桌宠水平范围重叠的平台
+        return self.platform_index.nearest_below(pos_x, pos_x + width, pos_y + height)
 
     def _check_falling(self):
         """
@@ -1498,6 +1697,8 @@ class PetInteraction:
             current_pos.x(), current_pos.y(),
             window_size.width(), window_size.height()
         )
+        # 记录支撑平台，平台变化时据此判断是否需要重新检查
+        self._set_support_platform(platform if is_on_platform else None)
         
         # 如果当前是下坠状态且检测到平台
         if self.current_state == PetState.FALL and is_on_platform:
@@ -1513,19 +1714,13 @@ class PetInteraction:
         # 如果不在平台上且不是抓取状态，开始下坠
         # 注意：现在允许从任何状态（除了CATCH）转换到FALL
         if not is_on_platform and self.current_state != PetState.CATCH:
-            # 排除过渡动画状态
-            transition_states = [
-                PetState.STAND_TO_IDLE,
-                PetState.WALK_END,
-                PetState.DANCE_TO_STAND,
-                PetState.AWAKENING,
-                PetState.FALL_END
-            ]
-            
-            if self.current_state not in transition_states:
-                print(f"从{self.current_state}状态检测到没有平台，开始下坠")
-                self._set_state(PetState.FALL)
-                return True
+            # 过渡动画不打断，动画结束时 _set_state 会重新检查
+            if self.current_state in self.FALL_DEFERRED_STATES:
+                self.fall_check_pending = True
+                return False
+            print(f"从{self.current_state}状态检测到没有平台，开始下坠")
+            self._set_state(PetState.FALL)
+            return True
         return False
 
     def _handle_tomato_fall_end(self):
@@ -1558,105 +1753,41 @@ class PetInteraction:
         self._update_platforms()
         print(f"移除互动窗口: {title}")
 
-    def _get_taskbar_geometry(self):
-        """获取任务栏的位置和大小"""
-        try:
-            # 查找任务栏窗口
-            taskbar_hwnd = win32gui.FindWindow("Shell_TrayWnd", None)
-            if taskbar_hwnd:
-                # 获取任务栏矩形
-                rect = win32gui.GetWindowRect(taskbar_hwnd)
-                print(f"找到任务栏原始位置: {rect}")
-                
-                # 获取任务栏实际可见区域
-                visible_rect = win32gui.GetClientRect(taskbar_hwnd)
-                print(f"任务栏可见区域: {visible_rect}")
-                
-                # 使用实际的任务栏高度
-                taskbar_height = visible_rect[3]  # 使用可见区域的高度
-                screen = QApplication.primaryScreen().geometry()
-                
-                # 创建正确的任务栏矩形（在屏幕底部）
-                taskbar_rect = QRect(
-                    0,  # x 坐标始终从0开始
-                    screen.height() - taskbar_height,  # y 坐标是屏幕高度减去任务栏高度
-                    screen.width(),  # 宽度是整个屏幕宽度
-                    taskbar_height  # 高度是任务栏实际高度
-                )
-                
-                print(f"调整后的任务栏位置: {taskbar_rect.x()}, {taskbar_rect.y()}, {taskbar_rect.width()}, {taskbar_rect.height()}")
-                return taskbar_rect
-        except Exception as e:
-            print(f"获取任务栏位置时出错: {str(e)}")
-        
-        # 如果获取失败，使用屏幕底部的固定区域作为后备方案
-        screen = QApplication.primaryScreen()
-        if screen:
-            screen_geometry = screen.geometry()
-            taskbar_height = 40  # 假设任务栏高度为40像素
-            return QRect(
-                screen_geometry.x(),
-                screen_geometry.y() + screen_geometry.height() - taskbar_height,
-                screen_geometry.width(),
-                taskbar_height
-            )
-        return None
-
-    def _find_window_geometry(self, title, class_name):
-        """查找指定窗口的位置和大小，只返回顶层窗口"""
+    def _find_window_geometry(self, title, class_name, process_name="*"):
+        """
+        查找指定窗口的位置和大小，只返回顶层窗口。
+        标题或类名（不为"*"时）任意一个匹配就算找到，进程名不为"*"时还要求进程名匹配。
+        """
+        # 从窗口跟踪器的模型中查找，不再枚举所有窗口
+        rules = [{"title": title, "process_name": process_name}]
+        if class_name != "*":
+            # 空标题匹配任意窗口，只看类名
+            rules.append({"title": "", "class_name": class_name, "process_name": process_name})
+        matcher = WindowMatcher(rules)
         found_windows = []
-        
-        def callback(hwnd, windows):
-            if win32gui.IsWindowVisible(hwnd) and not win32gui.GetParent(hwnd):  # 只选择顶层窗口
-                window_title = win32gui.GetWindowText(hwnd)
-                window_class = win32gui.GetClassName(hwnd)
-                # 使用部分匹配而不是完全匹配
-                if (title.lower() in window_title.lower() or 
-                    (class_name != "*" and class_name.lower() in window_class.lower())):
-                    try:
-                        # 获取窗口矩形
-                        rect = win32gui.GetWindowRect(hwnd)
-                        # 转换为QRect并添加到列表
-                        windows.append(QRect(rect[0], rect[1], rect[2]-rect[0], rect[3]-rect[1]))
-                        print(f"找到顶层窗口: {window_title} ({window_class}) at {rect}")
-                    except Exception as e:
-                        print(f"获取窗口位置时出错: {str(e)}")
-            return True
-        
-        try:
-            win32gui.EnumWindows(callback, found_windows)
-        except Exception as e:
-            print(f"枚举窗口时出错: {str(e)}")
-        
+        for window in self.window_tracker.windows_top_to_bottom():
+            if matcher.match(window) is not None:
+                rect = window.rect
+                found_windows.append(QRect(rect[0], rect[1], rect[2]-rect[0], rect[3]-rect[1]))
+                print(f"找到顶层窗口: {window.title} ({window.class_name}) at {rect}")
         return found_windows
 
     def list_visible_windows(self):
         """列出所有可见的顶层窗口，返回窗口标题列表"""
-        visible_windows = []
-        
-        def callback(hwnd, windows):
-            if win32gui.IsWindowVisible(hwnd) and not win32gui.GetParent(hwnd):  # 只选择顶层窗口
-                title = win32gui.GetWindowText(hwnd)
-                if title and not title.isspace():  # 排除空标题窗口
-                    try:
-                        rect = win32gui.GetWindowRect(hwnd)
-                        # 排除最小化的窗口和太小的窗口
-                        if rect[2] - rect[0] > 50 and rect[3] - rect[1] > 50:
-                            # 排除任务栏（因为任务栏已经默认添加）
-                            if win32gui.GetClassName(hwnd) != "Shell_TrayWnd":
-                                windows.append({
-                                    "title": title,
-                                    "class_name": win32gui.GetClassName(hwnd),
-                                    "hwnd": hwnd
-                                })
-                    except Exception as e:
-                        print(f"获取窗口信息时出错: {str(e)}")
-            return True
-
-        try:
-            win32gui.EnumWindows(callback, visible_windows)
-        except Exception as e:
-            print(f"枚举窗口时出错: {str(e)}")
+        # 读取窗口跟踪器的模型：窗口查询在工作线程中完成，这里不会被无响应的窗口卡住
+        visible_windows = [
+            {
+                "title": window.title,
+                "class_name": window.class_name,
+                "hwnd": window.hwnd
+            }
+            for window in self.window_tracker.windows_top_to_bottom()
+            if window.title and not window.title.isspace()  # 排除空标题窗口
+            # 排除最小化的窗口和太小的窗口
+            and window.rect[2] - window.rect[0] > 50 and window.rect[3] - window.rect[1] > 50
+            # 排除任务栏（因为任务栏已经默认添加）
+            and window.class_name != "Shell_TrayWnd"
+        ]
 
         # 按标题排序
         visible_windows.sort(key=lambda x: x["title"].lower())
@@ -1707,14 +1838,15 @@ class PetInteraction:
         self._update_platforms()
         print("已清空所有互动窗口")
 
-    def add_interactive_window(self, title, class_name="*"):
+    def add_interactive_window(self, title, class_name="*", process_name="*"):
         """
         添加一个新的互动窗口。
         如果窗口已存在，则不会重复添加。
         
         Args:
             title (str): 窗口标题（支持部分匹配）
-            class_name (str): 窗口类名，默认为"*"表示匹配任意类名
+            class_name (str): 窗口类名（支持部分匹配），默认为"*"表示匹配任意类名
+            process_name (str): 进程名（支持部分匹配），默认为"*"表示匹配任意进程
         """
         # 检查窗口是否已经在列表中
         for window in self.fall_config["interactive_windows"]:
@@ -1723,7 +1855,7 @@ class PetInteraction:
                 return False
 
         # 验证窗口是否存在
-        window_rects = self._find_window_geometry(title, class_name)
+        window_rects = self._find_window_geometry(title, class_name, process_name)
         if not window_rects:
             print(f"未找到标题包含 '{title}' 的窗口")
             return False
@@ -1731,7 +1863,8 @@ class PetInteraction:
         # 添加到互动窗口列表
         self.fall_config["interactive_windows"].append({
             "title": title,
-            "class_name": class_name
+            "class_name": class_name,
+            "process_name": process_name
         })
         self._update_platforms()
         print(f"已添加互动窗口: {title}")
@@ -0,0 +1,286 @@
+import os
+import sys
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+try:
+    from PyQt5 import QtDBus
+except ImportError:
+    # 没有 QtDBus 的 PyQt5 构建，MPRIS 后端不可用
+    QtDBus = None
+
+
+def _dbus_slot(method):
+    """声明接收 QDBusMessage 的槽，D-Bus 信号只能连接到这样的槽上"""
+    return pyqtSlot(QtDBus.QDBusMessage)(method) if QtDBus is not None else method
+
+
+def owns_session(owners, pid, process_name):
+    """
+    判断一个进程是否发布了媒体会话
+
+    Args:
+        owners (frozenset): MediaSession.owners
+        pid (int): 进程ID
+        process_name (str): 进程名
+
+    Returns:
+        bool: 进程ID在 owners 中，或者去掉 .exe 的进程名出现在某个应用标识中
+    """
+    if pid in owners:
+        return True
+    stem = (process_name or "").casefold()
+    if stem.endswith(".exe"):
+        stem = stem[:-4]
+    return bool(stem) and any(isinstance(owner, str) and stem in owner for owner in owners)
+
+
+class MediaSession(QObject):
+    """
+    系统媒体会话的基类：报告是否有播放器处于播放状态，以及哪些播放器发布了会话。
+
+    后端订阅系统的播放状态变化通知，只有“是否有会话在播放”真正改变时
+    才发出 playback_changed，会话集合改变时发出 sessions_changed，平时没有任何轮询。
+    """
+    playback_changed = pyqtSignal(bool)  # 是否有媒体会话在播放
+    sessions_changed = pyqtSignal()      # 发布会话的播放器集合改变
+
+    def __init__(self):
+        super().__init__()
+        self.is_playing = False
+        self.active_player = None   # 正在播放的播放器名称
+        # 发布了会话的播放器（不管是否在播放）：MPRIS 为进程ID，SMTC 为折叠大小写后的应用标识；
+        # 不可变集合，整体替换
+        self.owners = frozenset()
+
+    def start(self):
+        """开始监听，失败时抛出异常"""
+        raise NotImplementedError
+
+    def stop(self):
+        """停止监听"""
+
+    def _set_state(self, playing, player):
+        self.active_player = player if playing else None
+        if playing != self.is_playing:
+            self.is_playing = playing
+            print(f"MediaSession: {'播放中: ' + str(player) if playing else '没有正在播放的媒体'}")
+            self.playback_changed.emit(playing)
+
+    def _set_owners(self, owners):
+        owners = frozenset(owners)
+        if owners != self.owners:
+            self.owners = owners
+            self.sessions_changed.emit()
+
+
+class MprisMediaSession(MediaSession):
+    """
+    Linux 上通过 D-Bus 会话总线读取 MPRIS 播放器的 PlaybackStatus。
+
+    启动时枚举一次 org.mpris.MediaPlayer2.* 服务，之后只靠 PropertiesChanged 和
+    NameOwnerChanged 信号更新；查询全部是异步调用，不会阻塞GUI线程。
+    """
+    SERVICE_PREFIX = "org.mpris.MediaPlayer2."
+    PATH = "/org/mpris/MediaPlayer2"
+    PLAYER_INTERFACE = "org.mpris.MediaPlayer2.Player"
+    PROPERTIES_INTERFACE = "org.freedesktop.DBus.Properties"
+    DBUS_SERVICE = "org.freedesktop.DBus"
+    DBUS_PATH = "/org/freedesktop/DBus"
+
+    def __init__(self, bus=None):
+        """
+        Args:
+            bus (QDBusConnection): 使用的总线，默认为会话总线
+        """
+        super().__init__()
+        if QtDBus is None:
+            raise RuntimeError("PyQt5.QtDBus is not available")
+        self._bus = bus if bus is not None else QtDBus.QDBusConnection.sessionBus()
+        self._players = {}    # 唯一连接名 -> 服务名
+        self._statuses = {}   # 唯一连接名 -> 是否在播放
+        self._pids = {}       # 唯一连接名 -> 播放器的进程ID
+        self._pending = set() # 等待返回的异步调用
+
+    def start(self):
+        if not self._bus.isConnected():
+            raise RuntimeError("D-Bus session bus is not available")
+        self._bus.connect("", self.PATH, self.PROPERTIES_INTERFACE, "PropertiesChanged",
+                          self._on_properties_changed)
+        self._bus.connect(self.DBUS_SERVICE, self.DBUS_PATH, self.DBUS_SERVICE, "NameOwnerChanged",
+                          self._on_name_owner_changed)
+        self._call(self.DBUS_SERVICE, self.DBUS_PATH, self.DBUS_SERVICE, "ListNames", [], self._on_names)
+
+    def stop(self):
+        self._bus.disconnect("", self.PATH, self.PROPERTIES_INTERFACE, "PropertiesChanged",
+                             self._on_properties_changed)
+        self._bus.disconnect(self.DBUS_SERVICE, self.DBUS_PATH, self.DBUS_SERVICE, "NameOwnerChanged",
+                             self._on_name_owner_changed)
+        self._players.clear()
+        self._statuses.clear()
+        self._pids.clear()
+        self._set_owners(())
+        self._set_state(False, None)
+
+    def _call(self, service, path, interface, method, arguments, callback):
+        """异步调用，返回时用回复消息的参数列表调用 callback"""
+        message = QtDBus.QDBusMessage.createMethodCall(service, path, interface, method)
+        message.setArguments(arguments)
+        watcher = QtDBus.QDBusPendingCallWatcher(self._bus.asyncCall(message, 2000), self)
+        self._pending.add(watcher)
+
+        def finished(watcher):
+            self._pending.discard(watcher)
+            reply = QtDBus.QDBusPendingReply(watcher).reply()
+            watcher.deleteLater()
+            if reply.type() == QtDBus.QDBusMessage.ReplyMessage:
+                callback(reply.arguments())
+
+        watcher.finished.connect(finished)
+
+    def _on_names(self, arguments):
+        for name in arguments[0]:
+            if name.startswith(self.SERVICE_PREFIX):
+                self._call(self.DBUS_SERVICE, self.DBUS_PATH, self.DBUS_SERVICE, "GetNameOwner", [name],
+                           lambda args, name=name: self._add_player(name, args[0]))
+
+    def _add_player(self, name, owner):
+        self._players[owner] = name
+        self._call(owner, self.PATH, self.PROPERTIES_INTERFACE, "Get", [self.PLAYER_INTERFACE, "PlaybackStatus"],
+                   lambda args, owner=owner: self._set_status(owner, self._unwrap(args[0])))
+        self._call(self.DBUS_SERVICE, self.DBUS_PATH, self.DBUS_SERVICE, "GetConnectionUnixProcessID", [owner],
+                   lambda args, owner=owner: self._set_pid(owner, int(args[0])))
+
+    def _set_pid(self, owner, pid):
+        if owner not in self._players:
+            return
+        self._pids[owner] = pid
+        self._set_owners(self._pids.values())
+
+    def _unwrap(self, value):
+        if isinstance(value, QtDBus.QDBusVariant):
+            value = value.variant()
+        return value
+
+    def _set_status(self, owner, status):
+        if owner not in self._players:
+            return
+        self._statuses[owner] = status == "Playing"
+        self._update()
+
+    def _update(self):
+        playing = [self._players[owner] for owner, is_playing in self._statuses.items() if is_playing]
+        player = playing[0][len(self.SERVICE_PREFIX):] if playing else None
+        self._set_state(bool(playing), player)
+
+    @_dbus_slot
+    def _on_properties_changed(self, message):
+        arguments = message.arguments()
+        if len(arguments) < 2 or arguments[0] != self.PLAYER_INTERFACE:
+            return
+        changed = arguments[1]
+        if "PlaybackStatus" in changed and message.service() in self._players:
+            self._set_status(message.service(), self._unwrap(changed["PlaybackStatus"]))
+
+    @_dbus_slot
+    def _on_name_owner_changed(self, message):
+        name, old_owner, new_owner = message.arguments()
+        if not name.startswith(self.SERVICE_PREFIX):
+            return
+        if old_owner:
+            self._players.pop(old_owner, None)
+            self._statuses.pop(old_owner, None)
+            self._pids.pop(old_owner, None)
+            self._set_owners(self._pids.values())
+            self._update()
+        if new_owner:
+            self._add_player(name, new_owner)
+
+
+class SmtcMediaSession(MediaSession):
+    """
+    Windows 上通过系统媒体传输控件（SMTC）读取所有媒体会话的播放状态。
+    WinRT 事件在系统线程中触发，这里只转发成内部信号，处理在GUI线程中进行。
+    """
+    _sessions_changed = pyqtSignal()
+    _playback_info_changed = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        from winsdk.windows.media.control import (
+            GlobalSystemMediaTransportControlsSessionManager as SessionManager,
+            GlobalSystemMediaTransportControlsSessionPlaybackStatus as PlaybackStatus)
+        self._SessionManager = SessionManager
+        self._PLAYING = PlaybackStatus.PLAYING
+        self._manager = None
+        self._manager_token = None
+        self._sessions = []   # (会话, 事件令牌)
+        self._sessions_changed.connect(self._refresh_sessions)
+        self._playback_info_changed.connect(self._refresh_status)
+
+    def start(self):
+        import asyncio
+
+        async def request():
+            return await self._SessionManager.request_async()
+
+        self._manager = asyncio.run(request())
+        self._manager_token = self._manager.add_sessions_changed(
+            lambda manager, args: self._sessions_changed.emit())
+        self._refresh_sessions()
+
+    def stop(self):
+        self._unsubscribe()
+        if self._manager is not None and self._manager_token is not None:
+            self._manager.remove_sessions_changed(self._manager_token)
+        self._manager = None
+        self._set_owners(())
+        self._set_state(False, None)
+
+    def _unsubscribe(self):
+        for session, token in self._sessions:
+            session.remove_playback_info_changed(token)
+        self._sessions = []
+
+    @pyqtSlot()
+    def _refresh_sessions(self):
+        if self._manager is None:
+            return
+        self._unsubscribe()
+        for session in self._manager.get_sessions():
+            token = session.add_playback_info_changed(lambda session, args: self._playback_info_changed.emit())
+            self._sessions.append((session, token))
+        self._set_owners(session.source_app_user_model_id.casefold() for session, _ in self._sessions)
+        self._refresh_status()
+
+    @pyqtSlot()
+    def _refresh_status(self):
+        playing = None
+        for session, _ in self._sessions:
+            try:
+                if session.get_playback_info().playback_status == self._PLAYING:
+                    playing = session.source_app_user_model_id
+                    break
+            except OSError:
+                continue
+        self._set_state(playing is not None, playing)
+
+
+def create_media_session():
+    """
+    根据当前平台创建并启动媒体会话后端
+
+    Returns:
+        MediaSession: 不支持或启动失败时返回None，检测器只检查播放器进程
+    """
+    try:
+        if sys.platform == "win32":
+            session = SmtcMediaSession()
+        elif os.environ.get("DBUS_SESSION_BUS_ADDRESS"):
+            session = MprisMediaSession()
+        else:
+            return None
+        session.start()
+        return session
+    except Exception as e:
+        print(f"MediaSession: 无法读取系统媒体会话: {str(e)}")
+        return None
@@ -1,41 +1,424 @@
-import sounddevice as sd  # 用于获取系统音频输出
+import time
 import numpy as np       # 用于音频数据处理
-import psutil           # 用于检测正在运行的进程
-from PyQt5.QtCore import QTimer, QObject
+from PyQt5.QtCore import Qt, QCoreApplication, QMetaObject, QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+from pet_audio_buffer import AudioRingBuffer
+from pet_audio_frontend import AudioFrontEnd
+from pet_audio_source import create_audio_source
+from pet_player_watcher import MusicPlayerWatcher
+from pet_media_session import create_media_session, owns_session
+from pet_music_features import SpectralFeatureExtractor, MusicClassifier
+from pet_beat_tracker import BeatTracker
+
+
+class MusicAnalysisPipeline:
+    """
+    音乐检测的分析流水线：音频块 -> 是否在播放音乐。
+    不依赖Qt，检测工作线程和离线评估工具使用同一份分析逻辑。
+
+    除了响度阈值，还用频谱特征分类器区分音乐和人声、提示音，
+    视频通话或网页里的讲话不会让桌宠跳舞。开始跳舞还要求节拍跟踪器的速度置信度
+    达到 min_beat_confidence：提示音、讲话没有稳定的节拍，分类器偶尔误判也进不了
+    跳舞状态。分类器权重和这个门限都在标注语料上拟合。播放音乐时同时跟踪节拍，
+    结果放在 beat 属性里（不可变的 BeatInfo，其他线程可以直接读取）。
+
+    响度经过包络跟随器（快速起音、缓慢释放）平滑，开始和停止使用不同的阈值，
+    并且条件必须保持一段时间才会切换状态：安静的段落或两首歌之间的间隙
+    不会让桌宠停下来再重新开始跳舞。所有时间都按采样数计算，和调用间隔无关。
+
+    输入先经过 AudioFrontEnd 混成单声道并降采样到约 11 kHz，响度、频谱特征和
+    节拍跟踪都只处理降采样后的采样。
+
+    播放音乐时响度包络还换算成 0-1 的强度（按分贝在开始阈值和 loud_level 之间线性映射），
+    放在 intensity 属性里，跳舞动画按它调整节奏和动作幅度。
+    """
+    def __init__(self, audio_threshold=0.005, release_threshold=0.0025, attack_time=0.05, release_time=1.0,
+                 on_hold=0.4, off_hold=2.5, music_probability_threshold=0.5, release_probability_threshold=0.3,
+                 loud_level=0.2, min_beat_confidence=0.33):
+        """
+        Args:
+            audio_threshold (float): 开始播放的响度阈值（包络RMS）
+            release_threshold (float): 停止播放的响度阈值，应该低于 audio_threshold
+            attack_time (float): 包络上升的时间常数（秒）
+            release_time (float): 包络下降的时间常数（秒）
+            on_hold (float): 开始条件需要持续的时间（秒）
+            off_hold (float): 停止条件需要持续的时间（秒）
+            music_probability_threshold (float): 分类器给出的音乐概率达到这个值才开始
+            release_probability_threshold (float): 音乐概率低于这个值才算停止
+            loud_level (float): 强度为1时的包络RMS
+            min_beat_confidence (float): 开始播放要求的最低节拍速度置信度，
+                                         和分类器权重一起由 benchmarks/fit_music_classifier.py 拟合
+        """
+        self.audio_threshold = audio_threshold
+        self.release_threshold = release_threshold
+        self.attack_time = attack_time
+        self.release_time = release_time
+        self.on_hold = on_hold
+        self.off_hold = off_hold
+        self.music_probability_threshold = music_probability_threshold
+        self.release_probability_threshold = release_probability_threshold
+        self.loud_level = loud_level
+        self.min_beat_confidence = min_beat_confidence
+        self.samplerate = None
+        self.envelope = 0.0               # 平滑后的响度
+        self.pending_time = 0.0           # 切换条件已经持续的时间（秒）
+        self.is_playing = False
+        self.classifier = MusicClassifier()
+        self.frontend = None              # 知道采样率之后创建
+        self.extractor = None
+        self.beat_tracker = None
+        self.music_probability = 0.0      # 最近一次分类的音乐概率
+        self.beat = None                  # 最近一次的节拍估计 BeatInfo，不在播放音乐时为None
+        self.intensity = 0.0              # 0-1 的音乐强度，不在播放音乐时为0
+
+    def configure(self, samplerate):
+        """设置输入音频的采样率（打开音频流之后调用）"""
+        if self.frontend is None or self.samplerate != samplerate:
+            self.frontend = AudioFrontEnd(samplerate)
+            # 分析采样率下 256 点约 23ms，和原来全采样率下 1024 点的帧长相同
+            rate = self.frontend.samplerate
+            self.extractor = SpectralFeatureExtractor(rate, frame_size=256)
+            self.beat_tracker = BeatTracker(rate, frame_size=256, hop_size=128)
+        self.samplerate = samplerate
+        self.reset()
+
+    def reset(self):
+        """清空包络、去抖状态和特征历史（例如音乐播放器退出时）"""
+        self.envelope = 0.0
+        self.pending_time = 0.0
+        self.is_playing = False
+        self.music_probability = 0.0
+        self.beat = None
+        self.intensity = 0.0
+        if self.frontend is not None:
+            self.frontend.reset()
+            self.extractor.reset()
+            self.beat_tracker.reset()
+
+    def process(self, data, timestamp=None):
+        """
+        分析一段新到达的音频
+
+        Args:
+            data (np.ndarray): 形状为 (帧数, 声道数) 的采样，应该是上次调用之后的全部新采样
+            timestamp (float): 最后一个采样对应的 time.monotonic() 时间，默认为当前时间
+
+        Returns:
+            bool: 是否在播放音乐
+        """
+        duration = len(data) / self.samplerate if self.samplerate else 0.0
+
+        if self.frontend is None:
+            self.configure(self.samplerate or 44100)
+        mono = self.frontend.process(data)
+
+        # 计算音频响度 (使用RMS值，点积不产生临时数组)，再用包络跟随器平滑：上升快，下降慢
+        volume_norm = float(np.sqrt(np.dot(mono, mono) / len(mono))) if len(mono) else self.envelope
+        time_constant = self.attack_time if volume_norm > self.envelope else self.release_time
+        coefficient = np.exp(-duration / time_constant) if time_constant > 0 else 0.0
+        self.envelope = volume_norm + (self.envelope - volume_norm) * coefficient
+
+        # 在滑动窗口上计算频谱特征，给出音乐概率
+        self.extractor.update(mono)
+        self.beat_tracker.update(mono)
+        self.music_probability = self.classifier.probability(self.extractor.features())
+
+        # 带迟滞的判断：开始要求够响、像音乐而且有稳定的节拍，停止要求明显变安静或者不再像音乐
+        if self.is_playing:
+            switching = (self.envelope < self.release_threshold
+                         or self.music_probability < self.release_probability_threshold)
+            hold = self.off_hold
+        else:
+            switching = (self.envelope > self.audio_threshold
+                         and self.music_probability >= self.music_probability_threshold
+                         and self.beat_tracker.confidence >= self.min_beat_confidence)
+            hold = self.on_hold
+        if switching:
+            self.pending_time += duration
+            if self.pending_time >= hold:
+                self.is_playing = not self.is_playing
+                self.pending_time = 0.0
+        else:
+            self.pending_time = 0.0
+
+        if self.is_playing:
+            self.beat = self.beat_tracker.info(time.monotonic() if timestamp is None else timestamp)
+            self.intensity = self._intensity()
+        else:
+            self.beat = None
+            self.intensity = 0.0
+        return self.is_playing
+
+    def _intensity(self):
+        """包络按分贝映射到 0-1：开始阈值为0，loud_level 为1"""
+        if self.envelope <= self.audio_threshold:
+            return 0.0
+        span = np.log(self.loud_level / self.audio_threshold)
+        return float(min(1.0, np.log(self.envelope / self.audio_threshold) / span)) if span > 0 else 1.0
+
+
+class MusicDetectionWorker(QObject):
+    """
+    音乐检测工作对象，运行在独立的 QThread 中。
+    负责整个检测流程：检查音乐播放器进程、管理音频流、分析音频和去抖。
+    只有播放状态真正改变时才发出 playing_changed 信号，状态稳定时GUI线程没有任何工作。
+
+    播放音乐时检测间隔缩短到 dance_interval，强度和节拍以约20Hz更新；
+    停止播放后恢复到 interval。
+
+    媒体会话是播放状态的主要来源：某个会话报告正在播放时才算有播放器，会话暂停或停止时
+    即使播放器进程还在也关闭设备。列表中的播放器进程只对没有发布会话的播放器（游戏、
+    关闭了 MPRIS 的浏览器、旧的 Windows 播放器）起作用。
+
+    音频设备按需打开：没有播放器在运行时设备保持关闭，定时器也降到较慢的空闲节奏；
+    播放器出现后才打开设备（设备选择由音频来源缓存）。打开失败或采集中断时
+    按指数退避重试，不会每个检测周期都重新打开设备。
+    """
+    playing_changed = pyqtSignal(bool)  # 音乐开始或停止播放
+
+    def __init__(self, player_watcher, pipeline, audio_source, interval=200, dance_interval=50, idle_interval=1000,
+                 retry_delay=1.0, max_retry_delay=60.0):
+        """
+        Args:
+            player_watcher (MusicPlayerWatcher): 音乐播放器进程监视器；为None时不检查进程
+            audio_source (AudioSource): 系统音频来源
+            pipeline (MusicAnalysisPipeline): 分析流水线
+            interval (int): 检测间隔（毫秒）
+            dance_interval (int): 播放音乐时的检测间隔（毫秒），决定强度和节拍的更新频率
+            idle_interval (int): 没有播放器在运行时检查播放器的间隔（毫秒）
+            retry_delay (float): 打开设备失败后第一次重试的等待时间（秒），之后每次加倍
+            max_retry_delay (float): 重试等待时间的上限（秒）
+        """
+        super().__init__()
+        self.player_watcher = player_watcher
+        self.pipeline = pipeline
+        self.interval = interval
+        self.dance_interval = dance_interval
+        self.idle_interval = idle_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.is_playing = False
+        self.check_timer = None           # 在工作线程中创建
+        self.session_player = None        # 媒体会话报告正在播放的播放器，没有时为None
+        self.session_owners = frozenset()  # 发布了媒体会话的播放器，见 MediaSession.owners
+
+        # --- 音频流设置 ---
+        self.source = audio_source
+        self.stream_open = False    # 音频来源是否已经成功打开
+        self.ring_buffer = None     # 音频回调写入的环形缓冲区，保存最近约1秒的采样
+        self.analysis_block = None  # 预先分配的分析缓冲区，每次分析复制上次之后的全部新采样（最多0.5秒）
+        self.last_analyzed = 0      # 上次分析时环形缓冲区的累计帧数
+        self.failures = 0           # 连续打开失败的次数
+        self.next_retry = 0.0       # 下次允许打开设备的时间（time.monotonic）
+
+    @pyqtSlot()
+    def start(self):
+        """开始检测（在工作线程中执行）；音频设备在需要时才打开"""
+        if self.check_timer is None:
+            # 定时器必须在它所属的线程中创建
+            self.check_timer = QTimer()
+            self.check_timer.timeout.connect(self._check_music_playing)
+        if not self.check_timer.isActive():
+            self.failures = 0
+            self.next_retry = 0.0
+            self.check_timer.start(self.interval)
+            self._check_music_playing()
+
+    @pyqtSlot()
+    def stop(self):
+        """停止检测并关闭音频流（在工作线程中执行）"""
+        if self.check_timer is not None:
+            self.check_timer.stop()
+        self._close_stream()
+        self.pipeline.reset()
+        self._set_playing(False)
+
+    @pyqtSlot(str, object)
+    def set_session_state(self, player, owners):
+        """
+        媒体会话的状态改变（在工作线程中执行）
+
+        Args:
+            player (str): 正在播放的播放器名称，没有会话在播放时为空字符串
+            owners (frozenset): 发布了会话的播放器，见 MediaSession.owners
+        """
+        self.session_player = player or None
+        self.session_owners = owners
+        if self.check_timer is not None and self.check_timer.isActive():
+            # 会话开始或停止播放时立即检查，不必等空闲间隔
+            self._check_music_playing()
+
+    def _music_player_running(self):
+        """
+        是否有播放器在播放：会话报告正在播放，或者没有发布会话的播放器进程在运行
+        （缓存的播放器进程只做存活测试，不再每次遍历所有进程）
+        """
+        if self.session_player is not None:
+            return True
+        watcher = self.player_watcher
+        if watcher is None:
+            return True
+        return watcher.check() and not owns_session(self.session_owners, watcher.active_pid,
+                                                     watcher.active_process_name)
+
+    def _set_playing(self, is_playing):
+        """只在播放状态改变时发出信号"""
+        if is_playing == self.is_playing:
+            return
+        self.is_playing = is_playing
+        if is_playing:
+            player = self.session_player
+            if player is None and self.player_watcher is not None:
+                player = self.player_watcher.active_music_player
+            print(f"PetMusicDetector: 检测到音乐播放 (来自 {player})")
+        else:
+            print("PetMusicDetector: 音乐停止")
+        self.playing_changed.emit(is_playing)
+
+    def _set_interval(self, interval):
+        if self.check_timer.interval() != interval:
+            self.check_timer.setInterval(interval)
+
+    def _initialize_audio_stream(self):
+        """打开音频来源；失败时按指数退避安排下一次尝试"""
+        try:
+            samplerate, channels = self.source.open()
+            print(f"Sample rate: {samplerate}, channels: {channels}")
+
+            # 采样格式不变时复用预先分配的环形缓冲区和分析缓冲区
+            if (self.ring_buffer is None or self.ring_buffer.channels != channels
+                    or len(self.analysis_block) != samplerate // 2):
+                self.ring_buffer = AudioRingBuffer(max(samplerate, self.source.block_size * 4), channels,
+                                                   max_block=self.source.block_size)
+                self.analysis_block = np.zeros((samplerate // 2, channels), dtype=np.float32)
+            self.last_analyzed = self.ring_buffer.written
+            self.pipeline.configure(samplerate)
+
+            # 采样在采集线程中写入环形缓冲区，分析时不再阻塞读取
+            self.source.start(self._audio_callback)
+            self.stream_open = True
+            self.failures = 0
+            print("PetMusicDetector: Audio stream initialized successfully.")
+
+        except Exception as e:
+            print(f"PetMusicDetector: Failed to initialize audio stream: {str(e)}")
+            self._close_stream()
+            self._schedule_retry()
+
+    def _schedule_retry(self):
+        """连续失败时等待时间加倍，直到上限"""
+        delay = min(self.retry_delay * (2 ** self.failures), self.max_retry_delay)
+        self.failures += 1
+        self.next_retry = time.monotonic() + delay
+        print(f"PetMusicDetector: {delay:.1f}秒后重新打开音频设备")
+
+    def _audio_callback(self, indata):
+        """采集线程回调：只把采样写入环形缓冲区，不做分析也不访问Qt对象"""
+        self.ring_buffer.write(indata)
+
+    def _check_music_playing(self):
+        """检测系统音频输出并结合音乐播放器状态来判断是否在播放音乐"""
+        try:
+            # 1. 检查音乐播放器
+            if not self._music_player_running():
+                # 没有播放器时关闭设备，降低检查频率
+                if self.stream_open:
+                    print("PetMusicDetector: 没有音乐播放器在运行，关闭音频设备")
+                    self._close_stream()
+                    self.pipeline.reset()
+                self._set_playing(False)
+                self._set_interval(self.idle_interval)
+                return
+            self._set_interval(self.dance_interval if self.is_playing else self.interval)
+
+            # 2. 检查音频输出：需要时才打开设备，采集中断后按退避时间重新打开
+            if self.stream_open and not self.source.active:
+                print("PetMusicDetector: 音频采集已中断")
+                self._close_stream()
+                self.pipeline.reset()
+                self._schedule_retry()
+            if not self.stream_open:
+                if time.monotonic() < self.next_retry:
+                    return
+                self._initialize_audio_stream()
+                if not self.stream_open:
+                    return
+
+            # 从环形缓冲区复制上次分析之后的新音频，频谱特征需要连续的采样；没有新数据时跳过这次分析
+            written = self.ring_buffer.written
+            if written == self.last_analyzed:
+                return
+            count = min(written - self.last_analyzed, len(self.analysis_block))
+            self.last_analyzed = written
+            available = self.ring_buffer.read_latest(self.analysis_block[:count])
+            if available == 0:
+                # 复制期间一直被写入方覆盖，这段数据不完整，跳过这一次分析
+                return
+            data = self.analysis_block[count - available:count]
+
+            # 3. 分析音频并去抖（复制完成的时刻近似为最后一个采样的时间）
+            self._set_playing(self.pipeline.process(data, time.monotonic()))
+            self._set_interval(self.dance_interval if self.is_playing else self.interval)
+
+        except Exception as e:
+            print(f"PetMusicDetector: 音频检测错误: {str(e)}")
+            self.pipeline.reset()
+            self._set_playing(False)
+
+    def _close_stream(self):
+        self.stream_open = False
+        try:
+            self.source.close()
+        except Exception as e:
+            print(f"PetMusicDetector: 关闭音频来源时出错: {str(e)}")
+
 
 class PetMusicDetector(QObject):
     """
     宠物音乐检测器类
     负责检测系统中的音乐播放状态，包括：
-    1. 检测音乐播放器进程
+    1. 读取系统媒体会话的播放状态，检测没有发布会话的音乐播放器进程
     2. 检测系统音频输出
     3. 管理音乐检测的定时器
+
+    系统提供媒体会话（Linux 的 MPRIS、Windows 的 SMTC）时，某个会话报告正在播放
+    才打开音频设备并开始分析，暂停或停止后立即关闭，播放器进程还在运行也一样。
+    播放器进程检查只用于没有发布会话的播放器。
+
+    整个检测流程运行在独立的工作线程中，音频由声卡回调写入无锁环形缓冲区；
+    只有播放状态真正改变时，GUI线程才会通过 music_state_changed 信号收到通知。
+    节拍信息不通过信号发送，动画需要时调用 beat_info() 读取最新的估计。
     """
-    def __init__(self, interaction_handler):
+    music_state_changed = pyqtSignal(bool)  # 音乐播放状态改变
+    _start_requested = pyqtSignal()
+    _stop_requested = pyqtSignal()
+    _session_changed = pyqtSignal(str, object)  # 正在播放的播放器（空字符串表示没有）、发布会话的播放器
+
+    def __init__(self, interaction_handler, audio_source=None, media_session=None):
         """
         初始化音乐检测器
-        
+
         Args:
             interaction_handler: PetInteraction实例，用于更新宠物状态
+            audio_source (AudioSource): 系统音频来源，默认根据平台自动选择
+            media_session (MediaSession): 已启动的媒体会话后端，默认根据平台自动创建；
+                                          有会话的播放器以会话状态为准，没有会话的播放器检查进程
         """
         super().__init__()
-        
+
         # 保存交互处理器的引用
         self.interaction = interaction_handler
-        
+        self.music_state_changed.connect(self.interaction.update_music_state)
+        if hasattr(self.interaction, 'set_beat_source'):
+            self.interaction.set_beat_source(self.beat_info)
+        if hasattr(self.interaction, 'set_intensity_source'):
+            self.interaction.set_intensity_source(self.intensity)
+
         # --- 音频检测相关参数 ---
-        self.audio_threshold = 0.005      # 降低音频响度阈值，使其更容易触发
-        self.music_detection_count = 0    # 连续检测到音乐的次数计数器
-        self.required_detections = 2      # 减少所需的连续检测次数，加快响应速度
-        self.is_playing = False          # 当前音乐播放状态
-        
-        # --- 音频流设置 ---
-        self.stream = None
-        self.block_size = 1024  # 减小缓冲区大小，提高采样频率
-        
-        # 初始化音频流
-        self._initialize_audio_stream()
-        
+        # 响度包络超过0.005并保持0.4秒开始跳舞，低于0.0025并保持2.5秒才停止
+        self.pipeline = MusicAnalysisPipeline(audio_threshold=0.005, release_threshold=0.0025,
+                                              on_hold=0.4, off_hold=2.5)
+        self.is_playing = False          # 当前音乐播放状态（GUI线程中的副本）
+
         # --- 支持的音乐播放器列表 ---
         self.music_players = {
             "spotify.exe": "Spotify",
@@ -46,201 +429,130 @@ class PetMusicDetector(QObject):
             "foobar2000.exe": "Foobar2000",
             "music.ui.exe": "Windows Media Player"
         }
-        self.active_music_player = None   # 当前正在运行的音乐播放器名称
 
-        # 初始化音乐检测定时器
-        self.music_check_timer = QTimer()
-        self.music_check_timer.timeout.connect(self._check_music_playing)
-        self.music_check_timer.start(200)  # 减少检测间隔到200ms，提高响应速度
-        print("PetMusicDetector: Music detection timer started.")
+        self.player_watcher = MusicPlayerWatcher(self.music_players)
+        # 新窗口出现时只检查它所属的进程，新启动的播放器不必等到下一次完整扫描
+        window_tracker = getattr(self.interaction, 'window_tracker', None)
+        if window_tracker is not None:
+            window_tracker.window_added.connect(self._on_window_added)
 
-    def _initialize_audio_stream(self):
-        """初始化音频流并处理可能的错误"""
-        try:
-            # 列出所有可用的音频设备
-            devices = sd.query_devices()
-            print("\nAvailable audio devices:")
-            for i, dev in enumerate(devices):
-                print(f"[{i}] {dev['name']} (in={dev['max_input_channels']}, out={dev['max_output_channels']})")
-
-            # 查找立体声混音设备
-            stereo_mix_device = None
-            for i, dev in enumerate(devices):
-                if "立体声混音" in dev['name'] and dev['max_input_channels'] > 0:
-                    stereo_mix_device = i
-                    break
-
-            if stereo_mix_device is None:
-                print("Error: Could not find Stereo Mix device. Please enable it in Windows sound settings.")
-                return
+        # 创建检测线程，检测间隔200ms，播放音乐时50ms
+        self.audio_source = audio_source if audio_source is not None else create_audio_source()
+        self.worker = MusicDetectionWorker(self.player_watcher, self.pipeline, self.audio_source,
+                                           interval=200, dance_interval=50)
+        self.thread = QThread()
+        self.worker.moveToThread(self.thread)
+        self._start_requested.connect(self.worker.start)
+        self._stop_requested.connect(self.worker.stop)
+        self._session_changed.connect(self.worker.set_session_state)
 
-            # 获取立体声混音设备信息
-            device_info = sd.query_devices(stereo_mix_device)
-            print(f"\nUsing Stereo Mix device: {device_info['name']}")
-            print(f"Channels: in={device_info['max_input_channels']}, out={device_info['max_output_channels']}")
-            print(f"Sample rate: {device_info['default_samplerate']}")
-
-            # 创建音频流
-            self.stream = sd.InputStream(
-                device=stereo_mix_device,
-                channels=device_info['max_input_channels'],  # 使用设备支持的通道数
-                blocksize=self.block_size,
-                samplerate=int(device_info['default_samplerate']),
-                dtype=np.float32
-            )
-            self.stream.start()
-            print("PetMusicDetector: Audio stream initialized successfully.")
-            
-        except Exception as e:
-            print(f"PetMusicDetector: Failed to initialize audio stream: {str(e)}")
-            if "立体声混音" not in str(e):
-                print("\nTroubleshooting steps:")
-                print("1. Right-click on the speaker icon in the system tray")
-                print("2. Click 'Open Sound settings'")
-                print("3. Click 'Sound Control Panel' on the right")
-                print("4. In the Recording tab, right-click anywhere and enable 'Show Disabled Devices'")
-                print("5. Find 'Stereo Mix', right-click it and enable it")
-                print("6. Set it as the default device")
-            self.stream = None
-
-    def _is_music_player_running(self):
-        """
-        检查是否有音乐播放器在运行
-        
-        检查方式：
-        1. 遍历系统所有进程
-        2. 对比进程名是否在预定义的音乐播放器列表中
-        3. 如果找到正在运行的音乐播放器，记录其名称
-        
-        Returns:
-            bool: 如果有音乐播放器在运行返回True，否则返回False
-        """
-        for proc in psutil.process_iter(['name']):
-            try:
-                proc_name = proc.info['name'].lower()
-                if proc_name in [name.lower() for name in self.music_players.keys()]:
-                    self.active_music_player = self.music_players[proc_name]
-                    print(f"PetMusicDetector: 检测到音乐播放器: {self.active_music_player}")
-                    return True
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
-        self.active_music_player = None
-        return False
+        # 媒体会话的状态转发给工作线程，决定是否检测音频
+        self.media_session = media_session if media_session is not None else create_media_session()
+        if self.media_session is not None:
+            self.media_session.playback_changed.connect(self._on_session_changed)
+            self.media_session.sessions_changed.connect(self._on_session_changed)
+            self._on_session_changed()
+        self.worker.playing_changed.connect(self._on_playing_changed)
+        self.thread.start()
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
 
-    def _check_music_playing(self):
-        """检测系统音频输出并结合音乐播放器状态来判断是否在播放音乐"""
-        try:
-            # 1. 检查音乐播放器
-            music_player_running = self._is_music_player_running()
-            if not music_player_running:
-                self.music_detection_count = 0
-                self.is_playing = False
-                self.interaction.update_music_state(False)
-                return
+        self.is_running = False
+        self.start()
+        print("PetMusicDetector: Music detection thread started.")
 
-            # 2. 检查音频输出
-            if self.stream is None or not self.stream.active:
-                self._reinitialize_stream()
-                if self.stream is None:
-                    return
+    def _on_window_added(self, hwnd):
+        window = self.interaction.window_tracker.windows.get(hwnd)
+        if window is not None and window.pid:
+            self.player_watcher.notify_process_started(window.pid)
 
-            try:
-                # 读取音频数据
-                data = self.stream.read(self.block_size)[0]
-                
-                # 计算音频响度 (使用RMS值)
-                volume_norm = np.sqrt(np.mean(data**2))
-                
-                # 调试输出
-                print(f"PetMusicDetector: Current volume level: {volume_norm:.6f}")
-                
-                # 3. 判断是否满足触发条件
-                if volume_norm > self.audio_threshold:
-                    self.music_detection_count += 1
-                    print(f"PetMusicDetector: Detection count: {self.music_detection_count}/{self.required_detections}")
-                    if self.music_detection_count >= self.required_detections:
-                        print(f"PetMusicDetector: 检测到音乐播放 (来自 {self.active_music_player})")
-                        self.is_playing = True
-                        self.interaction.update_music_state(True)
-                else:
-                    if self.music_detection_count > 0:
-                        print("PetMusicDetector: Reset detection count due to low volume")
-                    self.music_detection_count = 0
-                    self.is_playing = False
-                    self.interaction.update_music_state(False)
-            except sd.PortAudioError as e:
-                print(f"PetMusicDetector: 音频读取错误: {str(e)}")
-                self._reinitialize_stream()
-                
-        except Exception as e:
-            print(f"PetMusicDetector: 音频检测错误: {str(e)}")
-            self.music_detection_count = 0
-            self.is_playing = False
-            self.interaction.update_music_state(False)
+    def _on_playing_changed(self, is_playing):
+        """工作线程报告播放状态改变（GUI线程中执行）"""
+        self.is_playing = is_playing
+        self.music_state_changed.emit(is_playing)
 
-    def _reinitialize_stream(self):
-        """重新初始化音频流"""
-        try:
-            if self.stream is not None:
-                self.stream.stop()
-                self.stream.close()
-            self._initialize_audio_stream()
-        except Exception as e:
-            print(f"PetMusicDetector: Failed to reinitialize audio stream: {str(e)}")
-            self.stream = None
+    def _on_session_changed(self, *args):
+        """媒体会话的播放状态或会话集合改变（GUI线程中执行）"""
+        session = self.media_session
+        player = (session.active_player or "媒体会话") if session.is_playing else ""
+        self._session_changed.emit(player, session.owners)
 
     def start(self):
         """启动音乐检测"""
-        if not self.music_check_timer.isActive():
-            self._reinitialize_stream()  # 确保音频流是活跃的
-            self.music_check_timer.start(200)
+        if not self.is_running:
+            self.is_running = True
+            self._start_requested.emit()
             print("PetMusicDetector: Music detection started.")
 
     def stop(self):
         """停止音乐检测"""
-        if self.music_check_timer.isActive():
-            self.music_check_timer.stop()
-            if self.stream is not None:
-                self.stream.stop()
-                self.stream.close()
-                self.stream = None
+        if self.is_running:
+            self.is_running = False
+            self._stop_requested.emit()
             print("PetMusicDetector: Music detection stopped.")
 
-    def set_audio_threshold(self, threshold):
+    def shutdown(self):
+        """关闭音频流并结束检测线程"""
+        if self.media_session is not None:
+            self.media_session.stop()
+        if self.thread.isRunning():
+            # 等工作线程停止定时器并关闭音频流之后再结束线程
+            QMetaObject.invokeMethod(self.worker, "stop", Qt.BlockingQueuedConnection)
+            self.thread.quit()
+            self.thread.wait(2000)
+
+    def set_audio_threshold(self, threshold, release_threshold=None):
         """
         设置音频检测阈值
-        
+
         Args:
-            threshold (float): 新的音频响度阈值
+            threshold (float): 新的开始播放响度阈值
+            release_threshold (float): 停止播放的响度阈值，默认为开始阈值的一半
         """
-        self.audio_threshold = threshold
+        self.pipeline.release_threshold = threshold / 2 if release_threshold is None else release_threshold
+        self.pipeline.audio_threshold = threshold
         print(f"PetMusicDetector: Audio threshold set to {threshold}")
 
     def add_music_player(self, process_name, display_name):
         """
         添加新的音乐播放器到检测列表
-        
+
         Args:
             process_name (str): 进程名称（例如：'player.exe'）
             display_name (str): 显示名称（例如：'新音乐播放器'）
         """
         self.music_players[process_name] = display_name
+        # 监视器整体替换它的字典，工作线程不会看到修改到一半的列表
+        self.player_watcher.set_players(self.music_players)
         print(f"PetMusicDetector: Added music player {display_name} ({process_name})")
 
+    def beat_info(self):
+        """
+        获取最新的节拍估计（可以在任意线程调用）
+
+        Returns:
+            BeatInfo: 速度、相位和对应的时间；没有在播放音乐或节拍不明显时返回None
+        """
+        return self.pipeline.beat
+
+    def intensity(self):
+        """
+        获取当前的音乐强度（可以在任意线程调用）
+
+        工作线程在播放音乐时约每50ms更新一次；读取只是取一个浮点数属性，
+        线程之间不需要加锁，GUI线程也不需要额外的定时器。
+
+        Returns:
+            float: 0-1 的强度，没有在播放音乐时为0
+        """
+        return self.pipeline.intensity
+
     def is_music_playing(self):
         """
         获取当前音乐播放状态
-        
+
         Returns:
             bool: 如果音乐正在播放返回True，否则返回False
         """
         return self.is_playing
-
-    def __del__(self):
-        """析构函数，确保在对象销毁时正确关闭音频流"""
-        if self.stream is not None:
-            try:
-                self.stream.stop()
-                self.stream.close()
-            except:
-                pass 
\ No newline at end of file
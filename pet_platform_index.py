@@ -0,0 +1,154 @@
+from bisect import bisect_left, bisect_right
+
+
+class _IntervalNode:
+    """区间树节点：保存所有覆盖中心点的区间"""
+    __slots__ = ("center", "by_left", "by_right", "left", "right")
+
+    def __init__(self, center, entries):
+        self.center = center
+        self.by_left = sorted(entries, key=lambda e: e[0])                 # 按左端点升序
+        self.by_right = sorted(entries, key=lambda e: e[1], reverse=True)  # 按右端点降序
+        self.left = None
+        self.right = None
+
+
+def _build_interval_tree(entries):
+    """
+    构建居中区间树
+
+    Args:
+        entries (list): (left, right, top, order, platform) 元组列表，区间为 [left, right)
+
+    Returns:
+        _IntervalNode: 根节点，没有区间时返回None
+    """
+    if not entries:
+        return None
+    endpoints = sorted(e[0] for e in entries)
+    center = endpoints[len(endpoints) // 2]
+    here, to_left, to_right = [], [], []
+    for entry in entries:
+        if entry[1] <= center:
+            to_left.append(entry)
+        elif entry[0] > center:
+            to_right.append(entry)
+        else:
+            here.append(entry)
+    node = _IntervalNode(center, here)
+    node.left = _build_interval_tree(to_left)
+    node.right = _build_interval_tree(to_right)
+    return node
+
+
+class PlatformIndex:
+    """
+    平台的空间索引，用于碰撞和落地查询。
+
+    - 按平台顶边y坐标排序的边表：查询“脚下的支撑平台”，只检查顶边落在容差范围内的平台
+    - 按x范围建立的区间树：查询“下方最近的平台”，只检查与桌宠水平范围重叠的平台
+    两种查询都是 O(log n + k)，k 为候选平台数。平台改变时调用 rebuild 重建索引。
+    """
+    def __init__(self, platforms=None):
+        self._tops = []       # 排序后的顶边y坐标
+        self._by_top = []     # 与 _tops 一一对应的 (left, right, top, order, platform)
+        self._tree = None
+        self.rebuild(platforms or [])
+
+    def rebuild(self, platforms):
+        """
+        根据平台列表重建索引
+
+        Args:
+            platforms (list): 平台字典列表，顺序即优先级（越靠前越优先）
+        """
+        entries = []
+        for order, platform in enumerate(platforms):
+            rect = platform["rect"]
+            if rect.width() <= 0:
+                continue  # 没有宽度的平台不可能与任何范围重叠
+            left = rect.x()
+            entries.append((left, left + rect.width(), rect.y(), order, platform))
+        self._by_top = sorted(entries, key=lambda e: (e[2], e[3]))
+        self._tops = [e[2] for e in self._by_top]
+        self._tree = _build_interval_tree(entries)
+
+    def __len__(self):
+        return len(self._by_top)
+
+    def support(self, left, right, bottom, tolerance=0):
+        """
+        查找支撑给定底边的平台
+
+        Args:
+            left (int): 桌宠左边界
+            right (int): 桌宠右边界（不含）
+            bottom (int): 桌宠底边y坐标
+            tolerance (int): 顶边与底边允许的距离
+
+        Returns:
+            dict: 优先级最高的支撑平台，没有时返回None
+        """
+        start = bisect_left(self._tops, bottom - tolerance)
+        end = bisect_right(self._tops, bottom + tolerance)
+        best = None
+        for i in range(start, end):
+            entry = self._by_top[i]
+            if right > entry[0] and left < entry[1] and (best is None or entry[3] < best[3]):
+                best = entry
+        return best[4] if best is not None else None
+
+    def overlapping(self, left, right):
+        """
+        返回水平范围与 [left, right) 重叠的所有索引条目
+
+        Returns:
+            list: (left, right, top, order, platform) 元组列表
+        """
+        result = []
+        node = self._tree
+        stack = [node] if node is not None else []
+        while stack:
+            node = stack.pop()
+            if right <= node.center:
+                # 查询区间完全在中心点左侧：本节点区间右端都大于中心点，只需比较左端
+                for entry in node.by_left:
+                    if entry[0] >= right:
+                        break
+                    result.append(entry)
+                if node.left is not None:
+                    stack.append(node.left)
+            elif left >= node.center:
+                # 查询区间完全在中心点右侧：本节点区间左端都不大于中心点，只需比较右端
+                for entry in node.by_right:
+                    if entry[1] <= left:
+                        break
+                    result.append(entry)
+                if node.right is not None:
+                    stack.append(node.right)
+            else:
+                # 查询区间跨过中心点：本节点所有区间都重叠
+                result.extend(node.by_left)
+                if node.left is not None:
+                    stack.append(node.left)
+                if node.right is not None:
+                    stack.append(node.right)
+        return result
+
+    def nearest_below(self, left, right, y):
+        """
+        查找顶边严格低于y的最近平台
+
+        Args:
+            left (int): 桌宠左边界
+            right (int): 桌宠右边界（不含）
+            y (int): 桌宠底边y坐标
+
+        Returns:
+            dict: 最近的平台（距离相同时取优先级最高的），没有时返回None
+        """
+        best = None
+        for entry in self.overlapping(left, right):
+            if entry[2] > y and (best is None or (entry[2], entry[3]) < (best[2], best[3])):
+                best = entry
+        return best[4] if best is not None else None
@@ -0,0 +1,100 @@
+from collections import namedtuple
+from enum import Enum, auto
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class PlatformChange(Enum):
+    """平台变化的类型"""
+    ADDED = auto()    # 新平台出现
+    MOVED = auto()    # 平台位置或大小改变
+    REMOVED = auto()  # 平台消失
+    RAISED = auto()   # 平台在Z序中被提升到其他平台之上
+
+# 单条平台变化事件
+#   kind:     PlatformChange 变化类型
+#   key:      平台的唯一键
+#   platform: 平台字典（REMOVED 时为被移除的旧字典）
+#   old_rect: 变化前的矩形（ADDED 时为None）
+PlatformEvent = namedtuple("PlatformEvent", ["kind", "key", "platform", "old_rect"])
+
+
+class PetPlatformStore(QObject):
+    """
+    平台存储：把每次新生成的平台快照与当前平台集合做差异比较，只更新发生变化的条目。
+
+    每个平台是一个字典，至少包含：
+        "key":  唯一键（例如窗口句柄或 "taskbar"）
+        "rect": QRect 平台矩形
+    未变化的平台字典对象会被保留，因此外部持有的平台引用在更新后依然有效。
+    """
+    platforms_changed = pyqtSignal(list)  # 参数为 PlatformEvent 列表，没有变化时不发出
+
+    def __init__(self, platform_list=None):
+        """
+        初始化平台存储
+
+        Args:
+            platform_list (list): 要原地维护的平台列表（例如 fall_config["platforms"]），
+                                  按快照顺序排列，默认新建一个列表
+        """
+        super().__init__()
+        self.platforms = {}   # 平台键 -> 平台字典
+        self.platform_list = platform_list if platform_list is not None else []
+        self.platform_list.clear()
+
+    def get(self, key):
+        """按键获取平台，不存在时返回None"""
+        return self.platforms.get(key)
+
+    def update(self, snapshot):
+        """
+        用新的平台快照更新存储
+
+        Args:
+            snapshot (list): 新的平台字典列表，顺序即Z序（越靠前越上层）
+
+        Returns:
+            list: 本次更新产生的 PlatformEvent 列表
+        """
+        events = []
+        old_order = [platform["key"] for platform in self.platform_list]
+        new_keys = [platform["key"] for platform in snapshot]
+        new_key_set = set(new_keys)
+
+        # 移除消失的平台
+        for key in old_order:
+            if key not in new_key_set:
+                removed = self.platforms.pop(key)
+                events.append(PlatformEvent(PlatformChange.REMOVED, key, removed, removed["rect"]))
+
+        # 新增或更新平台
+        for new_platform in snapshot:
+            key = new_platform["key"]
+            current = self.platforms.get(key)
+            if current is None:
+                self.platforms[key] = new_platform
+                events.append(PlatformEvent(PlatformChange.ADDED, key, new_platform, None))
+                continue
+            old_rect = current["rect"]
+            if current != new_platform:
+                # 原地更新，保持字典对象不变
+                current.clear()
+                current.update(new_platform)
+            if old_rect != new_platform["rect"]:
+                events.append(PlatformEvent(PlatformChange.MOVED, key, current, old_rect))
+
+        # 检查Z序提升：只比较新旧快照中都存在的平台的相对顺序
+        common_old = [key for key in old_order if key in new_key_set]
+        common_set = set(common_old)
+        common_new = [key for key in new_keys if key in common_set]
+        if common_old != common_new:
+            old_rank = {key: i for i, key in enumerate(common_old)}
+            for i, key in enumerate(common_new):
+                if i < old_rank[key]:
+                    events.append(PlatformEvent(PlatformChange.RAISED, key, self.platforms[key], self.platforms[key]["rect"]))
+
+        if events or old_order != new_keys:
+            self.platform_list[:] = [self.platforms[key] for key in new_keys]
+        if events:
+            self.platforms_changed.emit(events)
+        return events
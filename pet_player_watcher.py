@@ -0,0 +1,92 @@
+import time
+from collections import deque
+import psutil
+
+
+class MusicPlayerWatcher:
+    """
+    音乐播放器进程监视器。
+
+    找到音乐播放器之后缓存它的进程对象，之后每次检查只做一次存活测试
+    （psutil 会同时比较进程创建时间，进程ID被复用也不会误判）。
+    没有找到播放器时，只按较慢的节奏重新扫描整个进程表；新进程的进程ID
+    可以通过 notify_process_started 提前送进来，只检查这一个进程。
+    进程名统一折叠大小写后放在预先计算好的字典里匹配。
+    """
+    def __init__(self, music_players, rescan_interval=5.0):
+        """
+        Args:
+            music_players (dict): 进程名 -> 显示名称
+            rescan_interval (float): 没有找到播放器时重新扫描进程表的间隔（秒）
+        """
+        self.rescan_interval = rescan_interval
+        self.active_music_player = None  # 当前正在运行的音乐播放器名称
+        self.active_pid = None           # 播放器的进程ID和进程名，用于判断它是否发布了媒体会话
+        self.active_process_name = None
+        self._players = {}               # 折叠大小写后的进程名 -> 显示名称
+        self._process = None             # 缓存的播放器进程
+        self._next_scan = 0.0            # 下次完整扫描的时间
+        self._started_pids = deque()     # 等待检查的新进程ID，可以从其他线程追加
+        self.set_players(music_players)
+
+    def set_players(self, music_players):
+        """替换播放器列表，下次检查时重新扫描"""
+        self._players = {name.casefold(): display for name, display in music_players.items()}
+        self._process = None
+        self._next_scan = 0.0
+
+    def notify_process_started(self, pid):
+        """有新进程出现（例如新窗口），下次检查时只检查这个进程（线程安全）"""
+        self._started_pids.append(pid)
+
+    def check(self, now=None):
+        """
+        检查是否有音乐播放器在运行
+
+        Returns:
+            bool: 如果有音乐播放器在运行返回True，否则返回False
+        """
+        if self._process is not None:
+            if self._process.is_running():
+                self._started_pids.clear()
+                return True
+            print(f"PetMusicDetector: 音乐播放器已退出: {self.active_music_player}")
+            self._process = None
+            self.active_music_player = None
+            self.active_pid = None
+            self.active_process_name = None
+            self._next_scan = 0.0  # 可能还有别的播放器在运行，立即重新扫描
+
+        # 先检查新出现的进程
+        while self._started_pids:
+            pid = self._started_pids.popleft()
+            try:
+                if self._match(psutil.Process(pid)):
+                    return True
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, ValueError):
+                continue
+
+        now = time.monotonic() if now is None else now
+        if now < self._next_scan:
+            return False
+        self._next_scan = now + self.rescan_interval
+        for proc in psutil.process_iter(['name']):
+            try:
+                if self._match(proc):
+                    return True
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+        return False
+
+    def _match(self, proc):
+        """进程名在播放器列表中时缓存这个进程"""
+        name = proc.info['name'] if hasattr(proc, 'info') else proc.name()
+        display = self._players.get(name.casefold()) if name else None
+        if display is None:
+            return False
+        self._process = proc
+        self.active_music_player = display
+        self.active_pid = proc.pid
+        self.active_process_name = name
+        print(f"PetMusicDetector: 检测到音乐播放器: {display} (PID {proc.pid})")
+        return True
@@ -0,0 +1,192 @@
+import heapq
+from bisect import bisect_left
+
+
+def subtract_intervals(left, right, blockers):
+    """
+    从区间 [left, right) 中减去一组遮挡区间
+
+    Args:
+        left (int): 区间左端
+        right (int): 区间右端（不含）
+        blockers (list): (left, right) 遮挡区间列表
+
+    Returns:
+        list: 剩余的 (left, right) 区间列表，从左到右排列
+    """
+    segments = []
+    cursor = left
+    for block_left, block_right in sorted(blockers):
+        if block_right <= cursor:
+            continue
+        if block_left >= right:
+            break
+        if block_left > cursor:
+            segments.append((cursor, block_left))
+        cursor = max(cursor, block_right)
+        if cursor >= right:
+            break
+    if cursor < right:
+        segments.append((cursor, right))
+    return segments
+
+
+def _reordered(order, old_ranks):
+    """
+    找出Z序改变的窗口：保持原有相对顺序的最长子序列之外的窗口。
+    任何相对顺序发生翻转的两个窗口中至少有一个在结果里，
+    例如把一个窗口提升到最上层时，结果只包含这一个窗口。
+
+    Args:
+        order (list): 新Z序中的窗口句柄（只包含新旧快照中都存在的窗口）
+        old_ranks (dict): 窗口句柄 -> 旧的Z序位置
+
+    Returns:
+        set: Z序改变的窗口句柄集合
+    """
+    tails = []        # tails[k]: 长度为k+1的递增子序列的最小结尾在order中的下标
+    tail_ranks = []   # 与tails对应的旧Z序位置，用于二分查找
+    previous = [-1] * len(order)
+    for i, hwnd in enumerate(order):
+        rank = old_ranks[hwnd]
+        k = bisect_left(tail_ranks, rank)
+        if k > 0:
+            previous[i] = tails[k - 1]
+        if k == len(tails):
+            tails.append(i)
+            tail_ranks.append(rank)
+        else:
+            tails[k] = i
+            tail_ranks[k] = rank
+    kept = set()
+    i = tails[-1] if tails else -1
+    while i >= 0:
+        kept.add(order[i])
+        i = previous[i]
+    return {hwnd for hwnd in order if hwnd not in kept}
+
+
+class WalkableSurfaces:
+    """
+    可行走表面：把按Z序排列的窗口快照转换成每个窗口露出的顶边线段。
+
+    一个窗口的顶边被它上层的窗口遮挡时，被遮挡的部分不可行走。
+    每次更新只重新计算受影响区域内的顶边：
+    - 新增、消失、移动或Z序改变的窗口自身的顶边
+    - 与这些窗口新旧矩形相交的其他窗口的顶边
+    """
+    def __init__(self, min_segment_width=30):
+        """
+        Args:
+            min_segment_width (int): 露出部分小于这个宽度的线段会被丢弃（站不下桌宠）
+        """
+        self.min_segment_width = min_segment_width
+        self.rects = {}       # 窗口句柄 -> (left, top, right, bottom)
+        self.ranks = {}       # 窗口句柄 -> Z序位置（0为最顶层）
+        self.segments = {}    # 窗口句柄 -> [(left, right), ...] 露出的顶边线段
+
+    def update(self, windows):
+        """
+        用新的窗口快照更新可行走表面
+
+        Args:
+            windows (list): 从最顶层到最底层排列的 WindowInfo 列表
+
+        Returns:
+            set: 线段发生变化的窗口句柄集合（包括已消失的窗口）
+        """
+        new_rects = {window.hwnd: tuple(window.rect) for window in windows}
+        new_ranks = {window.hwnd: rank for rank, window in enumerate(windows)}
+
+        # 找出发生变化的窗口：新增、消失、移动，以及Z序相对位置改变
+        changed = set()
+        for hwnd, rect in new_rects.items():
+            if self.rects.get(hwnd) != rect:
+                changed.add(hwnd)
+        changed.update(hwnd for hwnd in self.rects if hwnd not in new_rects)
+        common_new = [window.hwnd for window in windows if window.hwnd in self.ranks]
+        changed.update(_reordered(common_new, self.ranks))
+
+        if not changed:
+            return set()
+
+        # 受影响区域：变化窗口的新旧矩形
+        regions = []
+        for hwnd in changed:
+            for rect in (self.rects.get(hwnd), new_rects.get(hwnd)):
+                if rect is not None:
+                    regions.append(rect)
+
+        # 需要重新计算的顶边：变化窗口自身，以及顶边落在受影响区域内的窗口
+        dirty = {hwnd for hwnd in changed if hwnd in new_rects}
+        for hwnd, (left, top, right, bottom) in new_rects.items():
+            if hwnd in dirty:
+                continue
+            for region_left, region_top, region_right, region_bottom in regions:
+                if (region_top <= top < region_bottom and
+                        left < region_right and right > region_left):
+                    dirty.add(hwnd)
+                    break
+
+        self.rects = new_rects
+        self.ranks = new_ranks
+
+        updated = set()
+        for hwnd in changed:
+            if hwnd not in new_rects and self.segments.pop(hwnd, None) is not None:
+                updated.add(hwnd)
+        for hwnd, segments in self._sweep(dirty).items():
+            if self.segments.get(hwnd) != segments:
+                self.segments[hwnd] = segments
+                updated.add(hwnd)
+        return updated
+
+    def _sweep(self, dirty):
+        """
+        扫描线：按y从上到下扫过所有窗口，维护跨过当前扫描线的窗口集合，
+        在每条需要重新计算的顶边处减去其上层窗口的遮挡区间。
+
+        Args:
+            dirty (set): 需要重新计算的窗口句柄集合
+
+        Returns:
+            dict: 窗口句柄 -> 露出的顶边线段列表
+        """
+        result = {}
+        if not dirty:
+            return result
+        rects = self.rects
+        ranks = self.ranks
+        by_top = sorted(rects, key=lambda hwnd: rects[hwnd][1])
+        edges = sorted(dirty, key=lambda hwnd: rects[hwnd][1])
+
+        active = {}       # 跨过扫描线的窗口句柄 -> 矩形
+        ending = []       # (bottom, hwnd) 最小堆，用于移除已经扫过的窗口
+        next_window = 0
+        for hwnd in edges:
+            left, y, right, _ = rects[hwnd]
+            # 加入顶边不低于扫描线的窗口
+            while next_window < len(by_top) and rects[by_top[next_window]][1] <= y:
+                other = by_top[next_window]
+                active[other] = rects[other]
+                heapq.heappush(ending, (rects[other][3], other))
+                next_window += 1
+            # 移除底边不低于扫描线的窗口（底边等于y的窗口不遮挡这条顶边）
+            while ending and ending[0][0] <= y:
+                active.pop(heapq.heappop(ending)[1], None)
+
+            rank = ranks[hwnd]
+            blockers = [
+                (other_rect[0], other_rect[2])
+                for other, other_rect in active.items()
+                if ranks[other] < rank and other_rect[0] < right and other_rect[2] > left
+            ]
+            result[hwnd] = [
+                segment for segment in subtract_intervals(left, right, blockers)
+                if segment[1] - segment[0] >= self.min_segment_width
+            ]
+        return result
+
+    def exposed_segments(self, hwnd):
+        """返回窗口露出的顶边线段列表"""
+        return self.segments.get(hwnd, [])
@@ -0,0 +1,102 @@
+from bisect import bisect_left
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class WindowListModel(QAbstractListModel):
+    """
+    可见窗口列表模型，直接建立在窗口跟踪器的窗口模型之上。
+
+    打开时只读取跟踪器已有的窗口，不会重新枚举；之后根据跟踪器的窗口信号
+    增量插入、移除或移动行。行按标题（忽略大小写）排序，每行可以勾选，
+    勾选状态按窗口句柄保存，搜索过滤和窗口变化都不会丢失勾选。
+    """
+    def __init__(self, tracker, parent=None):
+        """
+        Args:
+            tracker (PetWindowTracker): 共享的窗口跟踪器
+            parent (QObject): 父对象
+        """
+        super().__init__(parent)
+        self.tracker = tracker
+        self._keys = {       # 窗口句柄 -> 排序键 (折叠大小写后的标题, 窗口句柄)
+            window.hwnd: (window.title.casefold(), window.hwnd)
+            for window in tracker.windows_top_to_bottom() if self._is_listed(window)
+        }
+        self._rows = sorted(self._keys.values())  # 排好序的排序键，与行一一对应
+        self._checked = set()  # 勾选的窗口句柄
+        tracker.window_added.connect(self._on_window_changed)
+        tracker.window_moved.connect(self._on_window_changed)
+        tracker.window_title_changed.connect(self._on_window_changed)
+        tracker.window_removed.connect(self._on_window_changed)
+
+    @staticmethod
+    def _is_listed(window):
+        """是否在列表中显示：有标题、不是太小的窗口、不是任务栏"""
+        rect = window.rect
+        return (bool(window.title) and not window.title.isspace() and
+                rect[2] - rect[0] > 50 and rect[3] - rect[1] > 50 and
+                window.class_name != "Shell_TrayWnd")
+
+    def detach(self):
+        """断开与窗口跟踪器的连接，对话框关闭后不再接收窗口变化"""
+        self.tracker.window_added.disconnect(self._on_window_changed)
+        self.tracker.window_moved.disconnect(self._on_window_changed)
+        self.tracker.window_title_changed.disconnect(self._on_window_changed)
+        self.tracker.window_removed.disconnect(self._on_window_changed)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        hwnd = self._rows[index.row()][1]
+        if role in (Qt.DisplayRole, Qt.UserRole):
+            window = self.tracker.windows.get(hwnd)
+            return window.title if window is not None else None
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if hwnd in self._checked else Qt.Unchecked
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        hwnd = self._rows[index.row()][1]
+        if value == Qt.Checked:
+            self._checked.add(hwnd)
+        else:
+            self._checked.discard(hwnd)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def checked_titles(self):
+        """返回所有勾选窗口的标题，按列表顺序排列"""
+        return [self.tracker.windows[hwnd].title
+                for _, hwnd in self._rows if hwnd in self._checked]
+
+    def _on_window_changed(self, hwnd):
+        """窗口加入、移动、改标题或消失：只更新这一行"""
+        window = self.tracker.windows.get(hwnd)
+        key = (window.title.casefold(), hwnd) if window is not None and self._is_listed(window) else None
+        old_key = self._keys.get(hwnd)
+        if key == old_key:
+            return  # 只是移动了位置，显示内容不变
+        if old_key is not None:
+            row = bisect_left(self._rows, old_key)
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._rows[row]
+            del self._keys[hwnd]
+            self.endRemoveRows()
+        if key is None:
+            self._checked.discard(hwnd)
+            return
+        row = bisect_left(self._rows, key)
+        self._keys[hwnd] = key
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.insert(row, key)
+        self.endInsertRows()
@@ -0,0 +1,119 @@
+import re
+import psutil
+
+
+def _pattern(rule, field):
+    """取出规则中某个字段的匹配模式，"*" 或空值表示匹配任意值，返回None"""
+    value = rule.get(field, "*")
+    if not value or value == "*":
+        return None
+    return value.casefold()
+
+
+class WindowMatcher:
+    """
+    互动窗口匹配器：把互动窗口规则编译成一个多模式匹配器。
+
+    每条规则是一个字典：
+        "title":        窗口标题包含的文字（忽略大小写）
+        "class_name":   窗口类名包含的文字，"*" 表示任意类名（可选）
+        "process_name": 进程名包含的文字，"*" 表示任意进程（可选）
+    三个条件同时满足时窗口才算匹配。
+
+    所有标题模式合并成一个正则表达式，绝大多数窗口一次查找就能排除；
+    只有命中的窗口才逐条检查类名和进程名。每个窗口的折叠后标题、进程名和匹配结果
+    按窗口句柄缓存，窗口标题改变或窗口消失时调用 forget 使缓存失效；进程名跟着窗口
+    一起失效，进程ID被新进程重用时不会拿到旧的名字，缓存大小也不会超过现存的窗口数。
+    """
+    def __init__(self, rules=None):
+        self._rules = []          # (规则字典, 标题模式, 类名模式, 进程名模式)
+        self._rules_key = None    # 用于判断规则是否改变
+        self._regex = None        # 所有标题模式合并成的正则表达式，没有规则时为None
+        self._match_all = False   # 是否有规则的标题模式为空（匹配任意标题）
+        self._folded_titles = {}  # 窗口句柄 -> 折叠大小写后的标题
+        self._results = {}        # 窗口句柄 -> 匹配到的规则字典（没有匹配时为None）
+        self._process_names = {}  # 窗口句柄 -> 折叠大小写后的进程名
+        self.set_rules(rules or [])
+
+    def set_rules(self, rules):
+        """
+        设置匹配规则，规则没有变化时不重新编译
+
+        Args:
+            rules (list): 规则字典列表，靠前的规则优先
+        """
+        key = tuple((rule.get("title", ""), rule.get("class_name", "*"), rule.get("process_name", "*"))
+                    for rule in rules)
+        if key == self._rules_key:
+            return
+        self._rules_key = key
+        self._rules = [
+            (rule, rule.get("title", "").casefold(), _pattern(rule, "class_name"), _pattern(rule, "process_name"))
+            for rule in rules
+        ]
+        titles = {title for _, title, _, _ in self._rules if title}
+        self._match_all = any(not title for _, title, _, _ in self._rules)
+        # 长的模式放在前面，避免被它的前缀抢先匹配
+        self._regex = re.compile("|".join(re.escape(title) for title in sorted(titles, key=len, reverse=True))) if titles else None
+        self._results.clear()
+
+    def forget(self, hwnd):
+        """窗口标题改变或窗口消失时，丢弃这个窗口的缓存"""
+        self._folded_titles.pop(hwnd, None)
+        self._results.pop(hwnd, None)
+        self._process_names.pop(hwnd, None)
+
+    def match(self, window):
+        """
+        检查窗口是否匹配任意一条规则
+
+        Args:
+            window (WindowInfo): 要检查的窗口
+
+        Returns:
+            dict: 匹配到的第一条规则，没有匹配时返回None
+        """
+        try:
+            return self._results[window.hwnd]
+        except KeyError:
+            pass
+        result = None
+        if self._rules:
+            folded_title = self._folded_titles.get(window.hwnd)
+            if folded_title is None:
+                folded_title = self._folded_titles[window.hwnd] = window.title.casefold()
+            # 合并的正则表达式没有命中时，任何规则都不可能匹配
+            if self._match_all or self._regex.search(folded_title):
+                result = self._match_rules(window, folded_title)
+        self._results[window.hwnd] = result
+        return result
+
+    def _match_rules(self, window, folded_title):
+        """逐条检查规则的标题、类名和进程名条件"""
+        for rule, title, class_name, process_name in self._rules:
+            if title not in folded_title:
+                continue
+            if class_name is not None and class_name not in window.class_name.casefold():
+                continue
+            if process_name is not None and process_name not in self._process_name(window):
+                continue
+            return rule
+        return None
+
+    def _process_name(self, window):
+        """获取窗口所属进程的进程名，按窗口句柄缓存（窗口存在期间进程不会改变）"""
+        name = self._process_names.get(window.hwnd)
+        if name is None:
+            try:
+                name = psutil.Process(window.pid).name().casefold()
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, ValueError):
+                name = ""
+            self._process_names[window.hwnd] = name
+        return name
+
+    def first_match(self, windows):
+        """返回第一个匹配的窗口，没有时返回None"""
+        for window in windows:
+            if self.match(window) is not None:
+                return window
+        return None
@@ -0,0 +1,768 @@
+import os
+import sys
+from collections import namedtuple
+from enum import Enum, auto
+from PyQt5.QtCore import QCoreApplication, QObject, QThread, QTimer, QSocketNotifier, pyqtSignal, pyqtSlot
+
+# 窗口模型中的单个窗口记录（不可变）
+#   hwnd:       窗口句柄（X11下为窗口ID）
+#   title:      窗口标题
+#   class_name: 窗口类名
+#   pid:        所属进程ID（未知时为0）
+#   rect:       窗口矩形 (left, top, right, bottom)，与 win32gui.GetWindowRect 的返回格式一致
+WindowInfo = namedtuple("WindowInfo", ["hwnd", "title", "class_name", "pid", "rect"])
+
+# 工作线程交给GUI线程的查询结果（不可变）
+#   events:  本次处理的 (WindowEvent, 窗口句柄) 元组；完整枚举时为None
+#   windows: (窗口句柄, WindowInfo或None) 元组，None表示窗口已不可见
+#   z_order: 从最顶层到最底层的窗口句柄元组，本次没有读取Z序时为None
+WindowSnapshot = namedtuple("WindowSnapshot", ["events", "windows", "z_order"])
+
+
+class WindowEvent(Enum):
+    """窗口系统事件类型，由各个后端翻译自原生事件"""
+    CREATE = auto()      # 窗口出现：创建、显示、从最小化恢复
+    DESTROY = auto()     # 窗口消失：销毁、隐藏、最小化
+    LOCATION = auto()    # 窗口位置或大小改变
+    FOREGROUND = auto()  # 窗口成为前台窗口（被提升到最上层）
+    TITLE = auto()       # 窗口标题改变
+    REORDER = auto()     # Z序以未知方式改变，需要重新读取Z序
+
+
+class WindowBackend:
+    """
+    窗口系统后端的基类。
+    后端负责两件事：
+    1. 查询：枚举窗口、查询单个窗口、查询Z序
+    2. 监听：把原生窗口事件翻译成 WindowEvent 并交给跟踪器
+    所有后端都应排除本进程自己的窗口（桌宠窗口、番茄钟窗口等）。
+    """
+    # 查询是否可能被无响应的应用程序卡住；为True时跟踪器在工作线程中执行查询，
+    # 因此查询方法必须可以在工作线程中调用
+    blocking_queries = False
+
+    def __init__(self):
+        self.tracker = None
+
+    def start(self, tracker):
+        """开始监听窗口事件"""
+        self.tracker = tracker
+
+    def stop(self):
+        """停止监听窗口事件"""
+        self.tracker = None
+
+    def enumerate_windows(self):
+        """
+        枚举所有可见的顶层窗口
+
+        Returns:
+            list: 从最顶层到最底层排列的 WindowInfo 列表
+        """
+        raise NotImplementedError
+
+    def query_window(self, hwnd):
+        """
+        查询单个窗口的当前信息
+
+        Returns:
+            WindowInfo: 窗口信息；如果窗口已不存在、不可见或不是顶层窗口，返回None
+        """
+        raise NotImplementedError
+
+    def query_z_order(self):
+        """
+        只读取窗口句柄的Z序，不读取标题和位置
+
+        Returns:
+            list: 从最顶层到最底层排列的窗口句柄列表（可以包含模型之外的窗口）
+        """
+        return [window.hwnd for window in self.enumerate_windows()]
+
+    def _emit(self, event, hwnd):
+        """把翻译后的事件交给跟踪器"""
+        if self.tracker is not None:
+            self.tracker.handle_event(event, hwnd)
+
+
+class Win32WindowBackend(WindowBackend):
+    """基于 SetWinEventHook 的 Windows 后端，事件在GUI线程的消息循环中回调"""
+
+    # WinEvent 常量
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_SYSTEM_MINIMIZESTART = 0x0016
+    EVENT_SYSTEM_MINIMIZEEND = 0x0017
+    EVENT_OBJECT_CREATE = 0x8000
+    EVENT_OBJECT_DESTROY = 0x8001
+    EVENT_OBJECT_SHOW = 0x8002
+    EVENT_OBJECT_HIDE = 0x8003
+    EVENT_OBJECT_REORDER = 0x8004
+    EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    OBJID_WINDOW = 0
+    CHILDID_SELF = 0
+    DWMWA_CLOAKED = 14
+
+    # Win32 查询是线程安全的，放到工作线程中执行，卡住的窗口不会冻结GUI线程
+    blocking_queries = True
+
+    # 需要挂钩的事件区间（闭区间）
+    HOOK_RANGES = [
+        (EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND),
+        (EVENT_SYSTEM_MINIMIZESTART, EVENT_SYSTEM_MINIMIZEEND),
+        (EVENT_OBJECT_CREATE, EVENT_OBJECT_REORDER),
+        (EVENT_OBJECT_LOCATIONCHANGE, EVENT_OBJECT_NAMECHANGE),
+    ]
+
+    # 原生事件 -> WindowEvent
+    EVENT_MAP = {
+        EVENT_SYSTEM_FOREGROUND: WindowEvent.FOREGROUND,
+        EVENT_SYSTEM_MINIMIZESTART: WindowEvent.DESTROY,
+        EVENT_SYSTEM_MINIMIZEEND: WindowEvent.CREATE,
+        EVENT_OBJECT_CREATE: WindowEvent.CREATE,
+        EVENT_OBJECT_SHOW: WindowEvent.CREATE,
+        EVENT_OBJECT_DESTROY: WindowEvent.DESTROY,
+        EVENT_OBJECT_HIDE: WindowEvent.DESTROY,
+        EVENT_OBJECT_REORDER: WindowEvent.REORDER,
+        EVENT_OBJECT_LOCATIONCHANGE: WindowEvent.LOCATION,
+        EVENT_OBJECT_NAMECHANGE: WindowEvent.TITLE,
+    }
+
+    def __init__(self):
+        super().__init__()
+        import ctypes
+        from ctypes import wintypes
+        import win32gui
+        import win32process
+
+        self._ctypes = ctypes
+        self._win32gui = win32gui
+        self._win32process = win32process
+        self._user32 = ctypes.windll.user32
+        try:
+            self._dwmapi = ctypes.windll.dwmapi
+        except OSError:
+            self._dwmapi = None
+        self._own_pid = os.getpid()
+
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+        self._user32.SetWinEventHook.restype = wintypes.HANDLE
+        self._user32.SetWinEventHook.argtypes = [
+            wintypes.UINT, wintypes.UINT, wintypes.HMODULE, WinEventProc,
+            wintypes.DWORD, wintypes.DWORD, wintypes.UINT
+        ]
+        self._user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+        # 必须保存回调对象的引用，否则会被垃圾回收导致崩溃
+        self._win_event_proc = WinEventProc(self._win_event_callback)
+        self._hooks = []
+
+    def start(self, tracker):
+        super().start(tracker)
+        for first, last in self.HOOK_RANGES:
+            hook = self._user32.SetWinEventHook(
+                first, last, 0, self._win_event_proc, 0, 0,
+                self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS
+            )
+            if hook:
+                self._hooks.append(hook)
+            else:
+                print(f"Win32WindowBackend: 无法挂钩窗口事件 {first:#06x}-{last:#06x}")
+
+    def stop(self):
+        for hook in self._hooks:
+            self._user32.UnhookWinEvent(hook)
+        self._hooks = []
+        super().stop()
+
+    def _win_event_callback(self, hook, event, hwnd, id_object, id_child, thread_id, event_time):
+        """WinEvent回调：只关心顶层窗口本身的事件"""
+        if not hwnd or id_object != self.OBJID_WINDOW or id_child != self.CHILDID_SELF:
+            return
+        kind = self.EVENT_MAP.get(event)
+        if kind is None:
+            return
+        try:
+            # 销毁事件到达时窗口可能已不存在，交给跟踪器按句柄判断
+            if kind != WindowEvent.DESTROY and self._win32gui.GetParent(hwnd):
+                return
+            self._emit(kind, hwnd)
+        except Exception as e:
+            print(f"Win32WindowBackend: 处理窗口事件时出错: {str(e)}")
+
+    def _is_cloaked(self, hwnd):
+        """检查窗口是否被DWM隐藏（例如后台的UWP应用窗口）"""
+        if self._dwmapi is None:
+            return False
+        cloaked = self._ctypes.c_int(0)
+        result = self._dwmapi.DwmGetWindowAttribute(
+            hwnd, self.DWMWA_CLOAKED,
+            self._ctypes.byref(cloaked), self._ctypes.sizeof(cloaked)
+        )
+        return result == 0 and cloaked.value != 0
+
+    def query_window(self, hwnd):
+        win32gui = self._win32gui
+        try:
+            if (not win32gui.IsWindow(hwnd) or not win32gui.IsWindowVisible(hwnd) or
+                    win32gui.GetParent(hwnd) or win32gui.IsIconic(hwnd) or self._is_cloaked(hwnd)):
+                return None
+            _, pid = self._win32process.GetWindowThreadProcessId(hwnd)
+            if pid == self._own_pid:
+                return None
+            return WindowInfo(
+                hwnd,
+                win32gui.GetWindowText(hwnd),
+                win32gui.GetClassName(hwnd),
+                pid,
+                tuple(win32gui.GetWindowRect(hwnd))
+            )
+        except Exception:
+            return None
+
+    def query_z_order(self):
+        handles = []
+
+        def callback(hwnd, result):
+            if self._win32gui.IsWindowVisible(hwnd):
+                result.append(hwnd)
+            return True
+
+        try:
+            self._win32gui.EnumWindows(callback, handles)
+        except Exception as e:
+            print(f"Win32WindowBackend: 枚举窗口时出错: {str(e)}")
+        return handles
+
+    def enumerate_windows(self):
+        windows = []
+        for hwnd in self.query_z_order():
+            info = self.query_window(hwnd)
+            if info is not None:
+                windows.append(info)
+        return windows
+
+
+class X11WindowBackend(WindowBackend):
+    """
+    基于 python-xlib 的 X11 后端。
+    监听根窗口的 PropertyNotify（_NET_CLIENT_LIST_STACKING、_NET_ACTIVE_WINDOW）
+    以及客户端窗口和窗口管理器框架的 ConfigureNotify / PropertyNotify。
+    """
+    def __init__(self, display_name=None):
+        super().__init__()
+        from Xlib import X, error as xerror
+        from Xlib import display as xdisplay
+
+        self._X = X
+        self._xerror = xerror
+        self.display = xdisplay.Display(display_name)
+        self.root = self.display.screen().root
+        self._atoms = {
+            name: self.display.intern_atom(name)
+            for name in ("_NET_CLIENT_LIST_STACKING", "_NET_ACTIVE_WINDOW", "_NET_WM_NAME",
+                         "_NET_WM_PID", "WM_NAME", "UTF8_STRING")
+        }
+        self._own_pid = os.getpid()
+        self._notifier = None
+        self._clients = set()    # 已知的客户端窗口ID
+        self._frames = {}        # 窗口管理器框架ID -> 客户端窗口ID
+
+    def start(self, tracker):
+        super().start(tracker)
+        X = self._X
+        self.root.change_attributes(event_mask=X.PropertyChangeMask | X.SubstructureNotifyMask)
+        self._clients = set(self.query_z_order())
+        self._notifier = QSocketNotifier(self.display.fileno(), QSocketNotifier.Read)
+        self._notifier.activated.connect(self._drain_events)
+        self.display.flush()
+
+    def stop(self):
+        if self._notifier is not None:
+            self._notifier.setEnabled(False)
+            self._notifier = None
+        super().stop()
+
+    def _window(self, wid):
+        return self.display.create_resource_object('window', wid)
+
+    def _get_property(self, window, name, prop_type=None):
+        prop = window.get_full_property(self._atoms[name], prop_type or self._X.AnyPropertyType)
+        return prop.value if prop else None
+
+    def _frame_of(self, window):
+        """找到窗口管理器为客户端窗口创建的最外层框架（根窗口的直接子窗口）"""
+        current = window
+        while True:
+            parent = current.query_tree().parent
+            if parent is None or parent.id == self.root.id:
+                return current
+            current = parent
+
+    def query_z_order(self):
+        try:
+            stacking = self._get_property(self.root, "_NET_CLIENT_LIST_STACKING")
+        except self._xerror.XError:
+            return []
+        # _NET_CLIENT_LIST_STACKING 是从底层到顶层排列的
+        return list(reversed(stacking)) if stacking is not None else []
+
+    def query_window(self, wid):
+        X = self._X
+        window = self._window(wid)
+        try:
+            if window.get_attributes().map_state != X.IsViewable:
+                return None
+            pid = self._get_property(window, "_NET_WM_PID")
+            pid = int(pid[0]) if pid is not None and len(pid) else 0
+            if pid == self._own_pid:
+                return None
+            title = self._get_property(window, "_NET_WM_NAME", self._atoms["UTF8_STRING"])
+            if title is None:
+                title = self._get_property(window, "WM_NAME")
+            if isinstance(title, bytes):
+                title = title.decode("utf-8", "replace")
+            wm_class = window.get_wm_class()
+            frame = self._frame_of(window)
+            geometry = frame.get_geometry()
+            if frame.id not in self._frames:
+                window.change_attributes(event_mask=X.PropertyChangeMask | X.StructureNotifyMask)
+                self._frames[frame.id] = wid
+            return WindowInfo(
+                wid,
+                title or "",
+                wm_class[1] if wm_class else "",
+                pid,
+                (geometry.x, geometry.y, geometry.x + geometry.width, geometry.y + geometry.height)
+            )
+        except self._xerror.XError:
+            return None
+
+    def enumerate_windows(self):
+        windows = []
+        for wid in self.query_z_order():
+            info = self.query_window(wid)
+            if info is not None:
+                windows.append(info)
+        return windows
+
+    def _sync_client_list(self):
+        """客户端列表改变：找出新增和消失的窗口，然后同步Z序"""
+        current = self.query_z_order()
+        current_set = set(current)
+        for wid in current_set - self._clients:
+            self._emit(WindowEvent.CREATE, wid)
+        for wid in self._clients - current_set:
+            self._frames = {f: c for f, c in self._frames.items() if c != wid}
+            self._emit(WindowEvent.DESTROY, wid)
+        self._clients = current_set
+        self._emit(WindowEvent.REORDER, 0)
+
+    def _drain_events(self):
+        """处理X连接上所有待处理的事件"""
+        X = self._X
+        try:
+            while self.display.pending_events():
+                event = self.display.next_event()
+                window_id = getattr(getattr(event, "window", None), "id", None)
+                if event.type == X.PropertyNotify:
+                    if window_id == self.root.id:
+                        if event.atom == self._atoms["_NET_CLIENT_LIST_STACKING"]:
+                            self._sync_client_list()
+                        elif event.atom == self._atoms["_NET_ACTIVE_WINDOW"]:
+                            active = self._get_property(self.root, "_NET_ACTIVE_WINDOW")
+                            if active is not None and len(active) and active[0]:
+                                self._emit(WindowEvent.FOREGROUND, int(active[0]))
+                    elif event.atom in (self._atoms["_NET_WM_NAME"], self._atoms["WM_NAME"]):
+                        self._emit(WindowEvent.TITLE, window_id)
+                elif event.type == X.ConfigureNotify:
+                    client = self._frames.get(window_id, window_id)
+                    if client in self._clients:
+                        self._emit(WindowEvent.LOCATION, client)
+                elif event.type == X.MapNotify:
+                    client = self._frames.get(window_id, window_id)
+                    if client in self._clients:
+                        self._emit(WindowEvent.CREATE, client)
+                elif event.type == X.UnmapNotify:
+                    client = self._frames.get(window_id, window_id)
+                    if client in self._clients:
+                        self._emit(WindowEvent.DESTROY, client)
+        except self._xerror.XError as e:
+            print(f"X11WindowBackend: 处理X事件时出错: {str(e)}")
+
+
+class FakeWindowBackend(WindowBackend):
+    """
+    内存中的假窗口系统，用于测试、基准测试以及没有窗口系统的环境。
+    通过 inject_* 方法修改窗口并注入对应的事件。
+    """
+    def __init__(self):
+        super().__init__()
+        self._windows = {}
+        self._z_order = []
+        self._next_hwnd = 1
+
+    def enumerate_windows(self):
+        return [self._windows[hwnd] for hwnd in self._z_order]
+
+    def query_window(self, hwnd):
+        return self._windows.get(hwnd)
+
+    def query_z_order(self):
+        return list(self._z_order)
+
+    def inject_create(self, title, rect, class_name="", pid=0, hwnd=None):
+        """创建一个窗口并放在最上层，返回窗口句柄"""
+        if hwnd is None:
+            hwnd = self._next_hwnd
+        self._next_hwnd = max(self._next_hwnd, hwnd) + 1
+        self._windows[hwnd] = WindowInfo(hwnd, title, class_name, pid, tuple(rect))
+        self._z_order.insert(0, hwnd)
+        self._emit(WindowEvent.CREATE, hwnd)
+        return hwnd
+
+    def inject_destroy(self, hwnd):
+        """销毁窗口"""
+        if self._windows.pop(hwnd, None) is not None:
+            self._z_order.remove(hwnd)
+            self._emit(WindowEvent.DESTROY, hwnd)
+
+    def inject_move(self, hwnd, rect):
+        """移动窗口或改变窗口大小"""
+        if hwnd in self._windows:
+            self._windows[hwnd] = self._windows[hwnd]._replace(rect=tuple(rect))
+            self._emit(WindowEvent.LOCATION, hwnd)
+
+    def inject_raise(self, hwnd):
+        """把窗口提升到最上层"""
+        if hwnd in self._windows:
+            self._z_order.remove(hwnd)
+            self._z_order.insert(0, hwnd)
+            self._emit(WindowEvent.FOREGROUND, hwnd)
+
+    def inject_title(self, hwnd, title):
+        """修改窗口标题"""
+        if hwnd in self._windows:
+            self._windows[hwnd] = self._windows[hwnd]._replace(title=title)
+            self._emit(WindowEvent.TITLE, hwnd)
+
+
+def create_window_backend():
+    """根据当前平台创建合适的窗口系统后端"""
+    if sys.platform == "win32":
+        return Win32WindowBackend()
+    if os.environ.get("DISPLAY"):
+        try:
+            return X11WindowBackend()
+        except Exception as e:
+            print(f"PetWindowTracker: 无法连接X11显示服务器: {str(e)}")
+    print("PetWindowTracker: 没有可用的窗口系统后端，使用假后端")
+    return FakeWindowBackend()
+
+
+class _WindowQueryWorker(QObject):
+    """在工作线程中执行后端查询，结果打包成不可变的 WindowSnapshot 通过排队信号交回GUI线程"""
+    snapshot_ready = pyqtSignal(int, object)  # 请求序号, WindowSnapshot
+
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+
+    @pyqtSlot(int, object)
+    def process(self, request_id, events):
+        """
+        执行一批查询
+
+        Args:
+            request_id (int): 请求序号，原样随结果返回
+            events (tuple): (WindowEvent, 窗口句柄) 元组；为None时完整枚举所有窗口
+        """
+        try:
+            if events is None:
+                windows = tuple((window.hwnd, window) for window in self.backend.enumerate_windows())
+                snapshot = WindowSnapshot(None, windows, tuple(hwnd for hwnd, _ in windows))
+            else:
+                # 同一批中的窗口只查询一次，取最新状态
+                infos = {}
+                z_order = None
+                for event, hwnd in events:
+                    if event == WindowEvent.REORDER:
+                        if z_order is None:
+                            z_order = tuple(self.backend.query_z_order())
+                    elif event != WindowEvent.DESTROY and hwnd not in infos:
+                        infos[hwnd] = self.backend.query_window(hwnd)
+                snapshot = WindowSnapshot(events, tuple(infos.items()), z_order)
+        except Exception as e:
+            print(f"PetWindowTracker: 查询窗口时出错: {str(e)}")
+            snapshot = WindowSnapshot(events if events is not None else (), (), None)
+        self.snapshot_ready.emit(request_id, snapshot)
+
+
+class PetWindowTracker(QObject):
+    """
+    事件驱动的窗口跟踪器。
+    维护一个按Z序排列的可见顶层窗口模型，并根据窗口系统事件增量更新：
+    - 单个窗口的变化只重新查询这个窗口，不会重新枚举所有窗口
+    - 同一轮事件循环中的多个事件会被合并成一次 windows_changed 通知
+    - 后端查询可能被卡住时（blocking_queries），查询在工作线程中执行，
+      结果以不可变快照的形式交回GUI线程；超过 query_timeout 没有返回的查询会被放弃
+    """
+    window_added = pyqtSignal(int)          # 新窗口加入模型
+    window_removed = pyqtSignal(int)        # 窗口离开模型
+    window_moved = pyqtSignal(int)          # 窗口位置或大小改变
+    window_title_changed = pyqtSignal(int)  # 窗口标题改变
+    z_order_changed = pyqtSignal()          # Z序改变
+    windows_changed = pyqtSignal()          # 合并后的变化通知
+    _query_requested = pyqtSignal(int, object)  # 发给工作线程的查询请求
+
+    def __init__(self, backend=None, coalesce_interval=0, query_timeout=1000):
+        """
+        初始化窗口跟踪器
+
+        Args:
+            backend (WindowBackend): 窗口系统后端，默认根据平台自动选择
+            coalesce_interval (int): 合并变化通知的时间窗口（毫秒），0表示合并同一轮事件循环中的事件。
+                                     时间窗口内的事件只产生一次通知，持续拖动窗口时也会按这个间隔发出通知
+            query_timeout (int): 工作线程查询的超时时间（毫秒），超时后换一个新的工作线程
+        """
+        super().__init__()
+        self.backend = backend if backend is not None else create_window_backend()
+        self.windows = {}     # 窗口句柄 -> WindowInfo
+        self.z_order = []     # 从最顶层到最底层排列的窗口句柄
+
+        self._flush_timer = QTimer()
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(coalesce_interval)
+        self._flush_timer.timeout.connect(self.windows_changed.emit)
+
+        # 工作线程：只有后端查询可能被卡住时才使用
+        self._threaded = self.backend.blocking_queries
+        self._thread = None
+        self._worker = None
+        self._abandoned = []          # 超时被放弃的 (线程, 工作对象)，保留引用直到它们结束
+        self._pending = []            # 等待发给工作线程的 (事件, 句柄)，None 表示完整枚举
+        self._in_flight = None        # 正在处理的请求：(请求序号, 事件元组, 是否已重试)
+        self._request_id = 0
+        self._watchdog = QTimer()
+        self._watchdog.setSingleShot(True)
+        self._watchdog.setInterval(query_timeout)
+        self._watchdog.timeout.connect(self._on_query_timeout)
+        self._running = False
+
+        # 程序退出时解除窗口事件挂钩并结束查询线程
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
+
+    def start(self):
+        """开始监听窗口事件，并读取一次完整的窗口列表"""
+        if self._running:
+            return
+        self._running = True
+        if self._threaded:
+            self._start_worker()
+        self.backend.start(self)
+        self.resync()
+
+    def stop(self):
+        """停止监听窗口事件，等待当前的和超时被放弃的查询线程结束（可以重复调用）"""
+        if not self._running:
+            return
+        self._running = False
+        self.backend.stop()
+        self._flush_timer.stop()
+        self._watchdog.stop()
+        self._pending = []
+        self._in_flight = None
+        if self._thread is not None:
+            self._query_requested.disconnect(self._worker.process)
+            self._worker.snapshot_ready.disconnect(self._on_snapshot_ready)
+            self._abandoned.append((self._thread, self._worker))
+            self._thread = None
+            self._worker = None
+        for thread, _ in self._abandoned:
+            thread.quit()
+        for thread, _ in self._abandoned:
+            if not thread.wait(2000):
+                print("PetWindowTracker: 查询线程仍被卡住，没有等到它结束")
+        self._abandoned = [(thread, worker) for thread, worker in self._abandoned if thread.isRunning()]
+
+    def resync(self):
+        """完整地重新枚举窗口，并把差异应用到模型上"""
+        if self._threaded:
+            self._pending.append(None)
+            self._dispatch()
+            return
+        self._apply_snapshot(WindowSnapshot(None, tuple((w.hwnd, w) for w in self.backend.enumerate_windows()), None))
+
+    def handle_event(self, event, hwnd):
+        """
+        处理后端翻译好的窗口事件
+
+        Args:
+            event (WindowEvent): 事件类型
+            hwnd (int): 事件对应的窗口句柄
+        """
+        if self._threaded:
+            # 位置、标题和Z序事件只取最新状态，已经在排队的重复事件不必再加入
+            if event in (WindowEvent.LOCATION, WindowEvent.TITLE, WindowEvent.REORDER) and (event, hwnd) in self._pending:
+                return
+            self._pending.append((event, hwnd))
+            self._dispatch()
+            return
+        if event == WindowEvent.REORDER:
+            self._apply_event(event, hwnd, None, self.backend.query_z_order())
+        elif event == WindowEvent.DESTROY:
+            self._apply_event(event, hwnd, None, None)
+        else:
+            self._apply_event(event, hwnd, self.backend.query_window(hwnd), None)
+
+    def _start_worker(self):
+        self._thread = QThread()
+        self._worker = _WindowQueryWorker(self.backend)
+        self._worker.moveToThread(self._thread)
+        self._query_requested.connect(self._worker.process)
+        self._worker.snapshot_ready.connect(self._on_snapshot_ready)
+        self._thread.start()
+
+    def _dispatch(self):
+        """没有正在处理的请求时，把排队的事件打包发给工作线程"""
+        if self._in_flight is not None or not self._pending or self._thread is None:
+            return
+        if None in self._pending:
+            # 完整枚举覆盖所有排队的事件
+            events = None
+        else:
+            events = tuple(self._pending)
+        self._pending = []
+        self._send(events, retried=False)
+
+    def _send(self, events, retried):
+        self._request_id += 1
+        self._in_flight = (self._request_id, events, retried)
+        self._watchdog.start()
+        self._query_requested.emit(self._request_id, events)
+
+    def _on_snapshot_ready(self, request_id, snapshot):
+        """工作线程返回结果（GUI线程中执行）"""
+        if self._in_flight is None or request_id != self._in_flight[0]:
+            return  # 已经超时放弃的请求
+        self._watchdog.stop()
+        self._in_flight = None
+        self._apply_snapshot(snapshot)
+        self._dispatch()
+
+    def _on_query_timeout(self):
+        """查询超时：放弃卡住的工作线程，换一个新线程继续，GUI线程不会等待"""
+        _, events, retried = self._in_flight
+        self._in_flight = None
+        print(f"PetWindowTracker: 窗口查询超过 {self._watchdog.interval()} 毫秒没有返回，放弃当前工作线程")
+        self._query_requested.disconnect(self._worker.process)
+        self._worker.snapshot_ready.disconnect(self._on_snapshot_ready)
+        self._thread.quit()  # 卡住的调用返回后线程自行结束
+        self._abandoned = [(thread, worker) for thread, worker in self._abandoned if thread.isRunning()]
+        self._abandoned.append((self._thread, self._worker))
+        self._start_worker()
+        if retried:
+            print("PetWindowTracker: 重试后仍然超时，丢弃这批窗口事件")
+            self._dispatch()
+        else:
+            self._send(events, retried=True)
+
+    def _apply_snapshot(self, snapshot):
+        """把查询结果应用到模型上"""
+        infos = dict(snapshot.windows)
+        if snapshot.events is None:
+            current = {hwnd: info for hwnd, info in infos.items() if info is not None}
+            for hwnd in [h for h in self.windows if h not in current]:
+                self._remove(hwnd)
+            for info in current.values():
+                self._store(info)
+            self._set_z_order(list(snapshot.z_order if snapshot.z_order is not None else current))
+            return
+        for event, hwnd in snapshot.events:
+            self._apply_event(event, hwnd, infos.get(hwnd), snapshot.z_order)
+
+    def _apply_event(self, event, hwnd, info, z_order):
+        """
+        把单个事件及其查询结果应用到模型上
+
+        Args:
+            event (WindowEvent): 事件类型
+            hwnd (int): 事件对应的窗口句柄
+            info (WindowInfo): 查询到的窗口信息，窗口不可见时为None
+            z_order (list): REORDER 事件查询到的Z序
+        """
+        if event == WindowEvent.DESTROY:
+            if hwnd not in self.windows:
+                return
+            self._remove(hwnd)
+        elif event == WindowEvent.REORDER:
+            self._set_z_order(z_order or [])
+        else:
+            if info is None:
+                # 窗口已经不可见（例如被隐藏或最小化）
+                if hwnd not in self.windows:
+                    return
+                self._remove(hwnd)
+            else:
+                is_new = hwnd not in self.windows
+                changed = self._store(info)
+                if is_new or event == WindowEvent.FOREGROUND:
+                    self._raise(hwnd)
+                elif not changed:
+                    return
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        """安排一次合并通知；已经安排时不重新计时，避免持续的事件流推迟通知"""
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _store(self, info):
+        """把窗口信息写入模型并发出对应的信号，返回模型是否改变"""
+        old = self.windows.get(info.hwnd)
+        if old == info:
+            return False
+        self.windows[info.hwnd] = info
+        if old is None:
+            self.window_added.emit(info.hwnd)
+        else:
+            if old.title != info.title:
+                self.window_title_changed.emit(info.hwnd)
+            if old.rect != info.rect:
+                self.window_moved.emit(info.hwnd)
+        return True
+
+    def _remove(self, hwnd):
+        del self.windows[hwnd]
+        if hwnd in self.z_order:
+            self.z_order.remove(hwnd)
+        self.window_removed.emit(hwnd)
+
+    def _raise(self, hwnd):
+        """把窗口移动到Z序的最上层"""
+        if self.z_order and self.z_order[0] == hwnd:
+            return
+        if hwnd in self.z_order:
+            self.z_order.remove(hwnd)
+        self.z_order.insert(0, hwnd)
+        self.z_order_changed.emit()
+
+    def _set_z_order(self, handles):
+        z_order = [hwnd for hwnd in handles if hwnd in self.windows]
+        # 模型中有但Z序里没有的窗口放到最底层，保持模型完整
+        listed = set(z_order)
+        z_order.extend(hwnd for hwnd in self.z_order if hwnd not in listed and hwnd in self.windows)
+        if z_order != self.z_order:
+            self.z_order = z_order
+            self.z_order_changed.emit()
+        self._schedule_flush()
+
+    def windows_top_to_bottom(self):
+        """返回从最顶层到最底层排列的 WindowInfo 列表"""
+        return [self.windows[hwnd] for hwnd in self.z_order]
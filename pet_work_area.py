@@ -0,0 +1,199 @@
+import sys
+from collections import namedtuple
+from PyQt5.QtCore import QObject, QRect, pyqtSignal
+from PyQt5.QtWidgets import QApplication
+
+# 单个屏幕的工作区信息（不可变）
+#   name:         屏幕名称
+#   primary:      是否为主屏幕
+#   geometry:     屏幕矩形 QRect
+#   available:    可用区域 QRect（去掉任务栏等停靠栏之后）
+#   taskbar_edge: 任务栏所在的边 "top"/"bottom"/"left"/"right"，没有任务栏时为None
+#   auto_hide:    任务栏是否自动隐藏
+WorkArea = namedtuple("WorkArea", ["name", "primary", "geometry", "available", "taskbar_edge", "auto_hide"])
+
+
+class Win32TaskbarBackend:
+    """通过 SHAppBarMessage 查询任务栏所在的边和自动隐藏状态"""
+    ABM_GETSTATE = 0x4
+    ABM_GETTASKBARPOS = 0x5
+    ABS_AUTOHIDE = 0x1
+    EDGES = {0: "left", 1: "top", 2: "right", 3: "bottom"}
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class APPBARDATA(ctypes.Structure):
+            _fields_ = [
+                ("cbSize", wintypes.DWORD),
+                ("hWnd", wintypes.HWND),
+                ("uCallbackMessage", wintypes.UINT),
+                ("uEdge", wintypes.UINT),
+                ("rc", wintypes.RECT),
+                ("lParam", wintypes.LPARAM),
+            ]
+
+        self._ctypes = ctypes
+        self._APPBARDATA = APPBARDATA
+        self._shell32 = ctypes.windll.shell32
+        self._shell32.SHAppBarMessage.restype = ctypes.c_size_t
+        self._shell32.SHAppBarMessage.argtypes = [wintypes.DWORD, ctypes.POINTER(APPBARDATA)]
+
+    def query(self):
+        """
+        查询主任务栏
+
+        Returns:
+            tuple: (任务栏矩形 QRect, 所在的边, 是否自动隐藏)，查询失败时返回None
+        """
+        data = self._APPBARDATA()
+        data.cbSize = self._ctypes.sizeof(data)
+        if not self._shell32.SHAppBarMessage(self.ABM_GETTASKBARPOS, self._ctypes.byref(data)):
+            return None
+        rc = data.rc
+        state = self._shell32.SHAppBarMessage(self.ABM_GETSTATE, self._ctypes.byref(data))
+        return (QRect(rc.left, rc.top, rc.right - rc.left, rc.bottom - rc.top),
+                self.EDGES.get(data.uEdge), bool(state & self.ABS_AUTOHIDE))
+
+
+def _inset_edge(geometry, available):
+    """根据屏幕矩形和可用区域推断停靠栏所在的边（内缩最多的一边），没有内缩时返回None"""
+    insets = {
+        "top": available.top() - geometry.top(),
+        "bottom": geometry.bottom() - available.bottom(),
+        "left": available.left() - geometry.left(),
+        "right": geometry.right() - available.right(),
+    }
+    edge = max(insets, key=insets.get)
+    return edge if insets[edge] > 0 else None
+
+
+class PetWorkArea(QObject):
+    """
+    工作区服务：提供每个屏幕的可用区域和任务栏位置。
+
+    可用区域来自 QScreen.availableGeometry（Windows 上对应 SPI_GETWORKAREA，
+    X11 上对应 _NET_WORKAREA），任务栏可以在任意一边；Windows 上额外通过
+    SHAppBarMessage 识别自动隐藏的任务栏。结果会被缓存，只有屏幕增减、
+    屏幕几何或可用区域改变时才重新读取，并发出 work_area_changed。
+
+    自动隐藏的任务栏不占用可用区域，但会在它所在的边留下一条唤出任务栏的细条，
+    floors() 在这条边上留出 auto_hide_margin 像素，桌宠不会站在细条上挡住任务栏。
+    """
+    work_area_changed = pyqtSignal()
+
+    def __init__(self, auto_hide_margin=2):
+        """
+        Args:
+            auto_hide_margin (int): 自动隐藏的任务栏所在的边上留出的像素
+        """
+        super().__init__()
+        self.auto_hide_margin = auto_hide_margin
+        self._areas = None   # 缓存的 WorkArea 列表，None 表示需要重新读取
+        self._backend = None
+        if sys.platform == "win32":
+            try:
+                self._backend = Win32TaskbarBackend()
+            except Exception as e:
+                print(f"PetWorkArea: 无法查询任务栏状态: {str(e)}")
+        app = QApplication.instance()
+        app.screenAdded.connect(self._on_screen_added)
+        app.screenRemoved.connect(self._invalidate)
+        app.primaryScreenChanged.connect(self._invalidate)
+        for screen in app.screens():
+            self._watch(screen)
+
+    def _watch(self, screen):
+        screen.geometryChanged.connect(self._invalidate)
+        screen.availableGeometryChanged.connect(self._invalidate)
+
+    def _on_screen_added(self, screen):
+        self._watch(screen)
+        self._invalidate()
+
+    def _invalidate(self, *args):
+        self._areas = None
+        self.work_area_changed.emit()
+
+    def work_areas(self):
+        """返回所有屏幕的 WorkArea 列表，主屏幕在最前面"""
+        if self._areas is None:
+            self._areas = self._read()
+        return self._areas
+
+    def primary(self):
+        """返回主屏幕的 WorkArea，没有屏幕时返回None"""
+        areas = self.work_areas()
+        return areas[0] if areas else None
+
+    def _read(self):
+        app = QApplication.instance()
+        primary_screen = app.primaryScreen()
+        taskbar = None
+        if self._backend is not None:
+            try:
+                taskbar = self._backend.query()
+            except Exception as e:
+                print(f"PetWorkArea: 查询任务栏状态时出错: {str(e)}")
+
+        areas = []
+        for screen in app.screens():
+            geometry = screen.geometry()
+            available = screen.availableGeometry()
+            edge = _inset_edge(geometry, available)
+            auto_hide = False
+            if taskbar is not None:
+                taskbar_rect, taskbar_edge, taskbar_auto_hide = taskbar
+                if geometry.intersects(taskbar_rect):
+                    # 自动隐藏的任务栏不占用可用区域，只能从系统查询它所在的边
+                    edge = taskbar_edge
+                    auto_hide = taskbar_auto_hide
+            areas.append(WorkArea(screen.name(), screen is primary_screen, geometry, available, edge, auto_hide))
+        areas.sort(key=lambda area: not area.primary)
+        for area in areas:
+            print(f"工作区 {area.name}: 可用区域 {area.available.x()}, {area.available.y()}, "
+                  f"{area.available.width()}, {area.available.height()}，任务栏: {area.taskbar_edge}"
+                  f"{'（自动隐藏）' if area.auto_hide else ''}")
+        return areas
+
+    def usable(self, area):
+        """
+        返回桌宠可以活动的区域：可用区域在自动隐藏的任务栏所在的边上再内缩 auto_hide_margin
+
+        Args:
+            area (WorkArea): 屏幕的工作区
+
+        Returns:
+            QRect: 可以活动的区域
+        """
+        available = area.available
+        if not area.auto_hide or area.taskbar_edge is None:
+            return available
+        margin = self.auto_hide_margin
+        if area.taskbar_edge == "bottom":
+            return available.adjusted(0, 0, 0, -margin)
+        if area.taskbar_edge == "top":
+            return available.adjusted(0, margin, 0, 0)
+        if area.taskbar_edge == "left":
+            return available.adjusted(margin, 0, 0, 0)
+        return available.adjusted(0, 0, -margin, 0)
+
+    def floors(self):
+        """
+        返回每个屏幕可活动区域的底边，桌宠可以站在上面
+
+        任务栏在底部时就是任务栏的顶边；任务栏在顶部、左右两侧时是屏幕底边，
+        水平范围只覆盖可用区域，不会伸到侧边任务栏下面。自动隐藏的任务栏所在的边
+        留出 auto_hide_margin（在底部时底边抬高，在两侧时水平范围缩短）。
+
+        Returns:
+            list: (WorkArea, QRect) 列表，QRect 为底边以下的区域（至少1像素高）
+        """
+        result = []
+        for area in self.work_areas():
+            usable = self.usable(area)
+            bottom = usable.bottom() + 1
+            height = max(area.geometry.bottom() + 1 - bottom, 1)
+            result.append((area, QRect(usable.x(), bottom, usable.width(), height)))
+        return result
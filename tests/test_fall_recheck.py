@@ -0,0 +1,106 @@
+"""桌宠失去平台之后应该下落：过渡动画期间平台消失，或者被拖到半空中松开"""
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import pytest
+from PyQt5.QtCore import QEvent, QPoint, QRect, QSize, Qt
+from PyQt5.QtGui import QMouseEvent
+from PyQt5.QtWidgets import QApplication
+
+from pet_interaction import PetInteraction, PetState
+
+
+class FakePetWindow:
+    """只实现 PetInteraction 用到的窗口接口"""
+    def __init__(self):
+        self._pos = QPoint(0, 0)
+
+    def pos(self):
+        return QPoint(self._pos)
+
+    def size(self):
+        return QSize(180, 180)
+
+    def width(self):
+        return 180
+
+    def height(self):
+        return 180
+
+    def frameGeometry(self):
+        return QRect(self._pos, self.size())
+
+    def move(self, *args):
+        self._pos = QPoint(*args)
+
+    def update_image_pixmap(self, *args):
+        pass
+
+
+@pytest.fixture
+def interaction(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    app = QApplication.instance() or QApplication([])
+    pet = PetInteraction(FakePetWindow())
+    yield pet
+    pet.window_tracker.stop()
+    app.processEvents()
+
+
+def test_platform_removed_during_walk_end(interaction):
+    pet = interaction
+    taskbar = {"key": "taskbar", "rect": QRect(0, 1000, 800, 1), "type": "taskbar", "is_top_window": False}
+    window = {"key": "window", "rect": QRect(50, 300, 400, 300), "type": "window", "is_top_window": True}
+    pet.platform_store.update([window, taskbar])
+
+    # 站在窗口上
+    pet.pet_window.move(100, 300 - 180)
+    pet._set_state(PetState.STAND)
+    pet._check_falling()
+    assert pet.support_platform_key == "window"
+
+    # 播放结束行走的动画时窗口关闭：动画不被打断
+    pet._set_state(PetState.WALK_END)
+    pet.platform_store.update([taskbar])
+    assert pet.current_state == PetState.WALK_END
+
+    # 动画播放完之后开始下落
+    for _ in range(len(pet.current_animation_pixmaps) + 1):
+        if pet.current_state != PetState.WALK_END:
+            break
+        pet._tick_animation()
+    QApplication.processEvents()
+    assert pet.current_state == PetState.FALL
+
+
+def mouse_event(event_type, local, global_pos, buttons=Qt.LeftButton):
+    """窗口内 local 位置、屏幕上 global_pos 位置的左键事件"""
+    return QMouseEvent(event_type, local, global_pos, Qt.LeftButton, buttons, Qt.NoModifier)
+
+
+# 下部区域（60% 以下）、底部透明区域，以及番茄钟模式下的下部区域
+@pytest.mark.parametrize("press_y, tomato", [(150, False), (170, False), (150, True)])
+def test_drag_without_catch_into_mid_air(interaction, press_y, tomato):
+    pet = interaction
+    pet.tomato_lock_mode = tomato
+    taskbar = {"key": "taskbar", "rect": QRect(0, 1000, 800, 1), "type": "taskbar", "is_top_window": False}
+    pet.platform_store.update([taskbar])
+    pet.pet_window.move(100, 1000 - 180)
+    pet._set_state(PetState.IDLE)
+    pet._check_falling()
+    assert pet.support_platform_key == "taskbar"
+
+    # 按在不会进入CATCH的位置，拖到半空中松开
+    local = QPoint(90, press_y)
+    pet.handle_mouse_press(mouse_event(QEvent.MouseButtonPress, local, pet.pet_window.pos() + local))
+    assert pet.current_state != PetState.CATCH
+    target = QPoint(190, 400)
+    pet.handle_mouse_move(mouse_event(QEvent.MouseMove, local, target))
+    assert pet.pet_window.pos().y() < 1000 - 180
+    pet.handle_mouse_release(mouse_event(QEvent.MouseButtonRelease, local, target, Qt.NoButton))
+    QApplication.processEvents()
+    assert pet.current_state == PetState.FALL
@@ -0,0 +1,130 @@
+"""在私有的 D-Bus 会话总线上用一个假的 MPRIS 播放器测试媒体会话和采集开关"""
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pytest
+from PyQt5.QtCore import QCoreApplication, QObject, Q_CLASSINFO, pyqtProperty
+
+from pet_media_session import MprisMediaSession, QtDBus
+from pet_music_detector import MusicAnalysisPipeline, MusicDetectionWorker
+
+pytestmark = pytest.mark.skipif(QtDBus is None or shutil.which("dbus-daemon") is None,
+                                reason="需要 PyQt5.QtDBus 和 dbus-daemon")
+
+if QtDBus is not None:
+    class PlayerAdaptor(QtDBus.QDBusAbstractAdaptor):
+        """org.mpris.MediaPlayer2.Player 接口，只实现 PlaybackStatus 属性"""
+        Q_CLASSINFO("D-Bus Interface", "org.mpris.MediaPlayer2.Player")
+
+        def __init__(self, parent):
+            super().__init__(parent)
+            self.status = "Paused"
+
+        @pyqtProperty(str)
+        def PlaybackStatus(self):
+            return self.status
+
+
+class FakeMprisPlayer:
+    """在自己的总线连接上发布 org.mpris.MediaPlayer2.fake"""
+    def __init__(self, address):
+        self.bus = QtDBus.QDBusConnection.connectToBus(address, "fake-player")
+        self.root = QObject()
+        self.adaptor = PlayerAdaptor(self.root)
+        self.bus.registerObject(MprisMediaSession.PATH, self.root)
+        assert self.bus.registerService(MprisMediaSession.SERVICE_PREFIX + "fake")
+
+    def set_status(self, status):
+        self.adaptor.status = status
+        message = QtDBus.QDBusMessage.createSignal(MprisMediaSession.PATH, MprisMediaSession.PROPERTIES_INTERFACE,
+                                                  "PropertiesChanged")
+        message.setArguments([MprisMediaSession.PLAYER_INTERFACE, {"PlaybackStatus": status}, []])
+        self.bus.send(message)
+
+    def close(self):
+        self.bus.unregisterService(MprisMediaSession.SERVICE_PREFIX + "fake")
+        QtDBus.QDBusConnection.disconnectFromBus("fake-player")
+
+
+class FakeWatcher:
+    """进程检查总是找到一个播放器进程"""
+    active_music_player = "Fake Player"
+
+    def __init__(self, pid, name="fakeplayer"):
+        self.active_pid = pid
+        self.active_process_name = name
+
+    def check(self):
+        return True
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        QCoreApplication.processEvents()
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def bus_address():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    daemon = subprocess.Popen(["dbus-daemon", "--session", "--nofork", "--print-address=1"],
+                              stdout=subprocess.PIPE, text=True)
+    address = daemon.stdout.readline().strip()
+    yield address
+    daemon.terminate()
+    daemon.wait(5)
+    app.processEvents()
+
+
+@pytest.fixture
+def session_and_player(bus_address):
+    player = FakeMprisPlayer(bus_address)
+    session = MprisMediaSession(QtDBus.QDBusConnection.connectToBus(bus_address, "pet"))
+    session.start()
+    assert wait_until(lambda: os.getpid() in session.owners)
+    yield session, player
+    session.stop()
+    player.close()
+    QtDBus.QDBusConnection.disconnectFromBus("pet")
+
+
+def test_session_follows_playback_status(session_and_player):
+    session, player = session_and_player
+    assert not session.is_playing
+    player.set_status("Playing")
+    assert wait_until(lambda: session.is_playing)
+    assert session.active_player == "fake"
+    player.set_status("Paused")
+    assert wait_until(lambda: not session.is_playing)
+
+
+def test_paused_session_keeps_capture_off(session_and_player):
+    session, player = session_and_player
+    # 播放器进程还在运行，但它的会话报告暂停：不采集
+    worker = MusicDetectionWorker(FakeWatcher(os.getpid()), MusicAnalysisPipeline(), audio_source=None)
+    worker.set_session_state("", session.owners)
+    assert not worker._music_player_running()
+
+    # 会话报告正在播放：采集
+    player.set_status("Playing")
+    assert wait_until(lambda: session.is_playing)
+    worker.set_session_state(session.active_player, session.owners)
+    assert worker._music_player_running()
+
+
+def test_player_without_session_falls_back_to_process(session_and_player):
+    session, _ = session_and_player
+    worker = MusicDetectionWorker(FakeWatcher(os.getpid() + 100000, "oldplayer.exe"), MusicAnalysisPipeline(),
+                                  audio_source=None)
+    worker.set_session_state("", session.owners)
+    assert worker._music_player_running()
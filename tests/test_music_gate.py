@@ -0,0 +1,86 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pet_music_detector import MusicAnalysisPipeline
+
+SAMPLERATE = 44100
+
+
+def notification_tones(seconds, seed=2):
+    """每秒一个随机时刻响起的 880 Hz 提示音"""
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(int(SAMPLERATE * seconds))
+    decay = np.arange(int(0.3 * SAMPLERATE)) / SAMPLERATE
+    tone = np.sin(2 * np.pi * 880 * decay) * np.exp(-decay * 10)
+    for second in range(int(seconds)):
+        start = int(rng.uniform(second, second + 1) * SAMPLERATE)
+        length = min(len(tone), len(audio) - start)
+        audio[start:start + length] = tone[:length]
+    return 0.3 * audio
+
+
+def deep_voice_speech(seconds, seed=2, syllable_rate=4.0, f0=110.0):
+    """低沉的浊音讲话：基频强、大部分能量在 150 Hz 以下，音节间隔不规则"""
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(int(SAMPLERATE * seconds))
+    position = 0
+    while position < len(audio):
+        length = min(int(rng.uniform(0.5, 1.3) / syllable_rate * SAMPLERATE), len(audio) - position)
+        if length <= 0:
+            break
+        t = np.arange(length) / SAMPLERATE
+        pitch = f0 * rng.uniform(0.9, 1.15) * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(1, 4) * t))
+        phase = 2 * np.pi * np.cumsum(pitch) / SAMPLERATE
+        formant = rng.uniform(300, 900)
+        syllable = sum((1.0 / h ** 1.5 + 0.3 * np.exp(-((h * pitch.mean() - formant) / 150) ** 2))
+                       * np.sin(h * phase) for h in range(1, 20))
+        audio[position:position + length] += syllable * np.sin(np.pi * np.arange(length) / length) ** 0.7
+        pause = rng.uniform(0.03, 0.3 if rng.random() > 0.15 else 0.8)
+        position += length + int(pause * SAMPLERATE)
+    return 0.3 * audio / np.abs(audio).max()
+
+
+def drum_loop(seconds, bpm=120):
+    """每拍一个底鼓，加上持续的低音"""
+    audio = np.zeros(int(SAMPLERATE * seconds))
+    t = np.arange(int(0.25 * SAMPLERATE)) / SAMPLERATE
+    kick = np.sin(2 * np.pi * (50 + 80 * np.exp(-t * 40)) * t) * np.exp(-t * 10)
+    beat = 60.0 / bpm
+    for k in range(int(seconds / beat)):
+        start = int(k * beat * SAMPLERATE)
+        length = min(len(kick), len(audio) - start)
+        audio[start:start + length] += kick[:length]
+    audio += 0.3 * np.sin(2 * np.pi * 55 * np.arange(len(audio)) / SAMPLERATE)
+    return 0.3 * audio / np.abs(audio).max()
+
+
+def playing_ratio(audio, skip=4.0):
+    """按 200ms 一块送进分析流程，返回前 skip 秒之后判定为播放音乐的比例"""
+    pipeline = MusicAnalysisPipeline()
+    pipeline.configure(SAMPLERATE)
+    block = int(SAMPLERATE * 0.2)
+    decisions = []
+    for start in range(0, len(audio) - block + 1, block):
+        data = np.repeat(audio[start:start + block, None], 2, axis=1).astype(np.float32)
+        playing = pipeline.process(data, (start + block) / SAMPLERATE)
+        if start / SAMPLERATE >= skip:
+            decisions.append(playing)
+    return sum(decisions) / len(decisions)
+
+
+def test_notification_tones_never_dance():
+    assert playing_ratio(notification_tones(30)) == 0.0
+
+
+def test_speech_never_dances():
+    # 低频占比和音乐接近、音节速度落在节拍范围内的讲话，手工设置的权重会让桌宠一直跳舞
+    assert playing_ratio(deep_voice_speech(30)) == 0.0
+    assert playing_ratio(deep_voice_speech(30, seed=5, syllable_rate=5.0, f0=100.0)) == 0.0
+
+
+def test_rhythmic_music_dances():
+    assert playing_ratio(drum_loop(20)) > 0.9